@@ -0,0 +1,105 @@
+"""job_bilby Path scoped middleware
+
+The API authenticates with tokens, so has no use for sessions, CSRF checks,
+messages or frame options. Those only run for the admin: AdminMiddleware
+runs the ADMIN_MIDDLEWARE stack for requests under ADMIN_PATHS, and passes
+every other request straight on.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+class AdminMiddleware(object):
+    """ Runs settings.ADMIN_MIDDLEWARE, as if listed in its place in
+        settings.MIDDLEWARE, for requests whose path starts with one of
+        settings.ADMIN_PATHS. The stack is only loaded when first needed.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.paths = tuple(settings.ADMIN_PATHS)
+        self.lock = threading.Lock()
+        self.handler = None
+
+    def load(self):
+        """ Builds the stack around get_response, as Django builds
+            settings.MIDDLEWARE, collecting its view, template response and
+            exception hooks
+        """
+        view, template_response, exception = [], [], []
+        handler = self.get_response
+        for middleware_path in reversed(settings.ADMIN_MIDDLEWARE):
+            try:
+                instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured('Middleware factory %s returned None.' % middleware_path)
+
+            if hasattr(instance, 'process_view'):
+                view.insert(0, instance.process_view)
+            if hasattr(instance, 'process_template_response'):
+                template_response.append(instance.process_template_response)
+            if hasattr(instance, 'process_exception'):
+                exception.append(instance.process_exception)
+            handler = convert_exception_to_response(instance)
+
+        self.view_hooks = view
+        self.template_response_hooks = template_response
+        self.exception_hooks = exception
+        return handler
+
+    def is_admin(self, request):
+        return request.path_info.startswith(self.paths)
+
+    def __call__(self, request):
+        if not self.is_admin(request):
+            return self.get_response(request)
+        if self.handler is None:
+            with self.lock:
+                if self.handler is None:
+                    self.handler = self.load()
+        return self.handler(request)
+
+    # The hooks are only called for requests passed through the stack, which
+    # has been loaded by then
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_admin(request):
+            for hook in self.view_hooks:
+                response = hook(request, view_func, view_args, view_kwargs)
+                if response:
+                    return response
+
+    def process_template_response(self, request, response):
+        if self.is_admin(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_admin(request):
+            for hook in self.exception_hooks:
+                response = hook(request, exception)
+                if response:
+                    return response
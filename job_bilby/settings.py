@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.admindocs',
+    'django.contrib.postgres',
 
     # Vendor
     'rest_framework',
@@ -66,17 +67,26 @@ INSTALLED_APPS = [
     'jobs.apps.JobsConfig',
 ]
 
+# The API authenticates with tokens (see REST_FRAMEWORK), so only the admin
+# runs session based middleware: ADMIN_MIDDLEWARE runs in place of
+# AdminMiddleware for paths under ADMIN_PATHS (see job_bilby/middleware.py)
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'job_bilby.middleware.AdminMiddleware',
+]
+
+ADMIN_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+ADMIN_PATHS = ['/admin/', '/api-auth/']
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 ROOT_URLCONF = 'job_bilby.urls'
@@ -147,11 +157,99 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication, with users cached (see jobs/authentication.py)
+        'jobs.authentication.CachedTokenAuthentication',
+    ),
+    'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',),
+    'DEFAULT_RENDERER_CLASSES': (
+        'jobs.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        # ?format=normalized sideloads nested entities (see jobs/normalize.py)
+        'jobs.renderers.NormalizedJSONRenderer',
+        # Accept: application/vnd.fastjson+json gives orjson's own float
+        # notation (see jobs/fastjson.py)
+        'jobs.renderers.CompactJSONRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'jobs.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
-    'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',)
 }
 
+# JSON library used by the JSON renderers and parser: 'auto' (the fastest
+# installed), 'orjson', 'ujson' or 'json' (the standard library, as DRF).
+# See jobs/fastjson.py
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+
+# Binary responses and requests (Accept/Content-Type: application/msgpack)
+# for mobile clients, when msgpack is installed (see jobs/binary.py)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+if msgpack is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] += ('jobs.renderers.MessagePackRenderer',)
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] += ('jobs.parsers.MessagePackParser',)
+
+
+# Task feeds
+# When enabled, the task list is read from each Profile's materialised feed
+# (see jobs/feed.py). Rebuild every feed with `python manage.py rebuild_feeds`.
+
+TASK_FEED_ENABLED = os.environ.get('TASK_FEED_ENABLED', 'True') == 'True'
+
+# Number of best ranked tasks kept in each feed. Feeds which fall below half of
+# this are topped up by `python manage.py rebuild_feeds --depleted`.
+TASK_FEED_SIZE = int(os.environ.get('TASK_FEED_SIZE', 500))
+
+
+# Task search autocomplete
+# Each process updates its suggestion trie as tasks and skills change, and
+# rebuilds it in the background at least this often (in seconds) to pick up
+# changes made by other processes.
+
+SUGGEST_MAX_AGE = int(os.environ.get('SUGGEST_MAX_AGE', 60))
+
+
+# Serialized fragment cache
+# Representations of profiles and skills are cached per object version (see
+# jobs/fragments.py), in an in-process LRU holding this many fragments, and
+# also in the named cache from CACHES, if one is given.
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 10000))
+FRAGMENT_CACHE_ALIAS = os.environ.get('FRAGMENT_CACHE_ALIAS') or None
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 3600))
+
+
+# Token authentication cache
+# Tokens' users and profiles are cached (see jobs/authentication.py) for
+# AUTH_CACHE_TTL seconds, in an in-process LRU holding this many tokens, and
+# also in the named cache from CACHES, if one is given. Other processes may
+# accept a deleted token, or give a stale profile, until their entry expires.
+# A TTL of 0 turns the cache off.
+
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 10000))
+AUTH_CACHE_ALIAS = os.environ.get('AUTH_CACHE_ALIAS') or None
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 60))
+
+
+# Delta sync
+# Deleted rows are remembered for this many days (see jobs/sync.py); older
+# cursors get every row again. New cursors are taken this many seconds
+# early, so rows saved by transactions still open are given again.
+
+SYNC_TOMBSTONE_MAX_AGE = int(os.environ.get('SYNC_TOMBSTONE_MAX_AGE', 30))
+SYNC_CURSOR_MARGIN = int(os.environ.get('SYNC_CURSOR_MARGIN', 5))
+
+
+# Profile counters
+# Shortlists and completed tasks are counted with single UPDATEs of the
+# Profile. Given a number of shards, increments instead go to that many rows
+# per counter (see jobs/counters.py), so a busy Profile's row is not locked by
+# every increment; the Profile's counters then lag until `flush_counters` runs.
+
+COUNTER_SHARDS = int(os.environ.get('COUNTER_SHARDS', 0))
 
 # Internationalization
 # https://docs.djangoproject.com/en/1.11/topics/i18n/
@@ -25,3 +25,7 @@ from django.apps import AppConfig
 class JobsConfig(AppConfig):
     name = 'jobs'
     verbose_name = "onTask Specific"
+
+    def ready(self):
+        """ Connects the signal receivers that maintain derived data """
+        import jobs.signals
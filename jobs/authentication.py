@@ -0,0 +1,180 @@
+"""job_bilby Cached token authentication
+
+Every API request is authenticated by its token, and nearly every view then
+reads the user's Profile. CachedTokenAuthentication keeps each token's user
+and profile in a two tier cache (an in-process LRU whose entries expire
+after AUTH_CACHE_TTL seconds, and the cache named by AUTH_CACHE_ALIAS, if
+any), so authenticated requests run no queries to find their user.
+
+Entries are dropped when a token is deleted or its user or profile changes
+(see jobs/signals.py). Other processes only drop their own in-process
+entries when they expire, so they may authenticate a deleted token, or give
+a changed profile, for up to AUTH_CACHE_TTL seconds.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from jobs.fragments import LRU
+from jobs.models import Profile
+
+
+def _values(instance):
+    """ Gets the column values of a model instance """
+    return tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+
+
+def _build(model, values):
+    """ Builds a model instance, as if fetched, from its column values """
+    attnames = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(model.objects.db, attnames, values)
+
+
+class TokenCache(object):
+    """ The two tier cache of tokens' users and profiles, counting hits in
+        each tier and misses.
+        Entries hold column values (so they can be pickled, and every request
+        gets its own instances).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configure()
+
+    def configure(self):
+        """ (Re)reads the cache settings, emptying the local tier and
+            resetting the counters
+        """
+        self.local = LRU(getattr(settings, 'AUTH_CACHE_SIZE', 10000))
+        alias = getattr(settings, 'AUTH_CACHE_ALIAS', None)
+        self.shared = caches[alias] if alias else None
+        self.ttl = getattr(settings, 'AUTH_CACHE_TTL', 60)
+        self.hits = self.shared_hits = self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and (self.local.size > 0 or self.shared is not None)
+
+    def shared_key(self, key):
+        return 'token:' + key
+
+    def get(self, key):
+        """ Gets a token's entry, or None """
+        item = self.local.get(key)
+        if item is not None:
+            expires, entry = item
+            if expires > time.monotonic():
+                with self.lock:
+                    self.hits += 1
+                return entry
+        if self.shared is not None:
+            entry = self.shared.get(self.shared_key(key))
+            if entry is not None:
+                self.local.set(key, (time.monotonic() + self.ttl, entry))
+                with self.lock:
+                    self.shared_hits += 1
+                return entry
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, entry):
+        self.local.set(key, (time.monotonic() + self.ttl, entry))
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), entry, self.ttl)
+
+    def delete(self, keys):
+        """ Drops the entries of the given tokens """
+        for key in keys:
+            self.local.delete(key)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self.shared_key(key) for key in keys])
+
+    def stats(self):
+        """ Gets the hit and miss counters, the hit rate and the local tier's
+            size
+        """
+        lookups = self.hits + self.shared_hits + self.misses
+        return OrderedDict([
+            ('hits', self.hits),
+            ('shared_hits', self.shared_hits),
+            ('misses', self.misses),
+            ('hit_rate', (self.hits + self.shared_hits) / lookups if lookups else None),
+            ('size', len(self.local)),
+        ])
+
+
+cache = TokenCache()
+
+
+def invalidate_tokens(keys):
+    """ Drops the cached users of the given tokens """
+    if cache.enabled:
+        cache.delete(list(keys))
+
+
+def invalidate_user(user_id):
+    """ Drops the cached user of each of a user's tokens """
+    if cache.enabled and user_id is not None:
+        cache.delete(list(Token.objects.filter(user_id=user_id).values_list('key', flat=True)))
+
+
+def invalidate_profile(profile_id):
+    """ Drops the cached user of each of a profile's user's tokens """
+    if cache.enabled and profile_id is not None:
+        cache.delete(list(Token.objects.filter(user__profile=profile_id).values_list('key', flat=True)))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ TokenAuthentication reading tokens' users, with their Profile
+        attached, from the token cache
+    """
+
+    def authenticate_credentials(self, key):
+        if not cache.enabled:
+            return super(CachedTokenAuthentication, self).authenticate_credentials(key)
+
+        entry = cache.get(key)
+        if entry is None:
+            try:
+                token = Token.objects.select_related('user__profile').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            try:
+                profile = _values(token.user.profile)
+            except Profile.DoesNotExist:
+                profile = None
+            entry = (_values(token), _values(token.user), profile)
+            cache.set(key, entry)
+
+        token_values, user_values, profile_values = entry
+        token = _build(Token, token_values)
+        user = token.user = _build(User, user_values)
+        if profile_values is not None:
+            user.profile = _build(Profile, profile_values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (user, token)
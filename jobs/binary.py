@@ -0,0 +1,107 @@
+"""job_bilby MessagePack encoding
+
+Responses can be rendered, and request bodies parsed, as MessagePack
+(application/msgpack), a compact binary format which mobile clients decode
+faster than JSON. Datetimes are sent as MessagePack timestamps and decimals
+as an extension type holding their digits, rather than as strings.
+MessagePack support needs the msgpack package; without it only JSON is
+offered.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import datetime
+import decimal
+import uuid
+from django.utils.functional import Promise
+from rest_framework import serializers
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MEDIA_TYPE = 'application/msgpack'
+FORMAT = 'msgpack'
+
+# Extension type of decimals, holding their digits as an ASCII string
+# (eg. b'4.50'). Timestamps use MessagePack's own extension type (-1).
+DECIMAL_EXT = 1
+
+
+def is_available():
+    """ Whether MessagePack can be rendered and parsed """
+    return msgpack is not None
+
+
+def _default(obj):
+    """ Encodes the values MessagePack has no type for """
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(DECIMAL_EXT, str(obj).encode('ascii'))
+    if isinstance(obj, datetime.datetime):
+        # Only aware datetimes are packed as timestamps
+        return obj.isoformat()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (Promise, uuid.UUID)):
+        # Lazy (translated) strings
+        return str(obj)
+    raise TypeError("Cannot encode {!r} as MessagePack".format(obj))
+
+
+def _ext_hook(code, data):
+    if code == DECIMAL_EXT:
+        return decimal.Decimal(data.decode('ascii'))
+    return msgpack.ExtType(code, data)
+
+
+def packb(data):
+    """ Encodes data as MessagePack """
+    return msgpack.packb(data, default=_default, datetime=True, use_bin_type=True)
+
+
+def unpackb(data):
+    """ Decodes MessagePack, with timestamps given as aware datetimes (UTC)
+        and decimals as Decimals
+    """
+    return msgpack.unpackb(data, raw=False, ext_hook=_ext_hook, timestamp=3, strict_map_key=False)
+
+
+def wants_native_values(request):
+    """ Whether the response to a request is rendered in a format holding
+        datetimes and decimals as such (see NativeValuesMixin)
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return getattr(renderer, 'native_values', False)
+
+
+class NativeValuesMixin(object):
+    """ Represents datetimes and decimals as datetime and Decimal objects,
+        rather than strings, in responses rendered by a renderer with
+        native_values set (eg. MessagePack)
+    """
+
+    def get_fields(self):
+        fields = super(NativeValuesMixin, self).get_fields()
+        if not wants_native_values(self.context.get('request')):
+            return fields
+        for field in fields.values():
+            if isinstance(field, serializers.DateTimeField):
+                field.format = None
+            elif isinstance(field, serializers.DecimalField):
+                field.coerce_to_string = False
+        return fields
@@ -0,0 +1,388 @@
+"""job_bilby Compiled read serialization for the Jobs application
+
+Hot read endpoints serialize many rows with the same serializer. Instead of
+running DRF's per-field machinery on model instances for every row, a
+serializer is compiled once (per class, requested fields and annotations)
+into a Python function building each representation from a values_list()
+row. Many relations are fetched with one query per relation.
+
+The output is the same as the serializer's own. Serializers using fields
+which cannot be reproduced this way are not compiled (see NotCompilable),
+and are serialized by DRF as usual.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import itertools
+import json
+import threading
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models.sql.constants import MULTI
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.settings import ISO_8601, api_settings
+from jobs.binary import wants_native_values
+from jobs.fieldsets import get_field_spec
+
+# Parent ids per query, when fetching many relations
+CHUNK_SIZE = 500
+
+# Compiled plans kept, keyed by serializer class, fields, annotations and
+# whether values are given natively (see jobs.binary)
+MAX_PLANS = 256
+
+
+class NotCompilable(Exception):
+    """ Raised when a serializer uses a field the compiled path cannot
+        reproduce exactly
+    """
+
+
+def _datetime(value):
+    """ DateTimeField.to_representation, for ISO 8601 output """
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _field_at(serializer, path):
+    """ Gets the field of a serializer at a path of field names """
+    field = serializer
+    for name in path:
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        field = field.fields[name]
+    return field
+
+
+def _file_converter(field, model_field):
+    """ Represents a file column as its FileField would, given the file name """
+    def convert(name):
+        return field.to_representation(model_field.attr_class(None, model_field, name))
+    return convert
+
+
+def _is_forward(model_field):
+    return model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+
+
+def iter_values(queryset, fields):
+    """ Iterates over queryset.values_list(*fields), reading the rows with a
+        server-side cursor where the database has one.
+        In Django 1.11 QuerySet.iterator() only does so for model instances;
+        the values of every row are fetched at once.
+    """
+    queryset = queryset.values_list(*fields)
+    query = queryset.query
+    compiler = query.get_compiler(queryset.db)
+    chunked = not connections[queryset.db].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+    # Rows hold extra, then field, then annotation columns
+    names = list(query.extra_select) + list(query.values_select) + list(query.annotation_select)
+    order = [names.index(name) for name in fields]
+    for row in compiler.results_iter(compiler.execute_sql(MULTI, chunked_fetch=chunked)):
+        yield tuple(row[index] for index in order)
+
+
+class Plan(object):
+    """ The columns to fetch, and the code building a representation from
+        each row, for one serializer. Field objects (which hold the
+        request) are looked up by path when a plan is bound to a serializer.
+    """
+
+    def __init__(self, model, annotations=(), link=None, through=None):
+        self.model = model
+        self.annotations = frozenset(annotations)
+        # Related objects are looked up by their parent through link: from
+        # the link pairs of a many-to-many through model, if given, or else
+        # from a leading link column in each row
+        self.link = link
+        self.through = through
+        self.columns = [link] if link and not through else []
+        self.lines = []
+        self.names = {'_datetime': _datetime}
+        self.converters = []
+        self.many = []
+        self.pk_index = None
+        self.code = None
+
+    def column(self, lookup):
+        """ Gets the row index of a column, adding it if needed """
+        if lookup not in self.columns:
+            self.columns.append(lookup)
+        return self.columns.index(lookup)
+
+    def name(self, value):
+        """ Gets a name for a value used by the generated code """
+        name = 'k{}'.format(len(self.names))
+        self.names[name] = value
+        return name
+
+    def converter(self, path, kind, model_field=None):
+        """ Gets a name for the converter of the field at path, bound later """
+        name = 'c{}'.format(len(self.converters))
+        self.converters.append((name, path, kind, model_field))
+        return name
+
+    def leaf(self, field, model_field, index, path):
+        """ Gets the expression representing a plain column """
+        value = 'row[{}]'.format(index)
+        if isinstance(field, (serializers.IntegerField, serializers.CharField, serializers.BooleanField)):
+            # The database already gives the represented type
+            return value
+        if (isinstance(field, serializers.ChoiceField) and
+                all(str(key) == choice for key, choice in field.choice_strings_to_values.items())):
+            return value
+        if isinstance(field, serializers.FileField):
+            return '{}({})'.format(self.converter(path, 'file', model_field), value)
+
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if (isinstance(field, serializers.DateTimeField) and
+                isinstance(output_format, str) and output_format.lower() == ISO_8601):
+            convert = '_datetime'
+        elif isinstance(field, (serializers.DecimalField, serializers.DateField,
+                serializers.FloatField, serializers.TimeField)):
+            convert = self.converter(path, 'call')
+        else:
+            raise NotCompilable(field)
+        return '(None if {0} is None else {1}({0}))'.format(value, convert)
+
+    def instance(self, model, prefix, guard):
+        """ Gets the name of a model instance built from the row, for method
+            fields
+        """
+        fields = model._meta.concrete_fields
+        values = ', '.join('row[{}]'.format(self.column(prefix + field.name)) for field in fields)
+        attnames = [field.attname for field in fields]
+        build = self.name(lambda values: model.from_db(None, attnames, values))
+        var = 'o{}'.format(len(self.lines))
+        line = '{} = {}(({},))'.format(var, build, values)
+        if guard is not None:
+            line += ' if row[{}] is not None else None'.format(guard)
+        self.lines.append(line)
+        return var
+
+    def level(self, serializer, model, prefix='', path=(), guard=None):
+        """ Gets the expression representing one (possibly nested) object.
+            guard is the index of the column which is null when the object
+            is missing.
+        """
+        pk_index = self.column(prefix + model._meta.pk.name)
+        if not prefix:
+            self.pk_index = pk_index
+        obj = None
+        items = []
+        for name, field in serializer.fields.items():
+            field_path = path + (name,)
+            source = field.source
+            if isinstance(field, serializers.SerializerMethodField):
+                obj = obj or self.instance(model, prefix, guard)
+                items.append((name, '{}({})'.format(self.converter(field_path, 'call'), obj)))
+                continue
+            if source == '*' or '.' in source:
+                raise NotCompilable(field)
+
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                if not prefix and source in self.annotations:
+                    items.append((name, self.leaf(field, None, self.column(source), field_path)))
+                elif field.default is not empty:
+                    items.append((name, self.name(field.get_default())))
+                elif field.required:
+                    raise NotCompilable(field)
+                continue
+
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if isinstance(nested, serializers.BaseSerializer):
+                if many and not _is_forward(model_field):
+                    items.append((name, self.many_relation(model_field, nested, field_path, pk_index)))
+                elif not many and _is_forward(model_field):
+                    index = self.column(prefix + source)
+                    expression = self.level(nested, model_field.related_model, prefix + source + '__', field_path,
+                        index if model_field.null else guard)
+                    if model_field.null:
+                        expression = '(None if row[{}] is None else {})'.format(index, expression)
+                    items.append((name, expression))
+                else:
+                    raise NotCompilable(field)
+            elif isinstance(field, serializers.ManyRelatedField):
+                if (not isinstance(field.child_relation, serializers.PrimaryKeyRelatedField)
+                        or field.child_relation.pk_field is not None or _is_forward(model_field)):
+                    raise NotCompilable(field)
+                items.append((name, self.many_relation(model_field, None, field_path, pk_index)))
+            elif isinstance(field, serializers.RelatedField):
+                if (type(field) is not serializers.PrimaryKeyRelatedField or field.pk_field is not None
+                        or not _is_forward(model_field)):
+                    raise NotCompilable(field)
+                items.append((name, 'row[{}]'.format(self.column(prefix + source))))
+            elif model_field.concrete and not model_field.is_relation:
+                items.append((name, self.leaf(field, model_field, self.column(prefix + source), field_path)))
+            else:
+                raise NotCompilable(field)
+
+        return '{' + ', '.join('{!r}: {}'.format(name, expression) for name, expression in items) + '}'
+
+    def many_relation(self, model_field, serializer, path, pk_index):
+        """ Gets the expression for a many relation, fetched separately and
+            looked up by the object's id. Relations given as ids have no
+            serializer.
+        """
+        related = model_field.related_model
+        if model_field.many_to_many and model_field.concrete:
+            through = (model_field.remote_field.through, model_field.m2m_field_name(),
+                model_field.m2m_reverse_field_name())
+            child = Plan(related, link=model_field.related_query_name(), through=through)
+        else:
+            child = Plan(related, link=model_field.field.name)
+        if serializer is None:
+            child.pk_index = child.column(related._meta.pk.name)
+            child.finish('row[{}]'.format(child.pk_index))
+        else:
+            child.finish(child.level(serializer, related, path=path))
+        self.many.append((child, pk_index))
+        return '(many[{}].get(row[{}]) or [])'.format(len(self.many) - 1, pk_index)
+
+    def finish(self, expression):
+        """ Compiles the function building a representation from a row """
+        source = 'def represent(row, many):\n'
+        source += ''.join('    {}\n'.format(line) for line in self.lines)
+        source += '    return {}\n'.format(expression)
+        self.code = compile(source, '<compiled {}>'.format(self.model.__name__), 'exec')
+        return self
+
+    def bind(self, serializer):
+        """ Gets the representing function, with converters taken from the
+            fields of a serializer built for the current request
+        """
+        namespace = dict(self.names)
+        for name, path, kind, model_field in self.converters:
+            field = _field_at(serializer, path)
+            if kind == 'file':
+                namespace[name] = _file_converter(field, model_field)
+            else:
+                namespace[name] = field.to_representation
+        exec(self.code, namespace)
+        return namespace['represent']
+
+    def fetch(self, queryset, serializer, keys=()):
+        """ Gets the representations of the rows of a queryset, and the
+            values of the given extra columns in each row
+        """
+        rows = list(queryset.prefetch_related(None).values_list(*(self.columns + list(keys))))
+        return self.represent(rows, serializer), [row[len(self.columns):] for row in rows]
+
+    def iterate(self, queryset, serializer, chunk_size=CHUNK_SIZE):
+        """ Gets the representations of the rows of a queryset, a chunk at a
+            time, reading the rows with a server-side cursor where the
+            database has one
+        """
+        rows = iter_values(queryset.prefetch_related(None), self.columns)
+        chunk = list(itertools.islice(rows, chunk_size))
+        while chunk:
+            yield self.represent(chunk, serializer)
+            chunk = list(itertools.islice(rows, chunk_size))
+
+    def represent(self, rows, serializer):
+        represent = self.bind(serializer)
+        many = [child.fetch_related(rows, index, serializer) for child, index in self.many]
+        return [represent(row, many) for row in rows]
+
+    def fetch_related(self, parent_rows, parent_index, serializer):
+        """ Gets the representations of related objects, by parent id """
+        ids = sorted({row[parent_index] for row in parent_rows if row[parent_index] is not None})
+        represent = self.bind(serializer)
+        related = {}
+        for start in range(0, len(ids), CHUNK_SIZE):
+            chunk = ids[start:start + CHUNK_SIZE]
+            queryset = self.model._default_manager.filter(**{self.link + '__in': chunk})
+            if self.through:
+                # Objects shared by many parents (eg. skills) are fetched once,
+                # and given to each parent in the order they were fetched
+                queryset = queryset.distinct()
+            rows = list(queryset.values_list(*self.columns))
+            many = [child.fetch_related(rows, index, serializer) for child, index in self.many]
+
+            if self.through:
+                through, source, target = self.through
+                represented = {row[self.pk_index]: (position, represent(row, many))
+                    for position, row in enumerate(rows)}
+                links = through.objects.filter(**{source + '__in': chunk}).values_list(source, target)
+                positioned = {}
+                for parent, pk in links:
+                    if pk in represented:
+                        positioned.setdefault(parent, []).append(represented[pk])
+                for parent, objects in positioned.items():
+                    related[parent] = [data for position, data in sorted(objects, key=lambda item: item[0])]
+            else:
+                for row in rows:
+                    related.setdefault(row[0], []).append(represent(row, many))
+        return related
+
+
+class CompiledSerializer(object):
+    """ Serializes querysets with a compiled plan, for one request """
+
+    def __init__(self, plan, serializer):
+        self.plan = plan
+        self.serializer = serializer
+
+    def serialize(self, queryset, keys=None):
+        """ Gets the representations of a queryset's objects. When keys (column
+            or annotation names) are given, also gets their values for each
+            object, as (data, values).
+        """
+        data, values = self.plan.fetch(queryset, self.serializer, keys or ())
+        return data if keys is None else (data, values)
+
+    def iter_serialize(self, queryset, chunk_size=CHUNK_SIZE):
+        """ Gets the representations of a queryset's objects, as lists of at
+            most chunk_size objects, without reading the whole queryset
+        """
+        return self.plan.iterate(queryset, self.serializer, chunk_size)
+
+
+_plans = {}
+_lock = threading.Lock()
+
+
+def compile_serializer(serializer, queryset):
+    """ Gets a CompiledSerializer serializing queryset as serializer would,
+        or None if the serializer cannot be compiled.
+        serializer must be built with the request's context.
+    """
+    tree, expanded = get_field_spec(serializer.context.get('request'))
+    if serializer.context.get('all_fields'):
+        tree, expanded = None, ()
+    annotations = tuple(sorted(queryset.query.annotations))
+    key = (type(serializer), json.dumps(tree, sort_keys=True), tuple(sorted(expanded)), annotations,
+        wants_native_values(serializer.context.get('request')))
+
+    plan = _plans.get(key)
+    if plan is None:
+        try:
+            plan = Plan(queryset.model, annotations)
+            plan.finish(plan.level(serializer, queryset.model))
+        except NotCompilable:
+            plan = False
+        with _lock:
+            if len(_plans) >= MAX_PLANS:
+                _plans.clear()
+            _plans[key] = plan
+    return CompiledSerializer(plan, serializer) if plan else None
@@ -0,0 +1,136 @@
+"""job_bilby Conditional GET for the Jobs application
+
+Detail and list views give an ETag and Last-Modified with each response,
+derived from the updated_at of the objects shown (and of the related objects
+their serializer nests) and, for lists, how many there are. Both come from a
+single aggregate query, run before anything is serialized, so a client which
+already has the current version gets 304 Not Modified cheaply.
+
+Deleting an object from a list does not change the latest updated_at, so
+lists are only checked with If-None-Match (the ETag includes the count).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from jobs.serializers import eager_loading_plan
+
+
+def _related_model(model, path):
+    for name in path.split('__'):
+        model = model._meta.get_field(name).related_model
+    return model
+
+
+def version_lookups(model, serializer):
+    """ Gets the updated_at lookups of the objects a serializer shows: the
+        object's own, and those of the related objects it nests (see
+        eager_loading_plan)
+    """
+    select, prefetch = eager_loading_plan(serializer)
+    paths = set()
+    for lookup in select + prefetch:
+        parts = lookup.split('__')
+        paths.update('__'.join(parts[:end]) for end in range(1, len(parts) + 1))
+
+    lookups = ['updated_at']
+    for path in sorted(paths):
+        related = _related_model(model, path)
+        if any(field.name == 'updated_at' for field in related._meta.concrete_fields):
+            lookups.append(path + '__updated_at')
+    return lookups
+
+
+def get_version(queryset, serializer):
+    """ Gets the latest updated_at of a queryset's objects (and the related
+        objects the serializer nests), and the number of objects
+    """
+    aggregates = {
+        'modified_{}'.format(num): Max(lookup)
+        for num, lookup in enumerate(version_lookups(queryset.model, serializer))
+    }
+    aggregates['count'] = Count('pk', distinct=True)
+    values = queryset.order_by().aggregate(**aggregates)
+    count = values.pop('count')
+    modified = [value for value in values.values() if value is not None]
+    return (max(modified) if modified else None), count
+
+
+def get_etag(request, last_modified, count):
+    """ Gets the ETag of a version of a resource, as shown to this user in
+        the negotiated format
+    """
+    parts = [
+        request.build_absolute_uri(),
+        request.accepted_media_type or '',
+        str(request.user.pk),
+        last_modified.isoformat() if last_modified else '',
+        str(count),
+    ]
+    return '"{}"'.format(hashlib.md5('\n'.join(parts).encode('utf-8')).hexdigest())
+
+
+def check(request, queryset, serializer, single=False):
+    """ Checks the request's preconditions against the current version of
+        the queryset.
+        Returns a 304 (or 412) response if the client's copy is current, and
+        the validator headers to send.
+        single is for detail views: nothing is checked for missing objects,
+        which are left to the view to report.
+    """
+    last_modified, count = get_version(queryset, serializer)
+    if single and not count:
+        return None, {}
+
+    headers = {'ETag': get_etag(request, last_modified, count)}
+    timestamp = None
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified.timestamp())
+        if single:
+            timestamp = int(last_modified.timestamp())
+
+    response = get_conditional_response(request._request, etag=headers['ETag'], last_modified=timestamp)
+    return response, headers
+
+
+def add_headers(response, headers):
+    """ Adds validator headers to a successful (or not modified) response """
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        for name, value in headers.items():
+            response[name] = value
+    return response
+
+
+class ConditionalGetMixin(object):
+    """ Answers GETs for a view's object (or list) with 304 Not Modified when
+        the client has the current version
+    """
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        single = lookup_url_kwarg in self.kwargs
+        if single:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        response, headers = check(request, queryset, self.get_serializer(), single)
+        if response is None:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        return add_headers(response, headers)
@@ -0,0 +1,123 @@
+"""job_bilby Denormalised Counters
+
+Profiles keep running totals (eg. the sum and number of their ratings, or
+the number of tasks they have completed) so that they can be read without
+aggregating other rows. The totals are updated in place as they change (see
+Profile.add_rating and Profile.increment). With settings.COUNTER_SHARDS,
+increments are instead spread over CounterShards, which flush_counters folds
+into the Profiles. The reconcile functions rebuild the totals from the rows
+they count, should they ever drift.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from jobs import authentication
+from jobs.models import CounterShard, Profile, ProfileTask, Task, average_rating
+
+# Number of CounterShards folded per transaction
+FLUSH_BATCH_SIZE = 500
+
+
+def flush_counters():
+    """ Adds the pending CounterShards to their Profiles' counters, and
+        deletes them. Shards written during the flush are left for the next.
+        Returns the number of shards flushed.
+    """
+    last = CounterShard.objects.order_by('-id').values_list('id', flat=True).first()
+    flushed = 0
+    while last is not None:
+        with transaction.atomic():
+            shards = list(CounterShard.objects.select_for_update().filter(id__lte=last).order_by('id')
+                .values_list('id', 'profile_id', 'field', 'count')[:FLUSH_BATCH_SIZE])
+            if not shards:
+                break
+            totals = defaultdict(lambda: defaultdict(int))
+            for _, profile_id, field, count in shards:
+                totals[profile_id][field] += count
+            for profile_id, counts in totals.items():
+                Profile.objects.filter(pk=profile_id).update(
+                    updated_at=now(), **{field: F(field) + count for field, count in counts.items()})
+            CounterShard.objects.filter(id__in=[shard[0] for shard in shards]).delete()
+        authentication.invalidate_tokens(
+            Token.objects.filter(user__profile__in=list(totals)).values_list('key', flat=True))
+        flushed += len(shards)
+    return flushed
+
+
+def _correct(fields, expected, default):
+    """ Sets the given fields of every Profile to their expected values,
+        given by Profile id (or default), writing only the Profiles which
+        differ, a batch at a time. Returns the number of Profiles corrected.
+    """
+    drifted = []
+    profiles = Profile.objects.values_list('id', 'user_id', *fields)
+    for row in profiles.iterator():
+        values = expected.get(row[0], default)
+        if tuple(row[2:]) != values:
+            drifted.append((row[0], row[1], values))
+    for start in range(0, len(drifted), FLUSH_BATCH_SIZE):
+        batch = drifted[start:start + FLUSH_BATCH_SIZE]
+        updates = {}
+        for index, name in enumerate(fields):
+            field = Profile._meta.get_field(name)
+            whens = [When(pk=profile_id, then=Value(values[index], output_field=field))
+                for profile_id, _, values in batch]
+            updates[name] = Case(*whens, default=F(name), output_field=field)
+        Profile.objects.filter(pk__in=[row[0] for row in batch]).update(updated_at=now(), **updates)
+        authentication.invalidate_tokens(
+            Token.objects.filter(user__in=[row[1] for row in batch]).values_list('key', flat=True))
+    return len(drifted)
+
+
+def _rating(rating_sum, rating_count):
+    """ Gets the rating stored for the given totals, rounded half up as the
+        database rounds the rating column
+    """
+    if not rating_count:
+        return Decimal(average_rating(rating_sum, rating_count)).quantize(Decimal('0.01'))
+    return (Decimal(rating_sum) / rating_count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def reconcile_ratings():
+    """ Rebuilds the rating sums, counts and averages of Profiles from their
+        ProfileTasks, in one grouped query. Returns the number of Profiles
+        corrected.
+    """
+    totals = (ProfileTask.objects.filter(rating__isnull=False).order_by().values_list('profile_id')
+        .annotate(Sum('rating'), Count('rating')))
+    expected = {profile_id: (rating_sum, rating_count, _rating(rating_sum, rating_count))
+        for profile_id, rating_sum, rating_count in totals}
+    return _correct(('rating_sum', 'rating_count', 'rating'), expected, (0, 0, _rating(0, 0)))
+
+
+def reconcile_counters():
+    """ Flushes any pending CounterShards, then rebuilds the number of tasks
+        each Profile has completed from their Tasks, in one grouped query.
+        (Shortlists are not recorded elsewhere, so can only be flushed.)
+        Returns the number of Profiles corrected.
+    """
+    flush_counters()
+    totals = (Task.objects.filter(status=Task.COMPLETE, helper__isnull=False).order_by()
+        .values_list('helper_id').annotate(Count('id')))
+    expected = {profile_id: (count,) for profile_id, count in totals}
+    return _correct(('tasks_completed',), expected, (0,))
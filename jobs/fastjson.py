@@ -0,0 +1,132 @@
+"""job_bilby JSON backends
+
+The JSON renderers and parser (see jobs/renderers.py and jobs/parsers.py)
+encode and decode with a faster JSON library when one is installed, with
+the same output as DRF's stdlib based JSONRenderer and JSONParser, which
+remain the fallback. The backend is chosen with the JSON_BACKEND setting:
+'auto' (the first of orjson and ujson installed), 'orjson', 'ujson' or
+'json' (the standard library).
+orjson writes floats in its own notation (eg. 1e16 rather than 1e+16, and
+NaN as null), so it only renders JSON for clients asking for that
+(Accept: application/vnd.fastjson+json, or ?format=fastjson; see
+jobs/renderers.py).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import re
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+
+AUTO = 'auto'
+STDLIB = 'json'
+
+# Requests JSON in the fastest backend's own notation
+MEDIA_TYPE = 'application/vnd.fastjson+json'
+FORMAT = 'fastjson'
+
+# dumps(data, default) gives compact UTF-8 bytes, calling default for
+# objects the backend cannot encode; loads(bytes) raises one of errors on
+# input it cannot read exactly. If exact, dumps raises one of errors on data
+# it would write differently from the standard library
+Backend = namedtuple('Backend', ('name', 'dumps', 'loads', 'errors', 'exact'))
+
+# Maps digits to b'0' and everything else to b' ', so runs of digits can be
+# found with a substring search
+DIGITS = bytes(ord('0') if ord('0') <= byte <= ord('9') else ord(' ') for byte in range(256))
+# 19 digits may be an integer beyond 64 bits
+LONG_NUMBER = b'0' * 19
+# A float with a one digit negative exponent, which ujson writes as 1e-7
+# rather than 1e-07 (may also match text in strings). Starts with a literal
+# so the search skips ahead quickly
+SHORT_EXPONENT = re.compile(rb'e-[0-9](?<=[0-9]e-[0-9])(?![0-9])')
+
+
+def has_long_number(data):
+    """ Whether JSON (bytes) may hold an integer beyond 64 bits """
+    return LONG_NUMBER in data.translate(DIGITS)
+
+
+def _orjson():
+    import orjson
+    # Datetimes are given to default, which formats them as DRF does
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(data, default):
+        return orjson.dumps(data, default=default, option=option)
+
+    def loads(data):
+        # orjson reads integers beyond 64 bits as floats
+        if has_long_number(data):
+            raise ValueError("Integer may be beyond 64 bits")
+        return orjson.loads(data)
+    return Backend('orjson', dumps, loads, (ValueError,), False)
+
+
+def _ujson():
+    import ujson
+
+    def dumps(data, default):
+        # NaN and infinite floats raise OverflowError
+        ret = ujson.dumps(data, default=default, ensure_ascii=False,
+            escape_forward_slashes=False, allow_nan=False).encode('utf-8')
+        if SHORT_EXPONENT.search(ret):
+            raise ValueError("Float may be written differently")
+        return ret
+    # ujson rejects integers beyond 64 bits
+    return Backend('ujson', dumps, ujson.loads, (ValueError, OverflowError), True)
+
+
+# Backends, fastest first
+BACKENDS = OrderedDict([
+    ('orjson', _orjson),
+    ('ujson', _ujson),
+])
+
+_backends = {}
+
+
+def load_backend(name):
+    """ Gets the named backend, or None if it is not installed """
+    if name not in _backends:
+        try:
+            _backends[name] = BACKENDS[name]()
+        except ImportError:
+            _backends[name] = None
+    return _backends[name]
+
+
+def get_backend(exact=False):
+    """ Gets the configured backend, or None to use the standard library.
+        If exact, only a backend writing the same JSON as the standard
+        library is given.
+    """
+    name = getattr(settings, 'JSON_BACKEND', AUTO)
+    if name == STDLIB:
+        return None
+    if name == AUTO:
+        for name in BACKENDS:
+            backend = load_backend(name)
+            if backend is not None and (backend.exact or not exact):
+                return backend
+        return None
+    if name not in BACKENDS:
+        raise ValueError("Unknown JSON_BACKEND {!r}".format(name))
+    backend = load_backend(name)
+    if backend is not None and exact and not backend.exact:
+        return None
+    return backend
@@ -0,0 +1,330 @@
+"""job_bilby Materialised task feeds for the Jobs application
+
+Maintains one ranked list of Open Tasks per Profile (FeedEntry rows), so the
+task list can be read with a single indexed range scan instead of ranking
+every Open Task on each request. A feed is the head of its Profile's task
+list: at most the TASK_FEED_SIZE best ranked Tasks, so the table grows with the
+number of Profiles, not Profiles x Tasks. Unless the feed holds the whole list
+(Profile.feed_complete), the rest of the list is ranked on the fly when it is
+read (see TaskList in jobs/views.py).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from collections import Counter
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, Exists, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from jobs import ranking, skillmask
+from jobs.models import FeedEntry, Profile, ProfileSkill, ProfileTask, Task
+
+# Maximum number of rows inserted per statement when (re)building feeds
+BATCH_SIZE = 1000
+
+# Task columns the rank in a feed is computed from. Saving a Task without
+# changing any of them leaves the feeds alone
+RANKED_FIELDS = ('status', 'location', 'skill_mask', 'skill_count')
+
+
+def is_enabled():
+    """ Whether the task list is read from the materialised feeds """
+    return getattr(settings, 'TASK_FEED_ENABLED', True)
+
+
+def feed_size():
+    """ The number of best ranked Tasks kept in each Profile's feed """
+    return getattr(settings, 'TASK_FEED_SIZE', 500)
+
+
+def _chunks(ids, size=BATCH_SIZE // 2):
+    """ Splits a list of ids into lists small enough for an IN clause """
+    ids = list(ids)
+    return [ids[start:start + size] for start in range(0, len(ids), size)]
+
+
+def _bulk_create(entries):
+    """ Inserts FeedEntry rows in batches the database backend can accept """
+    fields = [field for field in FeedEntry._meta.concrete_fields if not field.primary_key]
+    batch_size = min(BATCH_SIZE, max(connection.ops.bulk_batch_size(fields, entries), 1))
+    FeedEntry.objects.bulk_create(entries, batch_size=batch_size)
+
+
+def feed_for(profile):
+    """ Gets the Tasks in a Profile's feed, annotated with their rank.
+        Ordered by relevance, then by which task is more recent.
+    """
+    return Task.objects.filter(feed_entries__profile=profile).annotate(
+        rank=F('feed_entries__rank'),
+        task_created_at=F('feed_entries__task_created_at')
+    ).order_by('-rank', '-task_created_at', '-id')
+
+
+def is_complete(profile):
+    """ Whether a Profile's feed holds every Task of their list. Read from the
+        database, as the Profile may be a cached copy.
+    """
+    return bool(Profile.objects.filter(pk=profile.pk).values_list('feed_complete', flat=True).first())
+
+
+def ranked_profiles(task):
+    """ Gets (profile id, rank) pairs for every Profile that has not
+        interacted with the Task.
+    """
+    return _ranked_profiles(task).values_list('id', 'rank')
+
+
+def _ranked_profiles(task):
+    """ Gets the Profiles that have not interacted with the Task, annotated
+        with its rank for each.
+        The rank is the same as TaskQuerySet.ranked_for, computed from the
+        Task's side using the Profile skill masks.
+    """
+    # matched - (skill_count - matched)
+    matched = skillmask.matched_count(task.skill_mask)
+    if skillmask.has_overflow(task.skill_mask):
+        # Also match the Task's Skills without a bit
+        matched = matched + skillmask.overflow_count(
+            ProfileSkill.objects.filter(profile=OuterRef('pk')), 'profile',
+            Task.skills.through.objects.filter(task=task, skill__bit=None).values('skill_id'))
+    skill_score = matched * 2 - task.skill_count
+
+    location_bonus = Case(
+        When(location__iexact=task.location, then=Value(3)),
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+    return Profile.objects.exclude(profiletask__task=task).annotate(
+        rank=ExpressionWrapper(skill_score + location_bonus, output_field=IntegerField()))
+
+
+def _ranked_below(rank, created_at, task_id):
+    """ Filters feed entries which come after a Task with the given rank,
+        creation time and id in the task list (ordered by rank, then newest)
+    """
+    return (Q(rank__lt=rank) | Q(rank=rank, task_created_at__lt=created_at) |
+        Q(rank=rank, task_created_at=created_at, task_id__lt=task_id))
+
+
+def rebuild_profile_feed(profile):
+    """ Replaces every entry in a Profile's feed with its best ranked Tasks.
+        Called when the Profile is created, or its skills or location change.
+    """
+    # The skill mask may have changed since the profile was loaded
+    profile.refresh_from_db(fields=['skill_mask', 'location'])
+
+    tasks = (Task.objects.filter(status=Task.OPEN).not_interacted_with(profile).ranked_for(profile)
+        .order_by('-rank', '-created_at', '-id')[:feed_size()])
+
+    entries = [
+        FeedEntry(profile_id=profile.id, task_id=task_id, rank=rank, task_created_at=created_at)
+        for task_id, rank, created_at in tasks.values_list('id', 'rank', 'created_at')
+    ]
+
+    with transaction.atomic():
+        FeedEntry.objects.filter(profile=profile).delete()
+        _bulk_create(entries)
+        profile.feed_complete = len(entries) < feed_size()
+        Profile.objects.filter(pk=profile.pk).update(feed_complete=profile.feed_complete)
+
+
+def rebuild_all_feeds(vectorized=False, chunk_size=256):
+    """ Rebuilds the feed of every Profile. Returns the number of feeds built.
+        When vectorized, every feed is ranked in bulk by the RankingEngine
+        (which requires NumPy and SciPy), chunk_size Profiles at a time.
+    """
+    if vectorized:
+        return _rebuild_all_feeds_vectorized(chunk_size)
+
+    count = 0
+    for profile in Profile.objects.only('id', 'location').iterator():
+        rebuild_profile_feed(profile)
+        count += 1
+    return count
+
+
+def rebuild_depleted_feeds():
+    """ Rebuilds the incomplete feeds which have fallen below half of
+        TASK_FEED_SIZE entries (as their Tasks were interacted with or
+        closed), so the next best Tasks take their place. Returns the number
+        of feeds built.
+    """
+    profiles = Profile.objects.filter(feed_complete=False).annotate(
+        entries=Count('feed_entries')).filter(entries__lt=feed_size() // 2)
+    count = 0
+    for profile in profiles.only('id', 'location').iterator():
+        rebuild_profile_feed(profile)
+        count += 1
+    return count
+
+
+def refill_feed(profile):
+    """ Rebuilds an incomplete feed which has fallen below half of
+        TASK_FEED_SIZE entries, as rebuild_depleted_feeds does. Returns
+        whether it was rebuilt.
+    """
+    if FeedEntry.objects.filter(profile=profile).count() >= feed_size() // 2:
+        return False
+    rebuild_profile_feed(profile)
+    return True
+
+
+def _replace_feeds(profile_ids, entries):
+    """ Replaces every entry in the given Profiles' feeds. Feeds given fewer
+        than TASK_FEED_SIZE entries hold every Task, so are complete.
+    """
+    counts = Counter(entry.profile_id for entry in entries)
+    complete = set(profile_id for profile_id in profile_ids if counts[profile_id] < feed_size())
+    with transaction.atomic():
+        for ids in _chunks(profile_ids):
+            FeedEntry.objects.filter(profile_id__in=ids).delete()
+            Profile.objects.filter(pk__in=ids).update(feed_complete=Case(
+                When(pk__in=[profile_id for profile_id in ids if profile_id in complete], then=Value(True)),
+                default=Value(False)))
+        _bulk_create(entries)
+
+
+def _rebuild_all_feeds_vectorized(chunk_size):
+    """ Rebuilds every feed from one RankingEngine pass.
+        Entries are written a batch at a time as the engine yields each
+        Profile's best ranked Tasks, so only one batch is held in memory.
+    """
+    engine = ranking.RankingEngine.from_database()
+    created_at = dict(zip(engine.task_ids.tolist(), engine.task_created_at))
+    count = 0
+    profile_ids, entries = [], []
+    for profile_id, ranked in engine.top_tasks(feed_size(), chunk_size):
+        profile_ids.append(profile_id)
+        entries.extend(
+            FeedEntry(profile_id=profile_id, task_id=task_id, rank=rank, task_created_at=created_at[task_id])
+            for task_id, rank in ranked
+        )
+        if len(entries) >= BATCH_SIZE or len(profile_ids) >= BATCH_SIZE:
+            _replace_feeds(profile_ids, entries)
+            count += len(profile_ids)
+            profile_ids, entries = [], []
+    if profile_ids:
+        _replace_feeds(profile_ids, entries)
+        count += len(profile_ids)
+    return count
+
+
+def _trim_feeds(profiles):
+    """ Drops the worst ranked entry from each of the given Profiles' feeds
+        holding more than TASK_FEED_SIZE entries, which then no longer hold
+        every Task
+    """
+    entries = FeedEntry.objects.filter(profile=OuterRef('pk')).order_by()
+    counts = entries.values('profile').annotate(count=Count('id')).values('count')
+    worst = entries.order_by('rank', 'task_created_at', 'task_id').values('id')[:1]
+    over = profiles.annotate(entries=Subquery(counts, output_field=IntegerField())).filter(
+        entries__gt=feed_size())
+    Profile.objects.filter(pk__in=over.filter(feed_complete=True).values('pk')).update(feed_complete=False)
+    FeedEntry.objects.filter(id__in=over.annotate(worst_id=Subquery(worst)).values('worst_id')).delete()
+
+
+def add_task(task):
+    """ Adds an Open Task to the feeds it belongs in: complete feeds, and
+        feeds with an entry it ranks above, so every feed stays the head of
+        its Profile's list. Feeds left with more than TASK_FEED_SIZE entries
+        drop their worst one.
+        Profiles are picked, and the entries written, in SQL, however many
+        Profiles there are.
+    """
+    if task.status != Task.OPEN:
+        return
+
+    below = FeedEntry.objects.filter(_ranked_below(OuterRef('rank'), task.created_at, task.id),
+        profile=OuterRef('pk'))
+    profiles = _ranked_profiles(task).annotate(ranks_above=Exists(below)).filter(
+        Q(feed_complete=True) | Q(ranks_above=True))
+    select, params = profiles.order_by().values_list('id', 'rank').query.sql_with_params()
+
+    opts = FeedEntry._meta
+    qn = connection.ops.quote_name
+    sql = (
+        'INSERT INTO {table} ({profile}, {rank}, {task}, {created_at}) '
+        'SELECT {id}, {rank}, %s, %s FROM ({select}) {alias}'
+    ).format(
+        table=qn(opts.db_table),
+        profile=qn(opts.get_field('profile').column), rank=qn('rank'), task=qn(opts.get_field('task').column),
+        created_at=qn(opts.get_field('task_created_at').column), id=qn('id'), select=select, alias=qn('profile'),
+    )
+    created_at = opts.get_field('task_created_at').get_db_prep_save(task.created_at, connection)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [task.id, created_at] + list(params))
+        _trim_feeds(Profile.objects.filter(feed_entries__task=task))
+
+
+def ranked_values(task_id):
+    """ Gets the stored values of a Task's RANKED_FIELDS, or None if the Task
+        has not been saved
+    """
+    return Task.objects.filter(pk=task_id).values_list(*RANKED_FIELDS).first()
+
+
+def remove_task(task):
+    """ Removes a Task from every feed """
+    FeedEntry.objects.filter(task=task).delete()
+
+
+def refresh_task(task):
+    """ Re-ranks a Task in every feed (eg. when its skills or location change).
+        Tasks which are no longer Open are removed from every feed.
+    """
+    with transaction.atomic():
+        remove_task(task)
+        add_task(task)
+
+
+def remove_entry(profile_id, task_id):
+    """ Removes a Task from one Profile's feed
+        (eg. once the Profile has shortlisted, discarded or applied for it)
+    """
+    FeedEntry.objects.filter(profile_id=profile_id, task_id=task_id).delete()
+
+
+def remove_entries(profile_id, task_ids):
+    """ Removes several Tasks from one Profile's feed """
+    FeedEntry.objects.filter(profile_id=profile_id, task_id__in=list(task_ids)).delete()
+
+
+def restore_entry(profile_id, task_id):
+    """ Puts a Task back into one Profile's feed, if it is still Open and the
+        Profile no longer has a ProfileTask for it.
+    """
+    if ProfileTask.objects.filter(profile_id=profile_id, task_id=task_id).exists():
+        return
+
+    profile = Profile.objects.filter(pk=profile_id).first()
+    task = Task.objects.filter(pk=task_id, status=Task.OPEN).ranked_for(profile).first() if profile else None
+    if task is None:
+        return
+    # As in add_task, an incomplete feed only takes the Task if it ranks
+    # above one of its entries
+    below = FeedEntry.objects.filter(_ranked_below(task.rank, task.created_at, task.id), profile_id=profile_id)
+    if not profile.feed_complete and not below.exists():
+        return
+
+    entry, created = FeedEntry.objects.get_or_create(
+        profile_id=profile_id,
+        task_id=task_id,
+        defaults={'rank': task.rank, 'task_created_at': task.created_at}
+    )
+    if created:
+        _trim_feeds(Profile.objects.filter(pk=profile_id))
@@ -0,0 +1,159 @@
+"""job_bilby Sparse fieldsets for the Jobs application
+
+Read endpoints can be asked for only some fields:
+
+    ?fields=title,offer,owner.photo,owner.user.first_name
+
+Nested fields are selected with dotted paths. A nested relation named
+without any of its own fields is given as its id, unless it is also listed
+in ?expand=, in which case it is given in full:
+
+    ?fields=title,owner&expand=owner
+
+Unrequested columns are also deferred in the database query (see
+only_fields).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _split(value):
+    return [path.split('.') for path in value.split(',') if path.strip()]
+
+
+def get_field_spec(request):
+    """ Gets the requested fields of a request as a tree of field names
+        ({'owner': {'user': {'first_name': {}}}}), and the set of expanded
+        paths (as tuples). The tree is None when every field was requested.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, frozenset()
+    cached = getattr(request, '_field_spec', None)
+    if cached is not None:
+        return cached
+
+    params = request.query_params
+    expanded = frozenset(tuple(path) for path in _split(params.get(EXPAND_PARAM, '')))
+    tree = None
+    if params.get(FIELDS_PARAM):
+        tree = {}
+        for path in _split(params[FIELDS_PARAM]) + [list(path) for path in expanded]:
+            node = tree
+            for name in path:
+                node = node.setdefault(name.strip(), {})
+
+    request._field_spec = (tree, expanded)
+    return request._field_spec
+
+
+class DynamicFieldsMixin(object):
+    """ Prunes a serializer's fields to those requested with ?fields= (and
+        ?expand=) on read requests. Nested serializers find their part of
+        the request by their path from the root serializer.
+    """
+
+    def get_path(self):
+        """ Gets the field names leading from the root serializer to this one """
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return tuple(reversed(path))
+
+    def get_requested(self):
+        """ Gets the tree of requested fields below this serializer, or None
+            for every field
+        """
+        if self.context.get('all_fields'):
+            return None
+        tree, expanded = get_field_spec(self.context.get('request'))
+        for name in self.get_path():
+            if tree is None:
+                return None
+            tree = tree.get(name)
+            if not tree:
+                # Only reached when the relation was expanded
+                return None
+        return tree
+
+    def get_fields(self):
+        fields = super(DynamicFieldsMixin, self).get_fields()
+        requested = self.get_requested()
+        if requested is None:
+            return fields
+
+        _, expanded = get_field_spec(self.context.get('request'))
+        path = self.get_path()
+        kept = type(fields)()
+        for name, field in fields.items():
+            if name not in requested:
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if (isinstance(nested, serializers.BaseSerializer) and not requested[name]
+                    and path + (name,) not in expanded):
+                # Relation given as its id
+                source = field.source if field.source not in (None, name) else None
+                kwargs = {'source': source} if source else {}
+                field = serializers.PrimaryKeyRelatedField(read_only=True, many=many, **kwargs)
+            kept[name] = field
+        return kept
+
+
+def is_nested(field):
+    field = field.child if isinstance(field, serializers.ListSerializer) else field
+    return isinstance(field, serializers.BaseSerializer)
+
+
+def only_fields(serializer, model, prefix=''):
+    """ Gets the lookups of the columns a (pruned) serializer reads, for
+        QuerySet.only(), following nested serializers of forward relations.
+        Returns None when they cannot be known (eg. a method field).
+    """
+    lookups = [prefix + model._meta.pk.name]
+    for name, field in serializer.fields.items():
+        source = field.source
+        if source == '*':
+            # Method fields are assumed to read the column they are named after
+            source = name
+        try:
+            model_field = model._meta.get_field(source.split('.')[0])
+        except FieldDoesNotExist:
+            if field.source == '*':
+                return None
+            # Annotations are always selected
+            continue
+
+        if model_field.many_to_many or model_field.one_to_many:
+            # Prefetched separately
+            continue
+        lookups.append(prefix + model_field.name)
+        if is_nested(field) and model_field.is_relation:
+            nested = only_fields(field, model_field.related_model, prefix + model_field.name + '__')
+            if nested is None:
+                return None
+            lookups += nested
+    return lookups
@@ -0,0 +1,188 @@
+"""job_bilby Serialized fragment cache for the Jobs application
+
+The representations of frequently nested objects (profiles and skills) are
+cached per object version: keyed by the serializer (and the fields it was
+asked for), the object's primary key and its updated_at. Changing a row
+changes its updated_at, so stale fragments are never read; they fall out of
+the cache instead.
+
+Fragments are kept in an in-process LRU (FRAGMENT_CACHE_SIZE), and, when
+FRAGMENT_CACHE_ALIAS names one of CACHES, in that shared cache too.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from jobs.binary import wants_native_values
+from jobs.fieldsets import DynamicFieldsMixin, get_field_spec
+from jobs.normalize import is_normalized
+
+
+class LRU(object):
+    """ A thread safe mapping holding at most `size` items, dropping the
+        least recently used
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class FragmentCache(object):
+    """ The two tier fragment cache, counting hits in each tier and misses """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.configure()
+
+    def configure(self):
+        """ (Re)reads the cache settings, emptying the local tier and
+            resetting the counters
+        """
+        self.local = LRU(getattr(settings, 'FRAGMENT_CACHE_SIZE', 10000))
+        alias = getattr(settings, 'FRAGMENT_CACHE_ALIAS', None)
+        self.shared = caches[alias] if alias else None
+        self.timeout = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600)
+        self.hits = self.shared_hits = self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.local.size > 0 or self.shared is not None
+
+    def shared_key(self, key):
+        return 'fragment:' + hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """ Gets a fragment, or None """
+        data = self.local.get(key)
+        if data is not None:
+            with self.lock:
+                self.hits += 1
+            return data
+        if self.shared is not None:
+            data = self.shared.get(self.shared_key(key))
+            if data is not None:
+                self.local.set(key, data)
+                with self.lock:
+                    self.shared_hits += 1
+                return data
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, data):
+        self.local.set(key, data)
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), data, self.timeout)
+
+    def stats(self):
+        """ Gets the hit and miss counters, and the local tier's size """
+        return OrderedDict([
+            ('hits', self.hits),
+            ('shared_hits', self.shared_hits),
+            ('misses', self.misses),
+            ('size', len(self.local)),
+        ])
+
+
+cache = FragmentCache()
+
+
+class FragmentCacheMixin(object):
+    """ Serializers of models with an updated_at, whose representations are
+        read from (and written to) the fragment cache. The representation
+        must only change when the object's updated_at does.
+        Cached fragments are shared, and must not be modified.
+    """
+
+    def get_fragment_signature(self):
+        """ Gets what, besides the object, the representation depends on:
+            the serializer, the fields asked for, the server's url and
+            whether values are given natively (see jobs.binary)
+        """
+        request = self.context.get('request')
+        requested, expanded = None, ()
+        if isinstance(self, DynamicFieldsMixin):
+            path = self.get_path()
+            requested = self.get_requested()
+            if requested is not None:
+                expanded = sorted(p[len(path):] for p in get_field_spec(request)[1] if p[:len(path)] == path)
+        return (
+            type(self).__module__ + '.' + type(self).__name__,
+            json.dumps(requested, sort_keys=True),
+            tuple(expanded),
+            request.build_absolute_uri('/') if request is not None else '',
+            wants_native_values(request),
+        )
+
+    def get_fragment_key(self, instance):
+        """ Gets the cache key of an object's representation, or None if it
+            is not cached
+        """
+        if not cache.enabled or instance.pk is None or 'updated_at' in instance.get_deferred_fields():
+            return None
+        # Normalised responses collect the nested objects as they are
+        # serialized
+        if is_normalized(self.context.get('request')):
+            return None
+        signature = getattr(self, '_fragment_signature', None)
+        if signature is None:
+            signature = self._fragment_signature = self.get_fragment_signature()
+        return signature + (instance.pk, instance.updated_at.isoformat())
+
+    def to_representation(self, instance):
+        key = self.get_fragment_key(instance)
+        if key is None:
+            return super(FragmentCacheMixin, self).to_representation(instance)
+        data = cache.get(key)
+        if data is None:
+            data = super(FragmentCacheMixin, self).to_representation(instance)
+            cache.set(key, data)
+        return data
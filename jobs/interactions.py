@@ -0,0 +1,168 @@
+"""job_bilby Bulk Interactions
+
+Makes a batch of a Profile's interactions with Tasks (shortlisting,
+discarding or applying), eg. as they swipe through their feed, with a fixed
+number of queries: the Tasks and the Profile's ProfileTasks for them are
+read in one, new ProfileTasks are created in one, and existing ones are
+updated in one. Each interaction is checked as jobs.transitions would check
+it on its own, in the order given.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from collections import OrderedDict
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.utils.timezone import now
+from rest_framework import status
+from jobs import feed
+from jobs.models import ProfileTask, Task
+from jobs.transitions import PROFILE_TASK_TRANSITIONS, TransitionError, check_statuses
+
+# The interactions a batch can make, which are the names of their transitions
+ACTIONS = ('shortlist', 'discard', 'apply')
+
+# Most interactions in one batch
+MAX_BATCH_SIZE = 100
+
+# Errors given when a Profile interacts with their own Task
+OWNER_ERRORS = {
+    'shortlist': "A profile cannot shortlist their own task!",
+    'apply': "A profile cannot apply to their own task!",
+}
+
+# Columns an interaction may set, besides the status
+CHANGED_FIELDS = ('answer1', 'answer2', 'answer3', 'quote', 'datetime_applied')
+
+
+class Result(object):
+    """ The outcome of one interaction: the HTTP status it would have had on
+        its own, and its ProfileTask or error
+    """
+
+    def __init__(self, task_id, action, code=None, error=None):
+        self.task_id = task_id
+        self.action = action
+        self.code = code
+        self.error = error
+        self.profile_task = None
+
+
+def interact(profile_id, interactions):
+    """ Makes a Profile's interactions, given as (task_id, action, changes)
+        in order, where changes are the application's details.
+        Returns a Result for each.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _interact(profile_id, interactions)
+        except IntegrityError:
+            # A ProfileTask was created concurrently, so read it and retry
+            if attempt:
+                raise
+
+
+def _interact(profile_id, interactions):
+    task_ids = {task_id for task_id, _, _ in interactions}
+    profile_tasks = ProfileTask.objects.filter(profile_id=profile_id, task=OuterRef('pk')).order_by()
+    rows = (Task.objects.select_for_update().filter(pk__in=task_ids).order_by('pk')
+        .annotate(profile_task_id=Subquery(profile_tasks.values('id')[:1]),
+            profile_task_status=Subquery(profile_tasks.values('status')[:1]))
+        .values_list('id', 'status', 'owner_id', 'profile_task_id', 'profile_task_status'))
+
+    # The state each Task's ProfileTask is left in by the interactions so far
+    states = OrderedDict()
+    for task_id, task_status, owner_id, profile_task_id, profile_task_status in rows:
+        states[task_id] = {'task_status': task_status, 'owner_id': owner_id, 'id': profile_task_id,
+            'read_status': profile_task_status, 'status': profile_task_status, 'changes': {}, 'results': []}
+
+    results = []
+    applied_at = now()
+    for task_id, action, changes in interactions:
+        result = Result(task_id, action)
+        results.append(result)
+        state = states.get(task_id)
+        if state is None:
+            result.code, result.error = status.HTTP_404_NOT_FOUND, "Not found."
+            continue
+        if action in OWNER_ERRORS and state['owner_id'] == profile_id:
+            result.code, result.error = status.HTTP_400_BAD_REQUEST, OWNER_ERRORS[action]
+            continue
+        try:
+            transition = check_statuses(PROFILE_TASK_TRANSITIONS, action, state['status'], state['task_status'])
+        except TransitionError as error:
+            result.code, result.error = status.HTTP_400_BAD_REQUEST, str(error)
+            continue
+        created = state['status'] is None
+        result.code = status.HTTP_200_OK if action == 'discard' and not created else status.HTTP_201_CREATED
+        state['status'] = transition.target
+        if action == 'apply':
+            state['changes'].update(changes, datetime_applied=applied_at)
+        state['results'].append(result)
+
+    written = {task_id: state for task_id, state in states.items() if state['results']}
+    _create(profile_id, {task_id: state for task_id, state in written.items() if state['id'] is None})
+    _update({task_id: state for task_id, state in written.items() if state['id'] is not None})
+
+    saved = ProfileTask.objects.filter(profile_id=profile_id, task_id__in=list(written))
+    saved = {profile_task.task_id: profile_task for profile_task in saved}
+    for task_id, state in written.items():
+        profile_task = saved.get(task_id)
+        for result in state['results']:
+            if profile_task is None or profile_task.status != state['status']:
+                # Changed by another request since it was read
+                result.code = status.HTTP_400_BAD_REQUEST
+                result.error = PROFILE_TASK_TRANSITIONS[result.action].error
+            else:
+                result.profile_task = profile_task
+    return results
+
+
+def _create(profile_id, states):
+    """ Creates the ProfileTasks of the given Tasks, in one query """
+    if not states:
+        return
+    ProfileTask.objects.bulk_create([
+        ProfileTask(profile_id=profile_id, task_id=task_id, status=state['status'], **state['changes'])
+        for task_id, state in states.items()
+    ])
+    # As post_save would for each
+    feed.remove_entries(profile_id, states)
+
+
+def _update(states):
+    """ Updates the existing ProfileTasks of the given Tasks, in one query.
+        Rows whose status has changed since they were read are left alone.
+    """
+    if not states:
+        return
+    unchanged = Q()
+    for state in states.values():
+        unchanged |= Q(pk=state['id'], status=state['read_status'])
+
+    def column(name, values):
+        field = ProfileTask._meta.get_field(name)
+        whens = [When(pk=profile_task_id, then=Value(value, output_field=field)) for profile_task_id, value in values]
+        return Case(*whens, default=F(name), output_field=field)
+
+    updates = {'status': column('status', [(state['id'], state['status']) for state in states.values()])}
+    for name in CHANGED_FIELDS:
+        values = [(state['id'], state['changes'][name]) for state in states.values() if name in state['changes']]
+        if values:
+            updates[name] = column(name, values)
+    ProfileTask.objects.filter(unchanged).update(updated_at=now(), **updates)
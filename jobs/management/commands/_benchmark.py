@@ -0,0 +1,139 @@
+"""job_bilby Shared helpers for the benchmark management commands
+
+Benchmarks create their own data inside a transaction which is rolled back
+once they finish, so they can be run against any database.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import random
+import time
+from contextlib import contextmanager
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from jobs import skillmask
+from jobs.models import Profile, ProfileSkill, ProfileTask, Skill, Task
+
+LOCATIONS = ['Melbourne', 'Sydney', 'Brisbane', 'Perth', 'Adelaide', 'Hobart', 'Darwin', 'Canberra']
+
+
+@contextmanager
+def rolled_back():
+    """ Runs the block in a transaction which is always rolled back """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def time_call(func, repeat):
+    """ Calls func `repeat` times. Returns the time taken by each call, in ms """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def summarise(times):
+    """ Formats the median and 95th percentile of a list of times (in ms) """
+    times = sorted(times)
+    median = times[len(times) // 2]
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    return "median {:8.2f} ms   p95 {:8.2f} ms".format(median, p95)
+
+
+def bulk_create(model, objs):
+    """ Bulk creates objs in batches small enough for any database backend """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    batch_size = min(500, max(connection.ops.bulk_batch_size(fields, objs), 1))
+    model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+def create_profile(username, location=''):
+    """ Creates a User (and so a Profile). Returns the Profile """
+    user = User.objects.create(username=username, first_name=username, last_name='Bench')
+    profile = user.profile
+    profile.location = location
+    profile.save()
+    return profile
+
+
+def create_skills(count):
+    """ Creates `count` Skills (each assigned a skill bit). Returns a list of
+        their ids.
+    """
+    skill_ids = []
+    for num in range(count):
+        skill = Skill(title="Bench skill {}".format(num), code="b{}".format(num))
+        skill.save()
+        skill_ids.append(skill.id)
+    return skill_ids
+
+
+def create_tasks(owner, count, skill_ids, skills_per_task=3, seed=0):
+    """ Bulk creates `count` Open Tasks for owner, each with random skills and
+        a random location. Returns a list of their ids.
+        Bulk creation skips signals, so derived data (eg. feeds) must be
+        rebuilt by the caller. Skill masks are set here.
+    """
+    rand = random.Random(seed)
+    bits = dict(Skill.objects.filter(id__in=skill_ids).values_list('id', 'bit'))
+    task_skills = [
+        rand.sample(skill_ids, min(skills_per_task, len(skill_ids))) for _ in range(count)
+    ]
+
+    last_id = Task.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    bulk_create(Task, [
+        Task(
+            title="Bench task {}".format(num),
+            description="Benchmark task {}".format(num),
+            offer=rand.randint(0, 500),
+            location=rand.choice(LOCATIONS),
+            owner=owner,
+            skill_mask=skillmask.mask_of(bits[skill_id] for skill_id in task_skills[num]),
+            skill_count=len(task_skills[num])
+        )
+        for num in range(count)
+    ])
+    task_ids = list(Task.objects.filter(owner=owner, id__gt=last_id).order_by('id').values_list('id', flat=True))
+
+    Through = Task.skills.through
+    bulk_create(Through, [
+        Through(task_id=task_id, skill_id=skill_id)
+        for task_id, skills in zip(task_ids, task_skills)
+        for skill_id in skills
+    ])
+    return task_ids
+
+
+def add_profile_skills(profile, skill_ids):
+    """ Lists the given skills on a Profile """
+    bulk_create(ProfileSkill, [
+        ProfileSkill(profile=profile, skill_id=skill_id) for skill_id in skill_ids
+    ])
+    profile.update_skill_mask()
+
+
+def add_profile_tasks(profile, task_ids, status=ProfileTask.DISCARDED):
+    """ Bulk creates ProfileTasks for a Profile, as if they had interacted with
+        each of the given Tasks.
+    """
+    bulk_create(ProfileTask, [
+        ProfileTask(profile=profile, task_id=task_id, status=status) for task_id in task_ids
+    ])
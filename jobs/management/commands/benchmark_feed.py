@@ -0,0 +1,65 @@
+"""job_bilby Benchmark of task list reads: materialised feed vs ranking on the fly
+
+Usage: python manage.py benchmark_feed [--tasks 10000] [--skills 30] [--repeat 20]
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.core.management.base import BaseCommand
+from jobs import feed
+from jobs.models import Task
+from jobs.management.commands._benchmark import (
+    add_profile_skills, create_profile, create_skills, create_tasks,
+    rolled_back, summarise, time_call
+)
+
+
+class Command(BaseCommand):
+    help = "Compares task list read latency from the materialised feed against ranking every open task"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help="Number of open tasks")
+        parser.add_argument('--skills', type=int, default=30, help="Number of skills")
+        parser.add_argument('--page', type=int, default=50, help="Number of tasks read per page")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of timed reads")
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            poster = create_profile('bench_poster', 'Sydney')
+            viewer = create_profile('bench_viewer', 'Melbourne')
+            skill_ids = create_skills(options['skills'])
+            create_tasks(poster, options['tasks'], skill_ids)
+            add_profile_skills(viewer, skill_ids[::3])
+            feed.rebuild_profile_feed(viewer)
+
+            def live():
+                """ Ranks every open task the viewer hasn't interacted with """
+                return Task.objects.filter(status=Task.OPEN).not_interacted_with(viewer).ranked_for(
+                    viewer).order_by('-rank', '-created_at')
+
+            page = options['page']
+            reads = [
+                ("ranked on the fly, first page", lambda: list(live().values_list('id', flat=True)[:page])),
+                ("materialised feed, first page", lambda: list(feed.feed_for(viewer).values_list('id', flat=True)[:page])),
+                ("ranked on the fly, all tasks", lambda: list(live().values_list('id', flat=True))),
+                ("materialised feed, all tasks", lambda: list(feed.feed_for(viewer).values_list('id', flat=True))),
+            ]
+
+            self.stdout.write("{} open tasks, {} skills".format(options['tasks'], options['skills']))
+            for name, read in reads:
+                times = time_call(read, options['repeat'])
+                self.stdout.write("{:32} {}".format(name, summarise(times)))
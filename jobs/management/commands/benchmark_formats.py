@@ -0,0 +1,83 @@
+"""job_bilby Response format benchmark
+
+Compares JSON with MessagePack (see jobs/binary.py) on the task list and
+applicant list payloads: encode time, decode time and payload size.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import gzip
+import io
+from django.core.management.base import BaseCommand, CommandError
+from jobs.parsers import FastJSONParser
+from jobs.renderers import FastJSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from jobs import binary
+from jobs.models import ProfileTask, Task
+from jobs.parsers import MessagePackParser
+from jobs.renderers import MessagePackRenderer
+from jobs.serializers import ApplicantSerializer, TaskGetSerializer, eager_load
+from jobs.management.commands._benchmark import (
+    add_profile_tasks, create_profile, create_skills, create_tasks, rolled_back, summarise, time_call
+)
+
+
+class Command(BaseCommand):
+    help = "Compares JSON and MessagePack encode and decode times and payload sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000, help="Number of tasks (and applicants) listed")
+        parser.add_argument('--repeat', type=int, default=10, help="Number of timed runs of each step")
+
+    def handle(self, *args, **options):
+        if not binary.is_available():
+            raise CommandError("MessagePack needs the msgpack package")
+        formats = (
+            ('JSON', FastJSONRenderer(), FastJSONParser()),
+            ('MessagePack', MessagePackRenderer(), MessagePackParser()),
+        )
+
+        with rolled_back():
+            poster = create_profile('bench_poster', 'Sydney')
+            task_ids = create_tasks(poster, options['tasks'], create_skills(30))
+            # One applicant per task, each applying to the first task
+            for num in range(options['tasks']):
+                add_profile_tasks(create_profile('bench_helper{}'.format(num)), task_ids[:1], ProfileTask.APPLIED)
+
+            payloads = (
+                ('tasks', TaskGetSerializer, Task.objects.filter(owner=poster)),
+                ('applicants', ApplicantSerializer,
+                    ProfileTask.objects.filter(task=task_ids[0]).order_by('-profile__rating', '-created_at')),
+            )
+            for payload, serializer_class, queryset in payloads:
+                self.stdout.write("{} ({} rows)".format(payload, queryset.count()))
+                for name, renderer, parser in formats:
+                    # Serializers give native values to binary renderers
+                    request = Request(APIRequestFactory().get('/'))
+                    request.accepted_renderer = renderer
+                    context = {'request': request}
+                    data = serializer_class(eager_load(queryset, serializer_class(context=context)),
+                        many=True, context=context).data
+
+                    content = renderer.render(data)
+                    encode = time_call(lambda: renderer.render(data), options['repeat'])
+                    decode = time_call(lambda: parser.parse(io.BytesIO(content)), options['repeat'])
+                    self.stdout.write("  {:12} {:9d} bytes ({:8d} gzipped)".format(
+                        name, len(content), len(gzip.compress(content))))
+                    self.stdout.write("  {:12} encode {}".format('', summarise(encode)))
+                    self.stdout.write("  {:12} decode {}".format('', summarise(decode)))
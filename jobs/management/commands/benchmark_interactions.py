@@ -0,0 +1,66 @@
+"""job_bilby Benchmark of the task list as a helper's interaction history grows
+
+Usage: python manage.py benchmark_interactions [--tasks 2000] [--history 0,100,1000,10000]
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.core.management.base import BaseCommand
+from jobs.models import ProfileTask, Task
+from jobs.management.commands._benchmark import (
+    add_profile_skills, add_profile_tasks, create_profile, create_skills, create_tasks,
+    rolled_back, summarise, time_call
+)
+
+
+class Command(BaseCommand):
+    help = "Measures ranked task list latency for helpers with growing numbers of ProfileTasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000, help="Number of open tasks left in the list")
+        parser.add_argument('--history', default='0,100,1000,10000',
+            help="Comma separated numbers of ProfileTasks to measure at")
+        parser.add_argument('--page', type=int, default=50, help="Number of tasks read per page")
+        parser.add_argument('--repeat', type=int, default=20, help="Number of timed reads")
+
+    def handle(self, *args, **options):
+        history_sizes = sorted(int(size) for size in options['history'].split(','))
+
+        with rolled_back():
+            poster = create_profile('bench_poster', 'Sydney')
+            viewer = create_profile('bench_viewer', 'Melbourne')
+            skill_ids = create_skills(30)
+            create_tasks(poster, options['tasks'], skill_ids)
+            add_profile_skills(viewer, skill_ids[::3])
+
+            def task_list():
+                """ The live task list query, as run by TaskList """
+                tasks = Task.objects.filter(status=Task.OPEN).not_interacted_with(viewer).ranked_for(viewer)
+                return list(tasks.order_by('-rank', '-created_at').values_list('id', flat=True)[:options['page']])
+
+            self.stdout.write("{} open tasks not yet interacted with".format(options['tasks']))
+            interacted = 0
+            for size in history_sizes:
+                # Interact with more (open) tasks, leaving the same number
+                # of tasks in the list
+                new_task_ids = create_tasks(poster, size - interacted, skill_ids, seed=size)
+                add_profile_tasks(viewer, new_task_ids)
+                interacted = size
+                assert ProfileTask.objects.filter(profile=viewer).count() == size
+
+                times = time_call(task_list, options['repeat'])
+                self.stdout.write("{:6} ProfileTasks   {}".format(size, summarise(times)))
@@ -0,0 +1,70 @@
+"""job_bilby JSON backend benchmark
+
+Compares the throughput of rendering and parsing the task list with DRF's
+JSONRenderer and JSONParser, and with each installed JSON backend (see
+jobs/fastjson.py), checking they give the same output. Backends writing
+floats in their own notation are timed with CompactJSONRenderer.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import io
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from jobs import fastjson
+from jobs.models import Task
+from jobs.parsers import FastJSONParser
+from jobs.renderers import CompactJSONRenderer, FastJSONRenderer
+from jobs.serializers import TaskGetSerializer, eager_load
+from jobs.management.commands._benchmark import create_profile, create_skills, create_tasks, rolled_back, time_call
+
+
+class Command(BaseCommand):
+    help = "Measures JSON rendering and parsing throughput with each installed JSON backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help="Number of tasks rendered")
+        parser.add_argument('--repeat', type=int, default=5, help="Number of timed runs of each step")
+
+    def handle(self, *args, **options):
+        context = {'request': Request(APIRequestFactory().get('/tasks/'))}
+        with rolled_back():
+            poster = create_profile('bench_poster', 'Sydney')
+            create_tasks(poster, options['tasks'], create_skills(30))
+            queryset = eager_load(Task.objects.filter(owner=poster), TaskGetSerializer(context=context))
+            data = TaskGetSerializer(queryset, many=True, context=context).data
+
+        content = JSONRenderer().render(data)
+        expected = JSONParser().parse(io.BytesIO(content))
+        self.stdout.write("{} tasks, {} bytes".format(options['tasks'], len(content)))
+
+        paths = [('DRF', None, JSONRenderer(), JSONParser())]
+        backends = [(name, fastjson.load_backend(name)) for name in fastjson.BACKENDS]
+        paths += [(name, name, FastJSONRenderer() if backend.exact else CompactJSONRenderer(), FastJSONParser())
+            for name, backend in backends if backend is not None]
+        for name, backend, renderer, parser in paths:
+            with override_settings(JSON_BACKEND=backend or fastjson.STDLIB):
+                if renderer.render(data) != content or parser.parse(io.BytesIO(content)) != expected:
+                    raise CommandError("{} gave different JSON".format(name))
+                render = min(time_call(lambda: renderer.render(data), options['repeat']))
+                parse = min(time_call(lambda: parser.parse(io.BytesIO(content)), options['repeat']))
+            self.stdout.write("{:8} render {:10.0f} rows/s   parse {:10.0f} rows/s".format(
+                name, options['tasks'] / render * 1000, options['tasks'] / parse * 1000))
@@ -0,0 +1,87 @@
+"""job_bilby Middleware benchmark
+
+Compares the per-request overhead of the full middleware stack every request
+used to go through with the API's lean stack (see job_bilby/middleware.py).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from jobs import views
+from jobs.management.commands._benchmark import summarise, time_call
+
+# The stack before the admin middleware was split out
+FULL_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+class Handler(BaseHandler):
+    """ Runs requests through the middleware only: the view middleware is
+        called for an API view, which is not run
+    """
+    view = staticmethod(views.SkillList.as_view())
+
+    def _get_response(self, request):
+        for hook in self._view_middleware:
+            response = hook(request, self.view, (), {})
+            if response:
+                return response
+        return HttpResponse(b'[]', content_type='application/json')
+
+
+class Command(BaseCommand):
+    help = "Measures the middleware overhead of API requests, with the full and the API stack"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=10000, help="Number of requests timed")
+        parser.add_argument('--repeat', type=int, default=5, help="Number of timed runs")
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        headers = {'HTTP_AUTHORIZATION': 'Token 0123456789abcdef', 'HTTP_ORIGIN': 'http://localhost'}
+        requests = (
+            ('GET', lambda: factory.get('/skills/', **headers)),
+            ('POST', lambda: factory.post('/tasks/create/', b'{}', content_type='application/json', **headers)),
+        )
+        stacks = (('full', FULL_MIDDLEWARE), ('api', settings.MIDDLEWARE))
+
+        for method, make_request in requests:
+            for name, middleware in stacks:
+                with override_settings(MIDDLEWARE=middleware):
+                    handler = Handler()
+                    handler.load_middleware()
+                batch = [make_request() for _ in range(options['requests'])]
+
+                def run():
+                    for request in batch:
+                        handler.get_response(request)
+                times = time_call(run, options['repeat'])
+                per_request = min(times) * 1000 / options['requests']
+                self.stdout.write("{:5} {:5} {:8.1f} us/request   ({})".format(
+                    method, name, per_request, summarise(times)))
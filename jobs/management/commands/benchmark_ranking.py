@@ -0,0 +1,85 @@
+"""job_bilby Batch ranking benchmark
+
+Times the vectorised RankingEngine on synthetic profile and task skill data,
+without touching the database.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import time, tracemalloc
+from django.core.management.base import BaseCommand, CommandError
+from jobs import ranking
+from jobs.management.commands._benchmark import LOCATIONS
+
+
+class Command(BaseCommand):
+    help = "Times top-K batch ranking of synthetic profiles against synthetic tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100000, help="Number of profiles")
+        parser.add_argument('--tasks', type=int, default=100000, help="Number of open tasks")
+        parser.add_argument('--skills', type=int, default=60, help="Number of skills")
+        parser.add_argument('--skills-per-row', type=int, default=3, help="Skills per profile and per task")
+        parser.add_argument('--top-k', type=int, default=50, help="Number of tasks kept per profile")
+        parser.add_argument('--chunk-size', type=int, default=256, help="Number of profiles ranked per block")
+        parser.add_argument('--limit', type=int, help="Only rank this many profiles, and extrapolate")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _incidence(self, rows, skills, per_row, random):
+        """ A random rows x skills 0/1 matrix with per_row skills in each row """
+        np, sparse = ranking.np, ranking.sparse
+        columns = np.argsort(random.random_sample((rows, skills)), axis=1)[:, :per_row].ravel()
+        indptr = np.arange(0, rows * per_row + 1, per_row)
+        data = np.ones(rows * per_row, dtype=np.int32)
+        return sparse.csr_matrix((data, columns, indptr), shape=(rows, skills))
+
+    def handle(self, *args, **options):
+        if not ranking.is_available():
+            raise CommandError("Batch ranking requires NumPy and SciPy")
+        np = ranking.np
+        random = np.random.RandomState(options['seed'])
+        profiles, tasks = options['profiles'], options['tasks']
+
+        started = time.perf_counter()
+        engine = ranking.RankingEngine(
+            profile_ids=np.arange(1, profiles + 1),
+            profile_skills=self._incidence(profiles, options['skills'], options['skills_per_row'], random),
+            profile_locations=[LOCATIONS[i] for i in random.randint(len(LOCATIONS), size=profiles)],
+            task_ids=np.arange(1, tasks + 1),
+            task_skills=self._incidence(tasks, options['skills'], options['skills_per_row'], random),
+            task_locations=[LOCATIONS[i] for i in random.randint(len(LOCATIONS), size=tasks)],
+            task_created_at=random.permutation(tasks),
+        )
+        setup = time.perf_counter() - started
+
+        ranked = options['limit'] or profiles
+        tracemalloc.start()
+        started = time.perf_counter()
+        for count, _ in enumerate(engine.top_tasks(options['top_k'], options['chunk_size']), 1):
+            if count >= ranked:
+                break
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stdout.write("{} profiles x {} tasks, {} skills, top {}".format(
+            profiles, tasks, options['skills'], options['top_k']))
+        self.stdout.write("setup {:.2f}s, ranked {} profiles in {:.2f}s ({:.0f} profiles/s)".format(
+            setup, count, elapsed, count / elapsed))
+        if count < profiles:
+            self.stdout.write("extrapolated to all profiles: {:.1f}s".format(elapsed * profiles / count))
+        self.stdout.write("peak memory while ranking {:.0f} MB ({} profiles per chunk)".format(
+            peak / 2.0 ** 20, options['chunk_size']))
@@ -0,0 +1,74 @@
+"""job_bilby Serializer benchmark
+
+Compares serializing tasks with TaskGetSerializer and with its compiled read
+path (jobs.compiled), reporting rows serialized per second.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from jobs import fragments
+from jobs.compiled import compile_serializer
+from jobs.models import Task
+from jobs.serializers import TaskGetSerializer, eager_load
+from jobs.management.commands._benchmark import create_profile, create_skills, create_tasks, rolled_back
+
+
+class Command(BaseCommand):
+    help = "Measures task serialization throughput, with and without the compiled read path"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help="Number of tasks serialized")
+        parser.add_argument('--repeat', type=int, default=3, help="Number of timed runs of each path")
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/tasks/'))
+        context = {'request': request}
+        renderer = JSONRenderer()
+
+        with rolled_back():
+            poster = create_profile('bench_poster', 'Sydney')
+            create_tasks(poster, options['tasks'], create_skills(30))
+            queryset = Task.objects.filter(owner=poster)
+
+            def serializer():
+                """ The task list as serialized by DRF """
+                tasks = eager_load(queryset, TaskGetSerializer(context=context))
+                return renderer.render(TaskGetSerializer(tasks, many=True, context=context).data)
+
+            def compiled():
+                """ The task list as serialized by the compiled read path """
+                return renderer.render(compile_serializer(TaskGetSerializer(context=context), queryset).serialize(queryset))
+
+            if serializer() != compiled():
+                raise CommandError("The compiled read path gave different JSON")
+
+            self.stdout.write("{} tasks".format(options['tasks']))
+            for name, func in (('TaskGetSerializer', serializer), ('compiled', compiled)):
+                best = None
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    func()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write("{:20} {:10.0f} rows/s".format(name, options['tasks'] / best))
+            self.stdout.write("Fragment cache: {}".format(
+                ', '.join('{} {}'.format(name, value) for name, value in fragments.cache.stats().items())))
@@ -0,0 +1,106 @@
+"""job_bilby Streaming memory benchmark
+
+Compares the peak memory of serializing a task list whole with streaming it
+(see jobs/streaming.py), for growing numbers of tasks.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import gc
+import time
+import tracemalloc
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from jobs.renderers import FastJSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from jobs import streaming
+from jobs.compiled import compile_serializer
+from jobs.models import Task
+from jobs.serializers import TaskGetSerializer, eager_load
+from jobs.management.commands._benchmark import create_profile, create_skills, create_tasks, rolled_back
+
+
+def measure(func):
+    """ Calls func, tracing allocations. Returns its result, the peak memory
+        allocated while it ran (in MB) and the time taken (in s)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak / (1024 * 1024), elapsed
+
+
+class Command(BaseCommand):
+    help = "Measures the peak memory of whole and streamed task lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000',
+            help="Comma separated numbers of tasks listed")
+        parser.add_argument('--chunk-size', type=int, default=streaming.CHUNK_SIZE,
+            help="Number of tasks serialized at a time when streaming")
+
+    def handle(self, *args, **options):
+        counts = sorted(int(count) for count in options['rows'].split(','))
+        if settings.DEBUG:
+            raise CommandError("Run with DEBUG off; Django keeps every query in memory when it is on")
+
+        def get_request(**extra):
+            return Request(APIRequestFactory().get('/tasks/', **extra))
+
+        with rolled_back():
+            poster = create_profile('bench_poster', 'Sydney')
+            skill_ids = create_skills(30)
+            created = 0
+            self.stdout.write("{:>8} {:>12} {:>10} {:>12} {:>10} {:>12} {:>10}".format(
+                'rows', 'whole MB', 'rows/s', 'streamed MB', 'rows/s', 'gzipped MB', 'rows/s'))
+
+            for count in counts:
+                create_tasks(poster, count - created, skill_ids, seed=count)
+                created = count
+                queryset = Task.objects.filter(owner=poster).order_by('id')
+
+                def whole():
+                    """ The list serialized and rendered in one piece """
+                    request = get_request()
+                    serializer = TaskGetSerializer(context={'request': request})
+                    compiled = compile_serializer(serializer, queryset)
+                    if compiled is None:
+                        data = TaskGetSerializer(eager_load(queryset, serializer), many=True,
+                            context=serializer.context).data
+                    else:
+                        data = compiled.serialize(queryset)
+                    return len(FastJSONRenderer().render(data))
+
+                def streamed(**extra):
+                    """ The list streamed, consumed as a client would """
+                    request = get_request(**extra)
+                    serializer = TaskGetSerializer(context={'request': request})
+                    response = streaming.streaming_response(request, queryset, serializer, options['chunk_size'])
+                    return sum(len(part) for part in response.streaming_content)
+
+                results = [measure(whole), measure(streamed), measure(lambda: streamed(HTTP_ACCEPT_ENCODING='gzip'))]
+                if results[0][0] != results[1][0]:
+                    raise CommandError("The streamed list differs in length from the whole list")
+                self.stdout.write("{:>8} {}".format(count, ' '.join(
+                    "{:12.1f} {:10.0f}".format(peak, count / elapsed) for _, peak, elapsed in results)))
@@ -0,0 +1,31 @@
+"""job_bilby Flush counters
+
+Adds the pending counter shards (see COUNTER_SHARDS) to their Profiles.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.core.management.base import BaseCommand
+from jobs import counters
+
+
+class Command(BaseCommand):
+    help = "Adds pending counter shards to their Profiles' counters"
+
+    def handle(self, *args, **options):
+        count = counters.flush_counters()
+        self.stdout.write(self.style.SUCCESS("Flushed {} counter shard(s)".format(count)))
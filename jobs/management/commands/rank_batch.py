@@ -0,0 +1,58 @@
+"""job_bilby Batch ranking command
+
+Writes the top ranked Tasks for every Profile (or top ranked Profiles for every
+Task) as JSON lines, using the vectorised RankingEngine.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import json
+from django.core.management.base import BaseCommand, CommandError
+from jobs import ranking
+
+
+class Command(BaseCommand):
+    help = "Ranks every open task against every profile in bulk and writes the top K of each as JSON lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per', choices=['profile', 'task'], default='profile',
+            help="Top tasks per profile, or top profiles per task")
+        parser.add_argument('--top-k', type=int, default=50, help="Number of results kept per row")
+        parser.add_argument('--chunk-size', type=int, default=256, help="Number of rows ranked per block")
+        parser.add_argument('--include-interacted', action='store_true',
+            help="Also rank pairs that already have a ProfileTask")
+        parser.add_argument('--output', help="File to write to (defaults to stdout)")
+
+    def handle(self, *args, **options):
+        if not ranking.is_available():
+            raise CommandError("Batch ranking requires NumPy and SciPy")
+        if options['top_k'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--top-k and --chunk-size must be positive")
+
+        engine = ranking.RankingEngine.from_database(exclude_interacted=not options['include_interacted'])
+        if options['per'] == 'profile':
+            key, results = 'profile', engine.top_tasks(options['top_k'], options['chunk_size'])
+        else:
+            key, results = 'task', engine.top_profiles(options['top_k'], options['chunk_size'])
+
+        output = open(options['output'], 'w') if options['output'] else self.stdout
+        try:
+            for row_id, ranked in results:
+                output.write(json.dumps({key: row_id, 'ranked': ranked}) + '\n')
+        finally:
+            if options['output']:
+                output.close()
@@ -0,0 +1,54 @@
+"""job_bilby Management command to rebuild the materialised task feeds
+
+Usage: python manage.py rebuild_feeds [--profile <id> | --depleted | --vectorized]
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.core.management.base import BaseCommand, CommandError
+from jobs import feed, ranking
+from jobs.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the ranked task feed of every Profile (or of one Profile)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', type=int, help="Only rebuild the feed of this Profile id")
+        parser.add_argument('--depleted', action='store_true',
+            help="Only rebuild the feeds with fewer than half of TASK_FEED_SIZE entries")
+        parser.add_argument('--vectorized', action='store_true',
+            help="Rank every feed in bulk with NumPy/SciPy sparse matrices")
+        parser.add_argument('--chunk-size', type=int, default=256,
+            help="Number of Profiles ranked per block when vectorized")
+
+    def handle(self, *args, **options):
+        if options['profile'] is not None:
+            try:
+                profile = Profile.objects.get(pk=options['profile'])
+            except Profile.DoesNotExist:
+                raise CommandError("Profile {} does not exist".format(options['profile']))
+            feed.rebuild_profile_feed(profile)
+            count = 1
+        elif options['depleted']:
+            count = feed.rebuild_depleted_feeds()
+        else:
+            if options['vectorized'] and not ranking.is_available():
+                raise CommandError("--vectorized requires NumPy and SciPy")
+            count = feed.rebuild_all_feeds(vectorized=options['vectorized'], chunk_size=options['chunk_size'])
+
+        self.stdout.write(self.style.SUCCESS("Rebuilt {} feed(s)".format(count)))
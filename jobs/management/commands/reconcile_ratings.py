@@ -0,0 +1,32 @@
+"""job_bilby Reconcile ratings
+
+Rebuilds the rating sums, counts and averages of Profiles from the ratings
+of their ProfileTasks, correcting any that have drifted.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.core.management.base import BaseCommand
+from jobs import counters
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the rating totals of Profiles from their ProfileTasks"
+
+    def handle(self, *args, **options):
+        count = counters.reconcile_ratings()
+        self.stdout.write(self.style.SUCCESS("Corrected the ratings of {} profile(s)".format(count)))
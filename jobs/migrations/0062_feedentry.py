@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 19:28
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0061_auto_20171014_1312'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField()),
+                ('task_created_at', models.DateTimeField()),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='jobs.Profile')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='jobs.Task')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedentry',
+            unique_together=set([('profile', 'task')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='feedentry',
+            index_together=set([('profile', 'rank', 'task_created_at')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 19:30
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0062_feedentry'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='profiletask',
+            index_together=set([('profile', 'task')]),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 19:33
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# Masks are stored in signed 64 bit integer columns, so Skills get bits 0-62.
+# The sign bit flags masks which include Skills without a bit
+MAX_SKILL_BITS = 63
+OVERFLOW = -(1 << MAX_SKILL_BITS)
+
+
+def populate_skill_masks(apps, schema_editor):
+    """ Assigns a bit to each existing Skill (up to MAX_SKILL_BITS of them),
+        then calculates the skill masks of every Task and Profile.
+    """
+    Skill = apps.get_model('jobs', 'Skill')
+    Task = apps.get_model('jobs', 'Task')
+    Profile = apps.get_model('jobs', 'Profile')
+    ProfileSkill = apps.get_model('jobs', 'ProfileSkill')
+
+    skill_ids = list(Skill.objects.order_by('id').values_list('id', flat=True))
+    bits = {}
+    for bit, skill_id in enumerate(skill_ids[:MAX_SKILL_BITS]):
+        Skill.objects.filter(pk=skill_id).update(bit=bit)
+        bits[skill_id] = bit
+
+    def value(skill_id):
+        return (1 << bits[skill_id]) if skill_id in bits else OVERFLOW
+
+    task_masks = {}
+    task_counts = {}
+    for task_id, skill_id in Task.skills.through.objects.values_list('task_id', 'skill_id'):
+        task_masks[task_id] = task_masks.get(task_id, 0) | value(skill_id)
+        task_counts[task_id] = task_counts.get(task_id, 0) + 1
+    for task_id, mask in task_masks.items():
+        Task.objects.filter(pk=task_id).update(skill_mask=mask, skill_count=task_counts[task_id])
+
+    profile_masks = {}
+    for profile_id, skill_id in ProfileSkill.objects.values_list('profile_id', 'skill_id'):
+        profile_masks[profile_id] = profile_masks.get(profile_id, 0) | value(skill_id)
+    for profile_id, mask in profile_masks.items():
+        Profile.objects.filter(pk=profile_id).update(skill_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0063_profiletask_profile_task_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='skill_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='skill_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='skill_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_skill_masks, migrations.RunPython.noop),
+    ]
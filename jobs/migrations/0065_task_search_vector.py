@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 19:43
+from __future__ import unicode_literals
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# The search vectors and their GIN index only exist on PostgreSQL; on other
+# databases the column is left empty and search falls back to ILIKE
+POPULATE_SQL = """
+UPDATE jobs_task SET search_vector =
+    setweight(to_tsvector('english', coalesce(jobs_task.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce((
+        SELECT string_agg(jobs_skill.title, ' ')
+        FROM jobs_skill
+        INNER JOIN jobs_task_skills ON jobs_task_skills.skill_id = jobs_skill.id
+        WHERE jobs_task_skills.task_id = jobs_task.id
+    ), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(jobs_task.location, '') || ' ' ||
+        coalesce(auth_user.first_name, '') || ' ' || coalesce(auth_user.last_name, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce(jobs_task.description, '')), 'D')
+FROM jobs_profile
+INNER JOIN auth_user ON auth_user.id = jobs_profile.user_id
+WHERE jobs_profile.id = jobs_task.owner_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """ Adds the GIN index and fills in the vectors of every existing Task """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE INDEX jobs_task_search_vector_gin ON jobs_task USING gin (search_vector)")
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS jobs_task_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0064_skill_masks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
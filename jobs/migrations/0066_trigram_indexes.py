@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:05
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# Trigram indexes for fuzzy search; only created on PostgreSQL
+INDEXES = [
+    ('jobs_task_title_trgm', 'jobs_task', 'title'),
+    ('jobs_task_location_trgm', 'jobs_task', 'location'),
+    ('jobs_skill_title_trgm', 'jobs_skill', 'title'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in INDEXES:
+        schema_editor.execute("CREATE INDEX {} ON {} USING gin ({} gin_trgm_ops)".format(name, table, column))
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute("DROP INDEX IF EXISTS {}".format(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0065_task_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
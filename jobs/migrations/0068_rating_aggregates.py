@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:42
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    """ Fills in the rating sums and counts of every Profile with ratings """
+    Profile = apps.get_model('jobs', 'Profile')
+    ProfileTask = apps.get_model('jobs', 'ProfileTask')
+    totals = (ProfileTask.objects.filter(rating__isnull=False).order_by().values('profile_id')
+        .annotate(rating_sum=Sum('rating'), rating_count=Count('rating')))
+    for total in totals:
+        Profile.objects.filter(pk=total['profile_id']).update(
+            rating_sum=total['rating_sum'], rating_count=total['rating_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0067_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 20:50
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def keep_order(profile_task):
+    """ Sorts the ProfileTask to keep first: the assigned one, then a rated
+        one, then the most recently updated
+    """
+    return (profile_task.status != 'AS', profile_task.rating is None, -profile_task.updated_at.timestamp(),
+        -profile_task.id)
+
+
+def remove_duplicates(apps, schema_editor):
+    """ Keeps one ProfileTask per profile and task, and recomputes the rating
+        totals of profiles which lost a rated duplicate
+    """
+    Profile = apps.get_model('jobs', 'Profile')
+    ProfileTask = apps.get_model('jobs', 'ProfileTask')
+    duplicated = (ProfileTask.objects.order_by().values_list('profile_id', 'task_id')
+        .annotate(count=Count('id')).filter(count__gt=1))
+    rerated = set()
+    for profile_id, task_id, _ in duplicated:
+        profile_tasks = sorted(ProfileTask.objects.filter(profile_id=profile_id, task_id=task_id), key=keep_order)
+        duplicates = profile_tasks[1:]
+        if any(profile_task.rating is not None for profile_task in duplicates):
+            rerated.add(profile_id)
+        ProfileTask.objects.filter(id__in=[profile_task.id for profile_task in duplicates]).delete()
+
+    default = Profile._meta.get_field('rating').default
+    for profile_id in rerated:
+        totals = ProfileTask.objects.filter(profile_id=profile_id, rating__isnull=False).aggregate(
+            rating_sum=Sum('rating'), rating_count=Count('rating'))
+        rating_sum, rating_count = totals['rating_sum'] or 0, totals['rating_count']
+        Profile.objects.filter(pk=profile_id).update(rating_sum=rating_sum, rating_count=rating_count,
+            rating=rating_sum / float(rating_count) if rating_count else default)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0069_counter_shards'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        # The index is dropped first, as Django cannot tell it from the unique
+        # constraint on the same columns
+        migrations.AlterIndexTogether(
+            name='profiletask',
+            index_together=set([]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='profiletask',
+            unique_together=set([('profile', 'task')]),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.4 on 2026-10-17 21:35
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0070_unique_profile_task'),
+    ]
+
+    operations = [
+        # Existing feeds are taken to hold only the best ranked Tasks, until
+        # they are rebuilt
+        migrations.AddField(
+            model_name='profile',
+            name='feed_complete',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
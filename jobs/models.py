@@ -18,16 +18,34 @@ Date project started: 6/8/2017
 Date project completed: 15/10/2017
 """
 from __future__ import unicode_literals
-from django.db import models
+import random
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Case, Count, Exists, ExpressionWrapper, F, FloatField, IntegerField, OuterRef, Sum, Value, When
+)
+from django.db.models.functions import Cast
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils.timezone import now
 from rest_framework.authtoken.models import Token
+from jobs import skillmask
+
+def average_rating(rating_sum, rating_count):
+    """ Gets a Profile's rating from the sum and number of its ratings """
+    if not rating_count:
+        return Profile._meta.get_field('rating').default
+    return rating_sum / float(rating_count)
+
 
 class BaseModel(models.Model):
     """ The base model provides basic attributes that all models inherit """
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Indexed for delta sync (see jobs.sync), which reads rows changed
+    # since a cursor
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     enabled = models.BooleanField(default=True, verbose_name='active')
 
     class Meta:
@@ -52,42 +70,151 @@ class Profile(BaseModel):
     description = models.TextField(max_length=2000, blank=True)
     photo = models.ImageField(upload_to='%Y/%m/%d/', blank=True, null=True)
     rating = models.DecimalField(max_digits=5, decimal_places=2, default=3.0)
+    # Sum and number of the ratings of the Profile's ProfileTasks, kept by
+    # add_rating. rating is their average (or the default, without ratings).
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_count = models.IntegerField(default=0, editable=False)
     shortlists = models.IntegerField(default=0)
     tasks_completed = models.IntegerField(default=0)
 
+    # Bitmask of the Profile's skills (see jobs.skillmask).
+    # Maintained from ProfileSkill by update_skill_mask.
+    skill_mask = models.BigIntegerField(default=0, editable=False)
+
+    # Whether the Profile's feed holds every Task of their list, rather than
+    # only the best ranked ones (see jobs.feed). Maintained by jobs.feed.
+    feed_complete = models.BooleanField(default=False, editable=False)
+
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        """ Leaves feed_complete alone when an existing Profile is saved, so
+            a stale copy cannot overwrite it
+        """
+        if not args and not self._state.adding and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'feed_complete']
+        super(Profile, self).save(*args, **kwargs)
+
+    def update_skill_mask(self):
+        """ Recalculates skill_mask from the Profile's ProfileSkills.
+            Only the mask (and updated_at) columns are written.
+        """
+        bits = Skill.objects.filter(profileskill__profile=self).values_list('bit', flat=True)
+        self.skill_mask = skillmask.mask_of(bits)
+        self.updated_at = now()
+        Profile.objects.filter(pk=self.pk).update(skill_mask=self.skill_mask, updated_at=self.updated_at)
+
+    def add_rating(self, rating, replaces=None):
+        """ Adds a rating to the Profile's average, in place of the rating it
+            replaces when a ProfileTask is rated again. Either may be None, eg.
+            to remove the rating of a deleted ProfileTask.
+            The sum, count and average are updated in one statement, so
+            concurrent ratings are never lost.
+        """
+        added = (rating or 0) - (replaces or 0)
+        counted = (rating is not None) - (replaces is not None)
+        if not added and not counted:
+            return
+        rating_sum = F('rating_sum') + added
+        rating_count = F('rating_count') + counted
+        # Every expression reads the columns as they were before the update
+        Profile.objects.filter(pk=self.pk).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=Case(
+                When(rating_count=-counted, then=Value(Profile._meta.get_field('rating').default)),
+                default=Cast(rating_sum, FloatField()) / rating_count,
+                output_field=models.DecimalField(max_digits=5, decimal_places=2)
+            ),
+            updated_at=now()
+        )
+        self.refresh_from_db(fields=['rating', 'rating_sum', 'rating_count', 'updated_at'])
+
     def update_rating(self):
-        """ Gets all the ratings for a Profile from their ProfileTasks,
-            averages them and updates the rating attribute on Profile.
+        """ Recalculates the Profile's rating, and its sum and count, from the
+            ratings of its ProfileTasks
         """
-        profile_tasks = ProfileTask.objects.filter(profile=self)
-        pt_list = []
-        for profile_task in profile_tasks:
-            if profile_task.rating is not None:
-                pt_list.append(profile_task.rating)
-        average_rating = sum(pt_list) / float(len(pt_list))
-        self.rating = average_rating
+        ratings = ProfileTask.objects.filter(profile=self, rating__isnull=False).aggregate(
+            rating_sum=Sum('rating'), rating_count=Count('rating'))
+        self.rating_sum = ratings['rating_sum'] or 0
+        self.rating_count = ratings['rating_count']
+        self.rating = average_rating(self.rating_sum, self.rating_count)
         self.save()
 
+    def increment(self, field, amount=1):
+        """ Adds to one of the Profile's counters (eg. shortlists) in a single
+            UPDATE of that column, so concurrent increments are never lost.
+            With settings.COUNTER_SHARDS, the amount is instead added to one
+            of that many CounterShards, spreading the writes to a busy
+            Profile over several rows. The Profile's counter then only
+            includes it once the shards are flushed (see jobs.counters).
+        """
+        shards = getattr(settings, 'COUNTER_SHARDS', 0)
+        if shards:
+            CounterShard.objects.add(self.pk, field, amount, shards)
+            return
+        Profile.objects.filter(pk=self.pk).update(**{field: F(field) + amount, 'updated_at': now()})
+        self.refresh_from_db(fields=[field, 'updated_at'])
+
     def shortlist(self):
         """ Increments the number of times a Profile has been shortlisted.
         """
-        self.shortlists = self.shortlists + 1
-        self.save()
+        self.increment('shortlists')
 
     def complete_task(self):
-        """ Updates the number of tasks that have been completed.
+        """ Increments the number of tasks that have been completed.
         """
-        complete_tasks = Task.objects.filter(helper=self, status=Task.COMPLETE)
-        self.tasks_completed = len(complete_tasks)
-        self.save()
+        self.increment('tasks_completed')
+
+
+class TaskQuerySet(models.QuerySet):
+    """ Custom QuerySet for Tasks """
+
+    def not_interacted_with(self, profile):
+        """ Excludes Tasks the Profile has a ProfileTask for
+            (ie shortlisted, discarded, applied, etc).
+            Done as a single NOT EXISTS anti-join against ProfileTask, backed
+            by its (profile, task) index.
+        """
+        interactions = ProfileTask.objects.filter(profile=profile, task=OuterRef('pk'))
+        return self.annotate(not_interacted=~Exists(interactions)).filter(not_interacted=True)
+
+    def ranked_for(self, profile):
+        """ Annotates each Task with its relevance `rank` for the given Profile.
+            Add 1 point per skill in common with the Profile, take 1 point off
+            per skill missing from the Profile, and add 3 points if the Task
+            is in the same location as the Profile.
+            The rank is computed by the database from the Task and Profile
+            skill masks, so the queryset can still be ordered and sliced
+            without joining through the skill tables or loading every Task
+            into Python.
+        """
+        # matched - (skill_count - matched)
+        matched = skillmask.matched_count(profile.skill_mask)
+        if skillmask.has_overflow(profile.skill_mask):
+            # Also match the Profile's Skills without a bit
+            matched = matched + skillmask.overflow_count(
+                Task.skills.through.objects.filter(task=OuterRef('pk')), 'task',
+                ProfileSkill.objects.filter(profile=profile, skill__bit=None).values('skill_id'))
+        skill_score = matched * 2 - F('skill_count')
+
+        location_bonus = Case(
+            When(location__iexact=profile.location, then=Value(3)),
+            default=Value(0),
+            output_field=IntegerField()
+        )
+
+        return self.annotate(rank=ExpressionWrapper(skill_score + location_bonus, output_field=IntegerField()))
 
 
 class Task(BaseModel):
     """ Model for a Task """
 
+    objects = TaskQuerySet.as_manager()
+
     # Enumeration of possible statuses
     OPEN = 'O'
     IN_PROGRESS = 'I'
@@ -128,16 +255,51 @@ class Task(BaseModel):
 
     # display_rank is a blank field which is used as a placeholder
     # for a temporary value used in serializing.
-    # Allows a temporary rank value to be used, without concurrency
-    # issues (the rank is never written or read from the database)
+    # The rank itself is annotated by TaskQuerySet.ranked_for, so it is
+    # never written or read from this column.
     display_rank = models.IntegerField(blank=True,null=True)
 
     #optional field, specifying when the task should be completed
     date_due = models.DateField(blank=True,null=True)
 
+    # Bitmask of the Task's skills (see jobs.skillmask), and the number of
+    # skills in it. Maintained from Task.skills by update_skill_mask.
+    skill_mask = models.BigIntegerField(default=0, editable=False)
+    skill_count = models.IntegerField(default=0, editable=False)
+
+    # Weighted full-text search vector of the title, skills, location, owner
+    # name and description (see jobs.search). GIN indexed, and only
+    # maintained on PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
+
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """ Notes the values a Task was loaded with, so saves can tell which
+            columns changed (see jobs.signals.note_task_ranked_values)
+        """
+        instance = super(Task, cls).from_db(db, field_names, values)
+        instance.loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def update_skill_mask(self):
+        """ Recalculates skill_mask and skill_count from Task.skills.
+            Only the mask (and updated_at) columns are written.
+        """
+        bits = list(self.skills.values_list('bit', flat=True))
+        self.skill_mask = skillmask.mask_of(bits)
+        self.skill_count = len(bits)
+        self.updated_at = now()
+        Task.objects.filter(pk=self.pk).update(
+            skill_mask=self.skill_mask,
+            skill_count=self.skill_count,
+            updated_at=self.updated_at
+        )
+        if hasattr(self, 'loaded_values'):
+            self.loaded_values.update(skill_mask=self.skill_mask, skill_count=self.skill_count)
+
 
 class Skill(BaseModel):
     """ Model for a Skill
@@ -149,9 +311,25 @@ class Skill(BaseModel):
     image = models.ImageField(upload_to='%Y/%m/%d/', blank=True, null=True)
     code = models.CharField(max_length=20)
 
+    # The Skill's bit in Task and Profile skill masks (see jobs.skillmask).
+    # Assigned when the Skill is first saved.
+    bit = models.PositiveSmallIntegerField(unique=True, null=True, editable=False)
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """ Assigns the lowest free skill bit to new Skills.
+            Once every bit is used, new Skills are left without one (see
+            jobs.skillmask).
+        """
+        if self.bit is None and self._state.adding:
+            used_bits = set(Skill.objects.exclude(bit=None).values_list('bit', flat=True))
+            free_bits = [bit for bit in range(skillmask.MAX_SKILL_BITS) if bit not in used_bits]
+            if free_bits:
+                self.bit = free_bits[0]
+        super(Skill, self).save(*args, **kwargs)
+
 
 class ProfileSkill(BaseModel):
     """ Associative Entity between Profiles and Skills
@@ -211,10 +389,100 @@ class ProfileTask(BaseModel):
     # Datetime that status was first set to "Applied". Null if never applied
     datetime_applied = models.DateTimeField(blank=True, null=True)
 
+    class Meta(BaseModel.Meta):
+        # A Profile has one interaction with a Task, which jobs.transitions
+        # upserts on. Also backs lookups of the interaction, including the
+        # anti-join in TaskQuerySet.not_interacted_with
+        unique_together = ('profile', 'task')
+
     def __str__(self):
         return "ProfileTask: "+self.task.title +" ("+ self.profile.user.username + ")"
 
 
+class FeedEntry(models.Model):
+    """ Materialised entry in a Profile's ranked task feed
+        One row per Open Task that the Profile has not yet interacted with.
+        Rows are derived data, maintained by jobs.feed, and can always be
+        rebuilt with the `rebuild_feeds` management command. They therefore
+        do not inherit the BaseModel bookkeeping columns.
+    """
+    profile = models.ForeignKey('jobs.Profile', related_name='feed_entries')
+    task = models.ForeignKey('jobs.Task', related_name='feed_entries')
+
+    # Relevance rank of the Task for the Profile (see TaskQuerySet.ranked_for)
+    rank = models.IntegerField()
+
+    # Copy of Task.created_at, so ties in rank can be ordered from the index
+    task_created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('profile', 'task')
+        # A feed read is a single range scan over this index
+        index_together = [('profile', 'rank', 'task_created_at')]
+
+    def __str__(self):
+        return "FeedEntry: "+str(self.task_id) +" ("+ str(self.profile_id) + ")"
+
+
+class Tombstone(models.Model):
+    """ Record of a deleted row, for delta sync (see jobs.sync)
+        kind names the synced collection the row was in, eg. 'tasks'.
+        The tombstone is only synced to its profile, or to every profile
+        when it has none. Profiles are not constrained, as tombstones are
+        written while the rows they mention are being deleted.
+    """
+    kind = models.CharField(max_length=32)
+    object_id = models.IntegerField()
+    profile = models.ForeignKey('jobs.Profile', null=True, blank=True, related_name='+',
+        on_delete=models.DO_NOTHING, db_constraint=False)
+    deleted_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        # A sync reads one profile's (and everyone's) tombstones by time
+        index_together = [('profile', 'deleted_at')]
+
+    def __str__(self):
+        return "Tombstone: "+self.kind+" "+str(self.object_id)
+
+
+class CounterShardManager(models.Manager):
+    """ Manager for CounterShards """
+
+    def add(self, profile_id, field, amount, shards):
+        """ Adds an amount to a random one of a Profile counter's shards """
+        key = {'profile_id': profile_id, 'field': field, 'shard': random.randrange(shards)}
+        if self.filter(**key).update(count=F('count') + amount):
+            return
+        try:
+            # Savepoint, so a lost race does not break the transaction
+            with transaction.atomic():
+                self.create(count=amount, **key)
+        except IntegrityError:
+            # Created concurrently, so add to it instead
+            if not self.filter(**key).update(count=F('count') + amount):
+                raise
+
+
+class CounterShard(models.Model):
+    """ Pending increments to one of a Profile's counters (see
+        Profile.increment). Rows are derived data, folded into the Profile and
+        deleted by jobs.counters.flush_counters, so do not inherit the
+        BaseModel bookkeeping columns.
+    """
+    profile = models.ForeignKey('jobs.Profile', related_name='+')
+    field = models.CharField(max_length=32)
+    shard = models.SmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    objects = CounterShardManager()
+
+    class Meta:
+        unique_together = ('profile', 'field', 'shard')
+
+    def __str__(self):
+        return "CounterShard: "+self.field+" "+str(self.shard)+" ("+str(self.profile_id)+")"
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     """Ensures a Profile instance is created each time a User is created """
@@ -0,0 +1,107 @@
+"""job_bilby Normalised (sideloaded) responses for the Jobs application
+
+With ?format=normalized, nested profiles, users, tasks and skills are
+replaced by their ids, and each referenced entity is serialized once into an
+`included` map alongside the response data:
+
+    {"data": [...], "included": {"profiles": {"3": {...}}, "users": {...}}}
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from collections import OrderedDict
+from rest_framework import serializers
+
+# Renderer format (and ?format= value) of normalised responses
+FORMAT = 'normalized'
+
+
+class Included(object):
+    """ Collects the entities referenced while serializing a response, and
+        serializes each of them once
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.instances = OrderedDict()
+        self.done = set()
+
+    def add(self, serializer, instance):
+        """ Records a nested entity, returning the id to reference it by """
+        key = (serializer.included_key, instance.pk, type(serializer))
+        if key not in self.instances:
+            self.instances[key] = instance
+        return instance.pk
+
+    def serialize(self):
+        """ Gets the included map, {key: {id: data}}.
+            Included entities may reference more entities, which are also
+            added. An entity serialized by more than one serializer (eg.
+            with and without its skills) is merged.
+        """
+        included = OrderedDict()
+        while len(self.done) < len(self.instances):
+            for key, instance in list(self.instances.items()):
+                if key in self.done:
+                    continue
+                self.done.add(key)
+                included_key, pk, serializer_class = key
+                # Included entities are given in full, whatever ?fields= asked for
+                context = {'request': self.request, 'all_fields': True}
+                data = serializer_class(instance, context=context).data
+                included.setdefault(included_key, OrderedDict()).setdefault(str(pk), OrderedDict()).update(data)
+        return included
+
+
+def is_normalized(request):
+    """ Whether a request asked for a normalised response """
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == FORMAT
+
+
+def get_included(request, create=True):
+    """ Gets the Included collection of a request, if it asked for a
+        normalised response
+    """
+    if not is_normalized(request):
+        return None
+    if getattr(request, '_included', None) is None and create:
+        request._included = Included(request)
+    return getattr(request, '_included', None)
+
+
+class NormalizableMixin(object):
+    """ Serializers of entities which can be sideloaded. When the request
+        asked for a normalised response, nested uses of the serializer give
+        the entity's id, and the entity is added to the included map.
+        included_key names the entity's section of the map.
+    """
+    included_key = None
+
+    def is_primary(self):
+        """ Whether this serializes the response data itself (or an entity
+            of the included map), rather than a nested entity
+        """
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def to_representation(self, instance):
+        if not self.is_primary():
+            included = get_included(self.context.get('request'))
+            if included is not None:
+                return included.add(self, instance)
+        return super(NormalizableMixin, self).to_representation(instance)
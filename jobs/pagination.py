@@ -0,0 +1,258 @@
+"""job_bilby Pagination for the Jobs application
+
+Keyset (cursor) pagination: each page continues from the sort key of the last
+item on the previous page, so deep pages cost the same as the first.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import base64, binascii, datetime, decimal, json
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import BigIntegerField, ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import Cast
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    """ Converts a sort key value to something JSON can hold. Dates, times and
+        decimals are sent as strings, which the model fields parse back when
+        filtering.
+    """
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _nullable(model, name):
+    """ Whether a field, or a lookup through relations (eg. owner__rating),
+        can be NULL. Annotations are taken to be non-null.
+    """
+    for part in name.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return False
+        # Fields of reverse relations are NULL for rows with no related object
+        if field.null or (field.is_relation and not field.concrete):
+            return True
+        model = field.related_model or model
+    return False
+
+
+class KeysetPagination(BasePagination):
+    """ Cursor pagination keyed on a stable, unique tuple of fields.
+        Pages are only returned when the request asks for them (with a
+        page_size or cursor query parameter); otherwise the whole list is
+        returned, as before.
+
+        The sort key is the view's cursor_ordering, or else the queryset's
+        ordering, with the primary key appended to break ties. Keys may be
+        model fields, lookups through relations (eg. owner__rating) or
+        annotations (eg. rank). They are annotated onto the queryset, so
+        their values are read from the same query as the page.
+        NULLs are sorted last, whichever way a key is ordered. Float
+        annotations (eg. search_rank) are keyed on a fixed precision
+        integer, so cursors match the rows exactly.
+        A view whose queryset only holds the head of its list (eg. a cache of
+        its first items) can give the rest with get_remainder_queryset(),
+        which is read from where the head runs out, with the same sort keys.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Float annotations are keyed on value * float_key_scale, cast to an integer
+    float_key_scale = 1000000
+
+    def get_page_size(self, request):
+        """ Gets the page size from the querystring, capped at max_page_size """
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset, view):
+        """ Gets the fields the pages are keyed on, ending with the primary key.
+            Relations are keyed on their id column.
+        """
+        ordering = getattr(view, 'cursor_ordering', None) or queryset.query.order_by or \
+            queryset.model._meta.ordering
+        fields = {field.name: field for field in queryset.model._meta.concrete_fields}
+        pk = queryset.model._meta.pk.attname
+
+        keys = []
+        for key in ordering:
+            descending = key.startswith('-')
+            name = key.lstrip('-')
+            if name == 'pk':
+                name = pk
+            elif name in fields:
+                name = fields[name].attname
+            keys.append(('-' if descending else '') + name)
+
+        if not any(key.lstrip('-') == pk for key in keys):
+            keys.append(('-' if keys and keys[-1].startswith('-') else '') + pk)
+        return keys
+
+    def annotate_keys(self, queryset):
+        """ Annotates the value of each sort key onto the queryset, and orders
+            it by them. Sets key_names to the annotations, and nullable to
+            whether each key can be NULL.
+        """
+        self.key_names, self.nullable, order = [], [], []
+        for index, key in enumerate(self.ordering):
+            descending = key.startswith('-')
+            name = key.lstrip('-')
+            key_name = 'cursor_key_{}'.format(index)
+            annotation = queryset.query.annotations.get(name)
+            nullable = annotation is None and _nullable(queryset.model, name)
+
+            if annotation is not None and isinstance(annotation.output_field, FloatField):
+                scaled = ExpressionWrapper(F(name) * Value(float(self.float_key_scale)), output_field=FloatField())
+                queryset = queryset.annotate(**{key_name: Cast(scaled, BigIntegerField())})
+                order.append(('-' if descending else '') + key_name)
+            else:
+                queryset = queryset.annotate(**{key_name: F(name)})
+                if nullable:
+                    order.append(F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True))
+                else:
+                    order.append(key)
+
+            self.key_names.append(key_name)
+            self.nullable.append(nullable)
+        return queryset.order_by(*order)
+
+    def encode_cursor(self, values):
+        """ Gets an opaque token for the position just after the item with
+            the given sort key values
+        """
+        position = {
+            'o': self.ordering,
+            'v': [_encode_value(value) for value in values],
+        }
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        """ Gets the sort key values from the querystring cursor, if any.
+            Cursors from a differently ordered list are rejected.
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            values = position['v']
+            assert position['o'] == self.ordering and len(values) == len(self.ordering)
+        except (TypeError, ValueError, KeyError, AssertionError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def keyset_filter(self, values):
+        """ Builds the filter for rows sorted after the given key values, ie.
+            (a, b, c) after (x, y, z) is a > x, or a = x and b > y, or ...
+            As NULLs sort last, a NULL sorts after every value, and nothing
+            but another NULL sorts level with a NULL.
+        """
+        after = Q()
+        equal = Q()
+        for key, name, nullable, value in zip(self.ordering, self.key_names, self.nullable, values):
+            if value is None:
+                equal &= Q(**{name + '__isnull': True})
+                continue
+            lookup = '__lt' if key.startswith('-') else '__gt'
+            later = Q(**{name + lookup: value})
+            if nullable:
+                later |= Q(**{name + '__isnull': True})
+            after |= equal & later
+            equal &= Q(**{name: value})
+        return after
+
+    def fetch(self, queryset, serialize=None):
+        """ Gets the items of a queryset, and the values of the sort keys of
+            each
+        """
+        if serialize is not None:
+            return serialize(queryset, self.key_names)
+        results = list(queryset)
+        return results, [[getattr(item, key) for key in self.key_names] for item in results]
+
+    def paginate_queryset(self, queryset, request, view=None, serialize=None):
+        """ Gets the page of the queryset asked for, or None when no page was
+            asked for.
+            serialize(queryset, keys), if given, fetches the page itself; it
+            gets the items and the values of the given sort keys of each.
+        """
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        queryset = self.annotate_keys(queryset)
+
+        values = self.decode_cursor(request)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values))
+
+        # Fetch one extra item to tell if there is a next page
+        results, positions = self.fetch(queryset[:self.page_size + 1], serialize)
+
+        # Continue past the end of the head of the list
+        remainder = None
+        if len(results) <= self.page_size and hasattr(view, 'get_remainder_queryset'):
+            remainder = view.get_remainder_queryset()
+        if remainder is not None:
+            remainder = self.annotate_keys(remainder)
+            last = positions[-1] if positions else values
+            if last is not None:
+                remainder = remainder.filter(self.keyset_filter(last))
+            more, more_positions = self.fetch(remainder[:self.page_size + 1 - len(results)], serialize)
+            results, positions = list(results) + list(more), list(positions) + list(more_positions)
+
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        # The sort key of the last item, where the next page starts
+        self.last_position = positions[self.page_size - 1] if self.has_next else None
+        return self.page
+
+    def get_next_link(self):
+        """ Gets the url of the next page, or None on the last page """
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
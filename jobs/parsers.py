@@ -0,0 +1,60 @@
+"""job_bilby Parsers for the Jobs application
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import io
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from jobs import binary, fastjson
+
+
+class FastJSONParser(JSONParser):
+    """ Parses JSON with the configured JSON backend (see jobs.fastjson),
+        giving the same data as JSONParser.
+        Bodies the backend rejects, or cannot read exactly (integers beyond
+        64 bits, other encodings than UTF-8), are left to JSONParser, so
+        NaN and Infinity are still accepted, and errors reported the same.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        backend = fastjson.get_backend()
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if backend is None or encoding.lower().replace('-', '') != 'utf8':
+            return super(FastJSONParser, self).parse(stream, media_type, parser_context)
+
+        data = stream.read()
+        try:
+            return backend.loads(data)
+        except backend.errors:
+            pass
+        return super(FastJSONParser, self).parse(io.BytesIO(data), media_type, parser_context)
+
+
+class MessagePackParser(BaseParser):
+    """ Parses MessagePack request bodies (see jobs.binary).
+        Selected with Content-Type: application/msgpack.
+    """
+    media_type = binary.MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return binary.unpackb(stream.read())
+        except Exception as exc:
+            raise ParseError('MessagePack parse error - %s' % exc)
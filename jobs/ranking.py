@@ -0,0 +1,239 @@
+"""job_bilby Vectorised batch ranking for the Jobs application
+
+Scores every (Profile, Open Task) pair at once with sparse matrix products,
+for nightly feed rebuilds and bulk "who should see this task" calculations.
+The rank is the same as TaskQuerySet.ranked_for: 1 point per skill in common,
+minus 1 point per skill the Task lists that the Profile is missing, plus 3
+points when the locations match.
+
+Requires NumPy and SciPy.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from jobs.models import Profile, ProfileSkill, ProfileTask, Skill, Task
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = None
+    sparse = None
+
+# Number of columns scanned at a time when picking between tied ranks
+TIE_WINDOW = 4096
+
+
+def is_available():
+    """ Whether NumPy and SciPy are installed """
+    return np is not None and sparse is not None
+
+
+def _incidence(pairs, rows, columns):
+    """ Builds a sparse 0/1 matrix from (row id, column id) pairs.
+        rows and columns map ids to matrix indices; unknown ids are skipped.
+    """
+    row_idx, col_idx = [], []
+    for row_id, col_id in pairs:
+        if row_id in rows and col_id in columns:
+            row_idx.append(rows[row_id])
+            col_idx.append(columns[col_id])
+    data = np.ones(len(row_idx), dtype=np.int32)
+    matrix = sparse.csr_matrix((data, (row_idx, col_idx)), shape=(len(rows), len(columns)), dtype=np.int32)
+    # Duplicate pairs would otherwise be summed
+    matrix.data[:] = 1
+    return matrix
+
+
+def _location_codes(locations, codes):
+    """ Maps (case-insensitive) locations to integer codes, shared via `codes` """
+    return np.array([codes.setdefault(location.lower(), len(codes)) for location in locations], dtype=np.int32)
+
+
+def _top_k(ranks, excluded, k):
+    """ Gets the column indices of the k best ranks in each row, best first.
+        Columns must already be in tie-break order (ties go to the earlier
+        column). excluded is a (rows, columns) pair of index arrays which are
+        never picked, so rows may have fewer than k.
+
+        Ranks are small integers, so rather than partially sorting every row,
+        a per-row histogram of ranks finds the lowest rank which still makes
+        the top k; only columns at or above it are sorted.
+    """
+    rows, columns = ranks.shape
+    if rows == 0 or columns == 0 or k < 1:
+        return [np.empty(0, dtype=np.intp) for _ in range(rows)]
+
+    # Histogram bins: 0 for excluded pairs, 1 for the lowest rank upwards
+    bins = ranks - (ranks.min() - 1)
+    bins[excluded] = 0
+    span = int(bins.max()) + 1
+    counts = np.bincount((bins + (np.arange(rows) * span)[:, np.newaxis]).ravel(),
+        minlength=rows * span).reshape(rows, span)
+    counts[:, 0] = 0
+
+    # Number of columns in each bin or better
+    at_or_above = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1]
+    threshold = np.maximum(np.where(at_or_above >= k, np.arange(span), 0).max(axis=1), 1)
+    above = np.append(at_or_above, np.zeros((rows, 1), dtype=at_or_above.dtype), axis=1)[
+        np.arange(rows), threshold + 1]
+
+    # Every column above the threshold...
+    row_above, column_above = np.nonzero(bins > threshold[:, np.newaxis])
+    row_idx, column_idx = [row_above], [column_above]
+
+    # ...and the earliest columns tied on it. Ties can cover most of a row,
+    # so columns are scanned a window at a time until every row is full
+    remaining = k - above
+    for begin in range(0, columns, TIE_WINDOW):
+        active = np.flatnonzero(remaining > 0)
+        if len(active) == 0:
+            break
+        row_tied, column_tied = np.nonzero(
+            bins[active, begin:begin + TIE_WINDOW] == threshold[active, np.newaxis])
+        position = np.arange(len(row_tied)) - np.searchsorted(row_tied, np.arange(len(active)))[row_tied]
+        keep = position < remaining[active][row_tied]
+        row_idx.append(active[row_tied[keep]])
+        column_idx.append(column_tied[keep] + begin)
+        remaining[active] -= np.bincount(row_tied[keep], minlength=len(active))
+
+    row_idx, column_idx = np.concatenate(row_idx), np.concatenate(column_idx)
+    order = np.lexsort((column_idx, -bins[row_idx, column_idx], row_idx))
+    row_idx, column_idx = row_idx[order], column_idx[order]
+    return np.split(column_idx, np.searchsorted(row_idx, np.arange(1, rows)))
+
+
+class RankingEngine(object):
+    """ Ranks Profiles against Tasks using sparse profile x skill and
+        task x skill incidence matrices.
+        Scores are computed in blocks (chunks of rows), so memory is bounded
+        by chunk size x number of columns rather than profiles x tasks.
+    """
+
+    def __init__(self, profile_ids, profile_skills, profile_locations,
+                 task_ids, task_skills, task_locations, task_created_at,
+                 interactions=None):
+        """ profile_skills and task_skills are sparse 0/1 matrices with one
+            column per skill. interactions is an optional sparse profiles x
+            tasks matrix of pairs which are never ranked.
+            Locations are compared case-insensitively.
+        """
+        if not is_available():
+            raise ImportError("Batch ranking requires NumPy and SciPy")
+
+        # Tasks are held newest first and Profiles lowest id first, so that
+        # ties in rank go to the earlier row or column
+        task_order = np.argsort(np.asarray(task_created_at), kind='stable')[::-1]
+        profile_order = np.argsort(np.asarray(profile_ids), kind='stable')
+
+        self.profile_ids = np.asarray(profile_ids)[profile_order]
+        self.task_ids = np.asarray(task_ids)[task_order]
+        self.task_created_at = [task_created_at[i] for i in task_order]
+
+        # Ranks are bounded by twice the number of skills, plus 3
+        self.profile_skills = sparse.csr_matrix(profile_skills, dtype=np.int16)[profile_order]
+        self.task_skills = sparse.csr_matrix(task_skills, dtype=np.int16)[task_order]
+        self.task_skills_t = self.task_skills.T.tocsr()
+        self.task_skill_count = np.asarray(self.task_skills.sum(axis=1), dtype=np.int16).ravel()
+
+        codes = {}
+        self.profile_locations = _location_codes(profile_locations, codes)[profile_order]
+        self.task_locations = _location_codes(task_locations, codes)[task_order]
+
+        if interactions is None:
+            interactions = sparse.csr_matrix((len(self.profile_ids), len(self.task_ids)), dtype=np.int8)
+        self.interactions = sparse.csr_matrix(interactions, dtype=np.int8)[profile_order][:, task_order]
+
+    @classmethod
+    def from_database(cls, exclude_interacted=True):
+        """ Loads every Profile and Open Task, with their skills, from the
+            database.
+            Pairs with a ProfileTask are excluded from rankings, unless
+            exclude_interacted is False.
+        """
+        profiles = list(Profile.objects.order_by('id').values_list('id', 'location'))
+        tasks = list(Task.objects.filter(status=Task.OPEN).order_by('id').values_list(
+            'id', 'location', 'created_at'))
+        skill_ids = Skill.objects.order_by('id').values_list('id', flat=True)
+
+        profile_rows = {profile_id: row for row, (profile_id, _) in enumerate(profiles)}
+        task_rows = {task_id: row for row, (task_id, _, _) in enumerate(tasks)}
+        skill_columns = {skill_id: column for column, skill_id in enumerate(skill_ids)}
+
+        profile_skills = _incidence(
+            ProfileSkill.objects.values_list('profile_id', 'skill_id').iterator(),
+            profile_rows, skill_columns)
+        task_skills = _incidence(
+            Task.skills.through.objects.filter(task__status=Task.OPEN).values_list('task_id', 'skill_id').iterator(),
+            task_rows, skill_columns)
+
+        interactions = None
+        if exclude_interacted:
+            interactions = _incidence(
+                ProfileTask.objects.filter(task__status=Task.OPEN).values_list('profile_id', 'task_id').iterator(),
+                profile_rows, task_rows)
+
+        return cls(
+            profile_ids=[profile_id for profile_id, _ in profiles],
+            profile_skills=profile_skills,
+            profile_locations=[location for _, location in profiles],
+            task_ids=[task_id for task_id, _, _ in tasks],
+            task_skills=task_skills,
+            task_locations=[location for _, location, _ in tasks],
+            task_created_at=[created_at for _, _, created_at in tasks],
+            interactions=interactions,
+        )
+
+    def _block(self, profile_slice, task_slice):
+        """ Gets the dense block of ranks for the given profile rows and task
+            columns, and the (row, column) indices of the excluded pairs
+        """
+        # matched - (skill_count - matched)
+        ranks = (self.profile_skills[profile_slice] * self.task_skills_t[:, task_slice]).toarray()
+        ranks *= 2
+        ranks -= self.task_skill_count[task_slice]
+
+        # Location bonus
+        same_location = (self.profile_locations[profile_slice][:, np.newaxis] ==
+            self.task_locations[task_slice][np.newaxis, :])
+        ranks += same_location.view(np.int8) * np.int16(3)
+
+        return ranks, self.interactions[profile_slice][:, task_slice].nonzero()
+
+    def top_tasks(self, k, chunk_size=256):
+        """ Yields (profile id, [(task id, rank), ...]) with the k best ranked
+            tasks for every profile. Ties are resolved by which task is more
+            recent.
+        """
+        for start in range(0, len(self.profile_ids), chunk_size):
+            rows = slice(start, start + chunk_size)
+            ranks, excluded = self._block(rows, slice(None))
+            for offset, columns in enumerate(_top_k(ranks, excluded, k)):
+                yield (int(self.profile_ids[start + offset]),
+                    [(int(self.task_ids[column]), int(ranks[offset, column])) for column in columns])
+
+    def top_profiles(self, k, chunk_size=256):
+        """ Yields (task id, [(profile id, rank), ...]) with the k best ranked
+            profiles for every task. Ties are resolved by lowest profile id.
+        """
+        for start in range(0, len(self.task_ids), chunk_size):
+            columns = slice(start, start + chunk_size)
+            ranks, (excluded_rows, excluded_columns) = self._block(slice(None), columns)
+            ranks = np.ascontiguousarray(ranks.T)
+            for offset, rows in enumerate(_top_k(ranks, (excluded_columns, excluded_rows), k)):
+                yield (int(self.task_ids[start + offset]),
+                    [(int(self.profile_ids[row]), int(ranks[offset, row])) for row in rows])
@@ -0,0 +1,117 @@
+"""job_bilby Renderers for the Jobs application
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from collections import OrderedDict
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+from jobs import binary, fastjson, normalize
+
+
+class FastJSONRenderer(JSONRenderer):
+    """ Renders JSON with the configured JSON backend (see jobs.fastjson),
+        giving the same output as JSONRenderer.
+        Indented (eg. browsable API) and ASCII-only output, custom encoder
+        classes, and data the backend would write differently, are left to
+        JSONRenderer.
+    """
+    encoder = encoders.JSONEncoder()
+    # Whether the output must be the same as JSONRenderer's
+    exact = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        backend = fastjson.get_backend(self.exact)
+        if (data is None or backend is None or self.ensure_ascii or not self.compact
+                or self.encoder_class is not encoders.JSONEncoder
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = backend.dumps(data, self.encoder.default)
+        except backend.errors:
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        # Escaped as JSONRenderer does, so the output is a strict javascript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class CompactJSONRenderer(FastJSONRenderer):
+    """ Renders JSON with the configured JSON backend, in its own notation:
+        orjson writes floats such as 1e16 rather than 1e+16, and NaN and
+        infinite floats as null.
+        Selected with Accept: application/vnd.fastjson+json, or ?format=fastjson.
+    """
+    media_type = fastjson.MEDIA_TYPE
+    format = fastjson.FORMAT
+    exact = False
+
+
+class NormalizedJSONRenderer(FastJSONRenderer):
+    """ Renders successful responses as {"data": ..., "included": ...},
+        with the entities referenced while serializing the data sideloaded
+        in "included" (see jobs.normalize).
+        Selected with ?format=normalized.
+    """
+    format = normalize.FORMAT
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if response is not None and not response.exception:
+            included = normalize.get_included(renderer_context.get('request'))
+            data = OrderedDict([
+                ('data', data),
+                ('included', included.serialize() if included is not None else {})
+            ])
+        return super(NormalizedJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """ Renders a list given as chunks of items, a chunk at a time, so the
+        whole list is never held in memory.
+        The output is the same as rendering the whole list with FastJSONRenderer.
+    """
+
+    def render_chunks(self, chunks, accepted_media_type=None, renderer_context=None):
+        """ Yields the rendered list, as bytes, from an iterable of lists """
+        yield b'['
+        first = True
+        for chunk in chunks:
+            if not chunk:
+                continue
+            rendered = self.render(chunk, accepted_media_type, renderer_context)
+            # Each chunk is rendered as a list; only its items are kept
+            yield (b'' if first else b',') + rendered[1:-1]
+            first = False
+        yield b']'
+
+
+class MessagePackRenderer(BaseRenderer):
+    """ Renders responses as MessagePack (see jobs.binary).
+        Selected with Accept: application/msgpack, or ?format=msgpack.
+    """
+    media_type = binary.MEDIA_TYPE
+    format = binary.FORMAT
+    charset = None
+    render_style = 'binary'
+    # Serializers give datetimes and decimals as such (see NativeValuesMixin)
+    native_values = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return binary.packb(data)
@@ -0,0 +1,145 @@
+"""job_bilby Full-text search for the Jobs application
+
+Tasks hold a stored, weighted tsvector (Task.search_vector) covering their
+title, skills, location, owner name and description, with a GIN index.
+The vectors are only maintained and searched on PostgreSQL; on other
+databases search falls back to DRF's SearchFilter.
+With ?fuzzy=true, searches instead match trigrams (pg_trgm) of the title,
+location and skill titles, so misspelt words still match.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Greatest
+from rest_framework import filters
+from jobs.models import Task
+
+# Text search configuration used for both the vectors and the queries
+SEARCH_CONFIG = 'english'
+
+# Query parameter switching search to typo-tolerant trigram matching
+FUZZY_PARAM = 'fuzzy'
+
+# Recomputes the vectors of the selected tasks.
+# Weights: A title, B skills, C location and owner name, D description
+UPDATE_SQL = """
+UPDATE jobs_task SET search_vector =
+    setweight(to_tsvector(%(config)s, coalesce(jobs_task.title, '')), 'A') ||
+    setweight(to_tsvector(%(config)s, coalesce((
+        SELECT string_agg(jobs_skill.title, ' ')
+        FROM jobs_skill
+        INNER JOIN jobs_task_skills ON jobs_task_skills.skill_id = jobs_skill.id
+        WHERE jobs_task_skills.task_id = jobs_task.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s, coalesce(jobs_task.location, '') || ' ' ||
+        coalesce(auth_user.first_name, '') || ' ' || coalesce(auth_user.last_name, '')), 'C') ||
+    setweight(to_tsvector(%(config)s, coalesce(jobs_task.description, '')), 'D')
+FROM jobs_profile
+INNER JOIN auth_user ON auth_user.id = jobs_profile.user_id
+WHERE jobs_profile.id = jobs_task.owner_id AND jobs_task.id = ANY(%(task_ids)s)
+"""
+
+# Task columns the vectors are computed from
+SEARCHED_FIELDS = {'title', 'location', 'owner', 'owner_id', 'description'}
+
+
+
+def is_enabled():
+    """ Whether the database supports the full-text search vectors """
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(task_ids):
+    """ Recomputes the search vectors of the given Tasks, in one statement """
+    task_ids = list(task_ids)
+    if not task_ids or not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(UPDATE_SQL, {'config': SEARCH_CONFIG, 'task_ids': task_ids})
+
+
+def update_skill_tasks(skill):
+    """ Recomputes the search vectors of every Task listing a Skill """
+    update_search_vectors(Task.objects.filter(skills=skill).values_list('id', flat=True))
+
+
+def update_owner_tasks(user):
+    """ Recomputes the search vectors of every Task posted by a User """
+    update_search_vectors(Task.objects.filter(owner__user=user).values_list('id', flat=True))
+
+
+def prefix_query(terms):
+    """ Builds a tsquery matching words which start with every search term
+        (so partly typed words still match, as with SearchFilter)
+    """
+    words = [word for term in terms for word in re.findall(r'\w+', term)]
+    return ' & '.join(word + ':*' for word in words)
+
+
+class PrefixSearchQuery(SearchQuery):
+    """ A SearchQuery for a tsquery built by prefix_query, rather than plain
+        text
+    """
+
+    def as_sql(self, compiler, connection):
+        sql, params = super(PrefixSearchQuery, self).as_sql(compiler, connection)
+        return sql.replace('plainto_tsquery(', 'to_tsquery(', 1), params
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """ Searches Tasks with their stored search vectors, using the GIN index
+        rather than ILIKE over joined tables.
+        Matching tasks are annotated with their ts_rank as search_rank and
+        ordered by it (before the queryset's existing ordering).
+        Falls back to SearchFilter on databases other than PostgreSQL.
+    """
+
+    def fuzzy_filter(self, queryset, text):
+        """ Matches Tasks whose title, location or a skill title is similar
+            to text, using the trigram indexes. Annotates the best title or
+            location similarity as search_rank, and orders by it.
+        """
+        if not text:
+            return queryset
+
+        skill_match = Task.skills.through.objects.filter(task=OuterRef('pk'), skill__title__trigram_similar=text)
+        queryset = queryset.annotate(skill_match=Exists(skill_match)).filter(
+            Q(title__trigram_similar=text) | Q(location__trigram_similar=text) | Q(skill_match=True)
+        ).annotate(
+            search_rank=Greatest(TrigramSimilarity('title', text), TrigramSimilarity('location', text)))
+        return queryset.order_by('-search_rank', *queryset.query.order_by)
+
+    def filter_queryset(self, request, queryset, view):
+        if not is_enabled() or queryset.model is not Task:
+            return super(FullTextSearchFilter, self).filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if request.query_params.get(FUZZY_PARAM) in ('true', 'True', '1'):
+            return self.fuzzy_filter(queryset, ' '.join(terms))
+
+        value = prefix_query(terms)
+        if not value:
+            return queryset
+
+        query = PrefixSearchQuery(value, config=SEARCH_CONFIG)
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query))
+        return queryset.order_by('-search_rank', *queryset.query.order_by)
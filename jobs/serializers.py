@@ -22,11 +22,84 @@ from rest_framework import serializers
 from jobs.models import *
 from django.contrib.auth.models import User
 from django.core.files.base import ContentFile
+from django.db import transaction
 from job_bilby import settings
-
-
-class SkillSerializer(serializers.ModelSerializer):
+from jobs.normalize import NormalizableMixin, is_normalized
+from jobs.fieldsets import DynamicFieldsMixin, only_fields, is_nested
+from jobs.fragments import FragmentCacheMixin
+from jobs.binary import NativeValuesMixin
+from jobs import feed, interactions
+
+
+def eager_loading_plan(serializer, prefix='', prefetch_only=False):
+    """ Gets the (select_related, prefetch_related) lookups needed to
+        serialize a queryset without a query per object.
+        Serializers declare the relations they read in select_related and
+        prefetch_related; the plans of nested serializers are added under
+        the nesting field. Anything nested below a many relation has to be
+        prefetched. Relations whose fields were not requested (see
+        DynamicFieldsMixin) are not loaded.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    sources = {}
+    for name, field in serializer.fields.items():
+        sources[(field.source or name).split('.')[0]] = field
+
+    select, prefetch = [], []
+    for lookup in getattr(serializer, 'select_related', ()):
+        field = sources.get(lookup.split('__')[0])
+        # A relation given as its id needs no join
+        if field is not None and is_nested(field):
+            (prefetch if prefetch_only else select).append(prefix + lookup)
+    for lookup in getattr(serializer, 'prefetch_related', ()):
+        if lookup.split('__')[0] in sources:
+            prefetch.append(prefix + lookup)
+
+    for name, field in serializer.fields.items():
+        many = isinstance(field, serializers.ListSerializer)
+        nested = field.child if many else field
+        if not isinstance(nested, serializers.BaseSerializer):
+            continue
+        nested_select, nested_prefetch = eager_loading_plan(
+            nested,
+            prefix=prefix + (field.source or name) + '__',
+            prefetch_only=prefetch_only or many
+        )
+        select += nested_select
+        prefetch += nested_prefetch
+    return select, prefetch
+
+
+def eager_load(queryset, serializer):
+    """ Applies a serializer's eager loading plan to a queryset, and when
+        only some fields were requested, defers the columns it does not read
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    select, prefetch = eager_loading_plan(serializer)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+
+    # Sideloaded entities are given in full, so need every column
+    if (isinstance(serializer, DynamicFieldsMixin) and serializer.get_requested() is not None
+            and not is_normalized(serializer.context.get('request'))):
+        lookups = only_fields(serializer, queryset.model)
+        if lookups is not None:
+            # Paging reads the sort key of the last object
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            columns = {field.name for field in queryset.model._meta.concrete_fields}
+            lookups += [field.lstrip('-') for field in ordering if field.lstrip('-') in columns]
+            queryset = queryset.only(*lookups)
+    return queryset
+
+
+class SkillSerializer(DynamicFieldsMixin, NativeValuesMixin, NormalizableMixin, FragmentCacheMixin,
+        serializers.ModelSerializer):
     """ Serializer for Skill model"""
+    included_key = 'skills'
 
     image = serializers.SerializerMethodField()
 
@@ -38,32 +111,38 @@ class SkillSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Skill
-        fields = "__all__"
+        # The skill bit is only used for skill masks
+        exclude = ('bit',)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, NativeValuesMixin, NormalizableMixin, serializers.ModelSerializer):
     """ Serializer for User model"""
+    included_key = 'users'
+    prefetch_related = ('groups', 'user_permissions')
+
     class Meta:
         model = User
         # Password excluded for security purposes
         exclude = ('password',)
 
-class UserPutSerializer(serializers.ModelSerializer):
+class UserPutSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer for User model"""
     class Meta:
         model = User
         fields = '__all__'
 
 
-class ProfileSkillSerializer(serializers.ModelSerializer):
+class ProfileSkillSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer for ProfileSkill Model """
 
     class Meta:
         model = ProfileSkill
         fields = "__all__"
 
-class ProfileSkillGetSerializer(serializers.ModelSerializer):
+class ProfileSkillGetSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer for ProfileSkill Model """
+    select_related = ('skill',)
+
     skill = SkillSerializer()
 
     class Meta:
@@ -71,8 +150,10 @@ class ProfileSkillGetSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(DynamicFieldsMixin, NativeValuesMixin, NormalizableMixin, FragmentCacheMixin,
+        serializers.ModelSerializer):
     """ Serializer for Profile model"""
+    included_key = 'profiles'
 
     photo = serializers.SerializerMethodField()
 
@@ -84,7 +165,9 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = "__all__"
+        # The skill mask is only used for ranking, the rating totals to keep
+        # the rating up to date, and feed_complete to read the task list
+        exclude = ('skill_mask', 'rating_sum', 'rating_count', 'feed_complete')
 
 
 class Base64ImageField(serializers.ImageField):
@@ -100,8 +183,12 @@ class Base64ImageField(serializers.ImageField):
         return super(Base64ImageField, self).to_internal_value(data)
 
 
-class ProfileUserSerializer(serializers.ModelSerializer):
+class ProfileUserSerializer(DynamicFieldsMixin, NativeValuesMixin, NormalizableMixin, FragmentCacheMixin,
+        serializers.ModelSerializer):
     """ Serializer for ProfileUser model"""
+    included_key = 'profiles'
+    select_related = ('user',)
+
     user = UserSerializer()
     photo = Base64ImageField()
 
@@ -113,11 +200,17 @@ class ProfileUserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = "__all__"
+        # The skill mask is only used for ranking, the rating totals to keep
+        # the rating up to date, and feed_complete to read the task list
+        exclude = ('skill_mask', 'rating_sum', 'rating_count', 'feed_complete')
 
 
-class ProfileUserGetSerializer(serializers.ModelSerializer):
+class ProfileUserGetSerializer(DynamicFieldsMixin, NativeValuesMixin, NormalizableMixin, serializers.ModelSerializer):
     """ Serializer for ProfileUser model"""
+    included_key = 'profiles'
+    select_related = ('user',)
+    prefetch_related = ('profile_skills',)
+
     user = UserSerializer()
     photo = Base64ImageField()
     profile_skills = ProfileSkillGetSerializer(many=True, read_only=True)
@@ -129,40 +222,72 @@ class ProfileUserGetSerializer(serializers.ModelSerializer):
             return None
     class Meta:
         model = Profile
-        fields = "__all__"
+        # The skill mask is only used for ranking, the rating totals to keep
+        # the rating up to date, and feed_complete to read the task list
+        exclude = ('skill_mask', 'rating_sum', 'rating_count', 'feed_complete')
 
 
-class TaskGetSerializer(serializers.ModelSerializer):
+class TaskGetSerializer(DynamicFieldsMixin, NativeValuesMixin, NormalizableMixin, serializers.ModelSerializer):
     """ Serializer, used when GET-ing a task
         Contains all Task data, along with data for its Poster (owner)
         and Helper.
     """
+    included_key = 'tasks'
+    select_related = ('owner', 'helper')
+    prefetch_related = ('skills',)
+
     owner = ProfileUserSerializer()
     helper = ProfileUserSerializer(required=False)
     skills = SkillSerializer(many=True)
 
+    # Relevance rank, annotated by TaskQuerySet.ranked_for.
+    # Null when the Task was not fetched through a ranked queryset.
+    display_rank = serializers.IntegerField(source='rank', read_only=True, default=None)
+
     class Meta:
         model = Task
-        fields = "__all__"
+        # The search vector and skill mask are only used for searching and
+        # ranking
+        exclude = ('search_vector', 'skill_mask', 'skill_count')
 
 
-class TaskPostSerializer(serializers.ModelSerializer):
+class TaskPostSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer, used when POST-ing a task
         Contains all Task data, without extra data (ie poster/helper data)
     """
+    prefetch_related = ('skills',)
+
     class Meta:
         model = Task
-        fields = "__all__"
-
-
-class TaskHelperSerializer(serializers.ModelSerializer):
+        # The search vector and skill mask are only used for searching and
+        # ranking
+        exclude = ('search_vector', 'skill_mask', 'skill_count')
+
+    def create(self, validated_data):
+        """ Creates the Task, adding it to the feeds once its skills are set
+            (rather than when it is first saved, without them)
+        """
+        skills = validated_data.pop('skills', [])
+        with transaction.atomic():
+            task = Task(**validated_data)
+            task.skills_pending = True
+            task.save()
+            task.skills.set(skills)
+            task.skills_pending = False
+            feed.add_task(task)
+        return task
+
+
+class TaskHelperSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer, used when setting or updating the Helper of a Task.
     """
     helper = ProfileSerializer(required=False)
 
     class Meta:
         model = Task
-        fields = "__all__"
+        # The search vector and skill mask are only used for searching and
+        # ranking
+        exclude = ('search_vector', 'skill_mask', 'skill_count')
 
     def update(self, instance, validated_data):
         """ Update the TaskHelperSerializer with validated data"""
@@ -184,10 +309,12 @@ class TaskHelperSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ProfileTaskGetSerializer(serializers.ModelSerializer):
+class ProfileTaskGetSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer, used when GET-ing a ProfileTask
         Contains all ProfileTask data, along with the relevant Task data
     """
+    select_related = ('task',)
+
     task = TaskGetSerializer()
 
     class Meta:
@@ -195,7 +322,7 @@ class ProfileTaskGetSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ProfileTaskPostSerializer(serializers.ModelSerializer):
+class ProfileTaskPostSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer, used when POST-ing a ProfileTask
         Contains all ProfileTask data
     """
@@ -204,12 +331,40 @@ class ProfileTaskPostSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ApplicantSerializer(serializers.ModelSerializer):
+class ProfileTaskApplicationSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
+    """ Serializer, used to validate the details of an application for a Task
+        (see jobs.transitions)
+    """
+    class Meta:
+        model = ProfileTask
+        fields = ['answer1', 'answer2', 'answer3', 'quote']
+
+
+class InteractionSerializer(ProfileTaskApplicationSerializer):
+    """ Serializer, used to validate one of a batch of interactions with Tasks
+        (see jobs.interactions). The application's details are only used when
+        applying.
+    """
+    task = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=interactions.ACTIONS)
+
+    class Meta(ProfileTaskApplicationSerializer.Meta):
+        fields = ['task', 'action'] + ProfileTaskApplicationSerializer.Meta.fields
+
+    def validate_quote(self, value):
+        if value is not None and value < 0:
+            raise serializers.ValidationError("Integrity check failed! Offer cannot be negative.")
+        return value
+
+
+class ApplicantSerializer(DynamicFieldsMixin, NativeValuesMixin, serializers.ModelSerializer):
     """ Serializer, for Task applicants (ie ProfileUsers)
         Has all Profile data, along with custom fields
         (including answers, quote, status, etc) relevant
         to applicants.
     """
+    select_related = ('profile', 'task')
+
     profile = ProfileUserGetSerializer()
     task = TaskGetSerializer()
 
@@ -0,0 +1,309 @@
+"""job_bilby Signal receivers for the Jobs application
+
+Keeps derived data (such as the materialised task feeds and skill masks) up to
+date as the models change. Connected when the app is ready (see jobs.apps).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from jobs import authentication, feed, search, suggest, sync
+from jobs.models import Profile, ProfileSkill, ProfileTask, Skill, Task
+
+
+@receiver(post_save, sender=Profile)
+def build_profile_feed(sender, instance, created, raw=False, **kwargs):
+    """ Builds the task feed of each newly created Profile """
+    if created and not raw:
+        feed.rebuild_profile_feed(instance)
+
+
+@receiver(pre_save, sender=Task)
+def note_task_ranked_values(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ Notes the stored values of the columns a Task is ranked on, before a
+        save which may change them. Taken from the values the Task was loaded
+        with, when it was loaded with all of them.
+    """
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(feed.RANKED_FIELDS) & set(update_fields):
+        return
+    loaded = getattr(instance, 'loaded_values', {})
+    if all(field in loaded for field in feed.RANKED_FIELDS):
+        instance.stored_ranked_values = tuple(loaded[field] for field in feed.RANKED_FIELDS)
+    else:
+        instance.stored_ranked_values = feed.ranked_values(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+def update_task_feeds(sender, instance, created, raw=False, **kwargs):
+    """ Adds new Tasks to the feeds, and re-ranks (or removes, once no longer
+        Open) existing Tasks when a column they are ranked on changes.
+        Tasks created with skills_pending set are added once their skills are
+        set instead (see TaskPostSerializer.create).
+    """
+    if raw:
+        return
+    if created:
+        if not getattr(instance, 'skills_pending', False):
+            feed.add_task(instance)
+        return
+    stored = instance.__dict__.pop('stored_ranked_values', False)
+    if stored is False:
+        return
+    values = tuple(getattr(instance, field) for field in feed.RANKED_FIELDS)
+    instance.loaded_values = dict(getattr(instance, 'loaded_values', {}), **dict(zip(feed.RANKED_FIELDS, values)))
+    if stored != values:
+        feed.refresh_task(instance)
+
+
+@receiver(m2m_changed, sender=Task.skills.through)
+def update_task_skills(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Updates the skill masks of Tasks when their skills change, then
+        re-ranks those whose mask changed in every feed.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        tasks = [instance]
+    else:
+        # Skill.task_set was changed, so pk_set holds Task ids
+        tasks = Task.objects.filter(pk__in=pk_set or [])
+    for task in tasks:
+        stored_mask = Task.objects.filter(pk=task.pk).values_list('skill_mask', flat=True).first()
+        task.update_skill_mask()
+        if task.skill_mask != stored_mask and not getattr(task, 'skills_pending', False):
+            feed.refresh_task(task)
+
+
+@receiver(post_save, sender=ProfileSkill)
+@receiver(post_delete, sender=ProfileSkill)
+def update_profile_skill_mask(sender, instance, raw=False, **kwargs):
+    """ Updates the skill mask of a Profile when its ProfileSkills change """
+    if not raw:
+        Profile(pk=instance.profile_id).update_skill_mask()
+        # The mask is updated without saving the Profile
+        authentication.invalidate_user(Profile.objects.filter(pk=instance.profile_id)
+            .values_list('user_id', flat=True).first())
+
+
+@receiver(pre_delete, sender=Skill)
+def note_skill_tasks(sender, instance, **kwargs):
+    """ Notes the Tasks listing a Skill which is being deleted.
+        (Deleting the Skill removes it from Task.skills without sending
+        m2m_changed. Profile masks are updated as its ProfileSkills are
+        deleted.)
+    """
+    instance.affected_task_ids = list(Task.objects.filter(skills=instance).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Skill)
+def rerank_skill_tasks(sender, instance, **kwargs):
+    """ Updates the skill masks of the Tasks which listed a deleted Skill, then
+        re-ranks them in every feed
+    """
+    for task in Task.objects.filter(id__in=getattr(instance, 'affected_task_ids', [])):
+        task.update_skill_mask()
+        feed.refresh_task(task)
+
+
+@receiver(post_save, sender=ProfileTask)
+def remove_interacted_task(sender, instance, created, raw=False, **kwargs):
+    """ Removes a Task from a Profile's feed once they have shortlisted,
+        discarded or applied for it.
+    """
+    if created and not raw:
+        feed.remove_entry(instance.profile_id, instance.task_id)
+
+
+@receiver(post_delete, sender=ProfileTask)
+def restore_interacted_task(sender, instance, **kwargs):
+    """ Puts a Task back into a Profile's feed when their ProfileTask is deleted.
+        Deferred until commit, as the Task itself may be being deleted.
+    """
+    profile_id, task_id = instance.profile_id, instance.task_id
+    transaction.on_commit(lambda: feed.restore_entry(profile_id, task_id))
+
+
+@receiver(post_delete, sender=ProfileTask)
+def remove_deleted_rating(sender, instance, **kwargs):
+    """ Removes a deleted ProfileTask's rating from its Profile's average """
+    if instance.rating is not None:
+        profile = Profile.objects.filter(pk=instance.profile_id).first()
+        # The Profile may itself be being deleted
+        if profile is not None:
+            profile.add_rating(None, replaces=instance.rating)
+            authentication.invalidate_user(profile.user_id)
+
+
+@receiver(post_save, sender=Task)
+def update_task_search_vector(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ Recomputes a Task's search vector when it is saved, unless only
+        columns it is not computed from were saved (eg. by a transition)
+    """
+    if raw or (update_fields is not None and not search.SEARCHED_FIELDS & set(update_fields)):
+        return
+    search.update_search_vectors([instance.pk])
+
+
+@receiver(m2m_changed, sender=Task.skills.through)
+def update_task_skills_search_vectors(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Recomputes the search vectors of Tasks when their skills change """
+    if reverse and action == 'pre_clear':
+        # pk_set is not given when clearing Skill.task_set, so note the Tasks
+        # before they are removed
+        instance.cleared_task_ids = list(instance.task_set.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        search.update_search_vectors([instance.pk])
+    else:
+        search.update_search_vectors(pk_set or getattr(instance, 'cleared_task_ids', []))
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_search_vectors(sender, instance, created, raw=False, **kwargs):
+    """ Recomputes the search vectors of the Tasks listing a Skill when it is
+        renamed
+    """
+    if not created and not raw:
+        search.update_skill_tasks(instance)
+
+
+@receiver(post_delete, sender=Skill)
+def remove_skill_search_vectors(sender, instance, **kwargs):
+    """ Recomputes the search vectors of the Tasks which listed a deleted Skill """
+    search.update_search_vectors(getattr(instance, 'affected_task_ids', []))
+
+
+@receiver(post_save, sender=User)
+def update_owner_search_vectors(sender, instance, created, raw=False, **kwargs):
+    """ Recomputes the search vectors of a User's Tasks, as they include the
+        owner's name
+    """
+    if not created and not raw:
+        search.update_owner_tasks(instance)
+
+
+@receiver(post_save, sender=User)
+def touch_user_profile(sender, instance, created, raw=False, **kwargs):
+    """ Updates the updated_at of a User's Profile, as its serialized
+        fragments include the User
+    """
+    if not created and not raw:
+        Profile.objects.filter(user=instance).update(updated_at=now())
+
+
+@receiver(post_save, sender=Task)
+def update_task_suggestion(sender, instance, raw=False, **kwargs):
+    """ Updates (or removes, once no longer Open) a Task's autocomplete
+        suggestions
+    """
+    if not raw:
+        suggest.index.update('set_task', instance.pk, instance.title, instance.location, instance.created_at,
+            instance.status == Task.OPEN)
+
+
+@receiver(pre_delete, sender=Task)
+def note_task_skills(sender, instance, **kwargs):
+    """ Notes the Skills of a Task which is being deleted, whose task counts
+        will change
+    """
+    instance.deleted_skill_ids = list(instance.skills.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def remove_task_suggestion(sender, instance, **kwargs):
+    """ Removes a deleted Task's autocomplete suggestions """
+    suggest.index.update('remove_task', instance.pk)
+    suggest.index.update_skills(getattr(instance, 'deleted_skill_ids', []))
+
+
+@receiver(m2m_changed, sender=Task.skills.through)
+def update_skill_suggestions(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Updates the task counts the autocomplete ranks Skills by """
+    if not reverse and action == 'pre_clear':
+        # pk_set is not given when clearing Task.skills, so note the Skills
+        # before they are removed
+        instance.cleared_skill_ids = list(instance.skills.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        suggest.index.update_skills([instance.pk])
+    else:
+        suggest.index.update_skills(pk_set or getattr(instance, 'cleared_skill_ids', []))
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_suggestion(sender, instance, raw=False, **kwargs):
+    """ Updates a Skill's autocomplete suggestion """
+    if not raw:
+        suggest.index.update_skills([instance.pk])
+
+
+@receiver(post_delete, sender=Skill)
+def remove_skill_suggestion(sender, instance, **kwargs):
+    """ Removes a deleted Skill's autocomplete suggestion """
+    suggest.index.update('remove_skill', instance.pk)
+
+
+@receiver(pre_delete, sender=Task)
+def record_task_deletion(sender, instance, **kwargs):
+    """ Records a deleted Task for its owner, helper and applicants """
+    profile_ids = list(ProfileTask.objects.filter(task=instance).values_list('profile_id', flat=True))
+    sync.record_deletion(sync.TASKS, instance.pk, profile_ids + [instance.owner_id, instance.helper_id])
+
+
+@receiver(pre_delete, sender=ProfileTask)
+def record_profile_task_deletion(sender, instance, **kwargs):
+    """ Records a deleted ProfileTask for its profile and the task's owner """
+    owner_ids = list(Task.objects.filter(pk=instance.task_id).values_list('owner_id', flat=True))
+    sync.record_deletion(sync.PROFILE_TASKS, instance.pk, owner_ids + [instance.profile_id])
+
+
+@receiver(pre_delete, sender=Profile)
+def record_profile_deletion(sender, instance, **kwargs):
+    """ Records a deleted Profile for every profile """
+    sync.record_deletion(sync.PROFILES, instance.pk)
+
+
+@receiver(pre_delete, sender=Skill)
+def record_skill_deletion(sender, instance, **kwargs):
+    """ Records a deleted Skill for every profile """
+    sync.record_deletion(sync.SKILLS, instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """ Stops a deleted token authenticating from the token cache """
+    authentication.invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_user_tokens(sender, instance, raw=False, **kwargs):
+    """ Drops the cached User and Profile of a changed User's tokens """
+    if not raw:
+        authentication.invalidate_user(instance.pk if sender is User else instance.user_id)
@@ -0,0 +1,98 @@
+"""job_bilby Skill bitmasks for the Jobs application
+
+Each Skill owns one bit. Tasks and Profiles carry the OR of their skills' bits
+in a `skill_mask` column, so matching skills can be scored with bit operations
+(in Python, or in SQL) instead of joining through the skill tables.
+
+Only the first 63 Skills get a bit. Any further Skills are left without one,
+and set the OVERFLOW flag in the masks of the Tasks and Profiles listing them;
+matches on those Skills are then counted by joining through the skill tables
+(see TaskQuerySet.ranked_for and jobs.feed.ranked_profiles).
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F, IntegerField, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Masks are stored in signed 64 bit integer columns, so Skills get bits 0-62
+MAX_SKILL_BITS = 63
+
+# The sign bit, set in masks which include Skills without a bit
+OVERFLOW = -(1 << MAX_SKILL_BITS)
+
+
+def bit_value(bit):
+    """ Gets the mask value of a single skill bit """
+    return 1 << bit
+
+
+def mask_of(bits):
+    """ Gets the mask with each of the given skill bits set.
+        A None bit (a Skill without a bit) sets the OVERFLOW flag.
+    """
+    mask = 0
+    for bit in bits:
+        mask |= OVERFLOW if bit is None else bit_value(bit)
+    return mask
+
+
+def has_overflow(mask):
+    """ Whether a mask includes Skills without a bit """
+    return mask & OVERFLOW != 0
+
+
+def bits_of(mask):
+    """ Gets the skill bits set in a mask """
+    return [bit for bit in range(MAX_SKILL_BITS) if mask & bit_value(bit)]
+
+
+def popcount(mask):
+    """ Gets the number of skill bits set in a mask (not counting OVERFLOW) """
+    return len(bits_of(mask))
+
+
+def match_score(task_mask, profile_mask):
+    """ Scores how well a Profile's skills match a Task's skills.
+        1 point per skill in common, minus 1 point per skill the Task lists
+        which the Profile is missing.
+        Only Skills with a bit are scored.
+    """
+    return popcount(task_mask & profile_mask) - popcount(task_mask & ~profile_mask)
+
+
+def matched_count(mask, field='skill_mask'):
+    """ Gets an expression counting how many of the bits in `mask` are also
+        set in the `field` column.
+        Expanded into one term per set bit (a mask has at most 63), using
+        only bitwise AND and integer division, so it works on any database.
+    """
+    count = Value(0, output_field=BigIntegerField())
+    for bit in bits_of(mask):
+        value = Value(bit_value(bit), output_field=BigIntegerField())
+        count = count + F(field).bitand(value) / value
+    return ExpressionWrapper(count, output_field=IntegerField())
+
+
+def overflow_count(rows, owner, skill_ids):
+    """ Gets an expression counting how many of the skill rows (ProfileSkills
+        or Task.skills rows, filtered on the outer query's owner) are for one
+        of skill_ids. Used to match the Skills without a bit.
+    """
+    matched = rows.filter(skill_id__in=skill_ids).order_by().values(owner)
+    count = matched.annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(count[:1], output_field=IntegerField()), Value(0))
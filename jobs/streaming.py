@@ -0,0 +1,112 @@
+"""job_bilby Streaming list responses
+
+Large lists can be streamed rather than built in memory: the rows are read
+with a server-side cursor (QuerySet.iterator), serialized and rendered a chunk
+at a time, and written into a StreamingHttpResponse, gzipped on the fly when
+the client accepts it. Memory use stays flat however long the list is.
+Streaming is asked for with ?stream=true, and only applies to whole
+(unpaginated) JSON lists.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import itertools
+import re
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from jobs.compiled import compile_serializer
+from jobs.renderers import StreamingJSONRenderer
+
+STREAM_PARAM = 'stream'
+CHUNK_SIZE = 500
+
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def wants_stream(request):
+    """ Whether the request asked for the list to be streamed """
+    return request.query_params.get(STREAM_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def iter_serialized(queryset, serializer, chunk_size=CHUNK_SIZE):
+    """ Yields the representations of a queryset's objects, as lists of at
+        most chunk_size objects.
+        The compiled read path is used when the serializer can be compiled
+        (see jobs.compiled). Otherwise the objects are read with a
+        server-side cursor, which skips prefetching, so the queryset's
+        prefetch lookups are applied to each chunk in turn.
+    """
+    compiled = compile_serializer(serializer, queryset)
+    if compiled is not None:
+        for chunk in compiled.iter_serialize(queryset, chunk_size):
+            yield chunk
+        return
+
+    lookups = queryset._prefetch_related_lookups
+    objects = queryset.iterator()
+    chunk = list(itertools.islice(objects, chunk_size))
+    while chunk:
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        yield type(serializer)(chunk, many=True, context=serializer.context).data
+        chunk = list(itertools.islice(objects, chunk_size))
+
+
+def streaming_response(request, queryset, serializer, chunk_size=CHUNK_SIZE):
+    """ Gets a StreamingHttpResponse of the serialized queryset, rendered as
+        a JSON list.
+        The status and headers are sent before the rows are read, so errors
+        while streaming cut the response short rather than giving an error
+        response.
+    """
+    renderer = StreamingJSONRenderer()
+    body = renderer.render_chunks(
+        iter_serialized(queryset, serializer, chunk_size),
+        renderer.media_type,
+        {'request': request}
+    )
+    gzipped = re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if gzipped:
+        body = compress_sequence(body)
+
+    response = StreamingHttpResponse(body, content_type=renderer.media_type)
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+class StreamingListMixin(object):
+    """ Streams the view's list when asked to (see wants_stream), unless a
+        page of it was asked for or it is not rendered as plain JSON
+    """
+    stream_chunk_size = CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        paginator = self.paginator
+        paged = paginator is not None and any(
+            getattr(paginator, param, None) in request.query_params
+            for param in ('page_size_query_param', 'cursor_query_param', 'page_query_param',
+                'limit_query_param', 'offset_query_param')
+        )
+        if not wants_stream(request) or paged or request.accepted_renderer.format != 'json':
+            return super(StreamingListMixin, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return streaming_response(request, queryset, self.get_serializer(), self.stream_chunk_size)
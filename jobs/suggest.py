@@ -0,0 +1,355 @@
+"""job_bilby Autocomplete suggestions for the Jobs application
+
+Suggests open Task titles, Skills and locations from an in-process prefix
+trie, so suggestions are served without touching the database. The trie is
+rebuilt on the next request after Tasks or Skills change (and at least every
+SUGGEST_MAX_AGE seconds, to pick up changes made by other processes).
+Matching is on the start of any word, and tolerates one typo (including two
+swapped letters) once the query is long enough.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import re, threading, time
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from jobs.models import Skill, Task
+
+# Number of suggestions kept at each trie node (the most that can be asked for)
+MAX_SUGGESTIONS = 20
+
+# Queries at least this long may contain one typo
+FUZZY_MIN_LENGTH = 4
+
+# Number of suggestions replaced or removed since the trie was built after
+# which it is rebuilt, as nodes may have lost suggestions they should hold
+MAX_STALE_ENTRIES = 1000
+
+
+def _words(text):
+    """ Splits text into lower-case words """
+    return re.findall(r'\w+', text.lower())
+
+
+class PrefixTrie(object):
+    """ A character trie from lower-case keys to suggestions.
+        Every node keeps the best MAX_SUGGESTIONS suggestions below it, so
+        a prefix lookup costs the length of the prefix.
+        A suggestion can be re-inserted with a new sort key, or discarded;
+        entries for its old sort key are then skipped, and dropped from a
+        node as it takes new entries.
+    """
+
+    def __init__(self):
+        self.root = self._node()
+        # The current sort key of each suggestion
+        self.current = {}
+        # Number of suggestions replaced or discarded
+        self.stale = 0
+
+    @staticmethod
+    def _node():
+        # [children, [(sort key, suggestion), ...]]
+        return [{}, []]
+
+    def _live(self, entry):
+        return self.current.get(entry[1]) == entry[0]
+
+    def _keep(self, node, entry):
+        best = node[1]
+        if entry in best:
+            return
+        if len(best) == MAX_SUGGESTIONS:
+            best[:] = [item for item in best if self._live(item)]
+        if len(best) < MAX_SUGGESTIONS or entry[0] < best[-1][0]:
+            best.append(entry)
+            best.sort(key=lambda item: item[0])
+            del best[MAX_SUGGESTIONS:]
+
+    def insert(self, key, sort_key, suggestion):
+        """ Adds a suggestion under key. Lower sort keys are suggested first """
+        previous = self.current.get(suggestion)
+        if previous is not None and previous != sort_key:
+            self.stale += 1
+        self.current[suggestion] = sort_key
+        entry = (sort_key, suggestion)
+        node = self.root
+        self._keep(node, entry)
+        for char in key:
+            node = node[0].setdefault(char, self._node())
+            self._keep(node, entry)
+
+    def discard(self, suggestion):
+        """ Stops a suggestion being suggested """
+        if self.current.pop(suggestion, None) is not None:
+            self.stale += 1
+    def _find(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return None
+        return node
+
+    def _fuzzy_nodes(self, prefix, max_edits):
+        """ Gets the nodes whose key is within max_edits of prefix, counting
+            insertions, deletions, substitutions and swapped adjacent letters.
+            The trie is walked with one row of the edit distance table per
+            character, pruning branches that can no longer match.
+        """
+        found = []
+        first_row = list(range(len(prefix) + 1))
+
+        def walk(node, char, previous_char, previous_row, before_row):
+            row = [previous_row[0] + 1]
+            for column in range(1, len(prefix) + 1):
+                cost = min(
+                    row[column - 1] + 1,
+                    previous_row[column] + 1,
+                    previous_row[column - 1] + (prefix[column - 1] != char)
+                )
+                if (before_row and column > 1 and char == prefix[column - 2]
+                        and previous_char == prefix[column - 1]):
+                    cost = min(cost, before_row[column - 2] + 1)
+                row.append(cost)
+            if row[-1] <= max_edits:
+                found.append(node)
+            elif min(row) <= max_edits:
+                for next_char, child in node[0].items():
+                    walk(child, next_char, char, row, previous_row)
+
+        for char, child in self.root[0].items():
+            walk(child, char, None, first_row, None)
+        return found
+
+    def search(self, prefix, limit, max_edits=0):
+        """ Gets up to limit suggestions for keys starting with prefix.
+            Exact prefix matches come first, then those within max_edits.
+        """
+        nodes = [self._find(prefix)]
+        if max_edits:
+            nodes += self._fuzzy_nodes(prefix, max_edits)
+
+        results = []
+        for node in nodes:
+            if node is None:
+                continue
+            for entry in node[1]:
+                suggestion = entry[1]
+                if self._live(entry) and suggestion not in results:
+                    results.append(suggestion)
+                    if len(results) == limit:
+                        return results
+        return results
+
+
+class SuggestionTrie(PrefixTrie):
+    """ A PrefixTrie of Skills, and the titles and locations of Open Tasks,
+        which is kept up to date as they change.
+        Skills are ranked by how many tasks use them, locations by how many
+        open tasks are in them, and task titles by which is most recent.
+    """
+
+    def __init__(self):
+        super(SuggestionTrie, self).__init__()
+        # Skill id: suggestion
+        self.skills = {}
+        # Open Task id: (suggestion, location key)
+        self.tasks = {}
+        # Location key: [spelling, number of open tasks]
+        self.locations = {}
+
+    def _put(self, sort_key, suggestion):
+        for word in set(_words(suggestion[2])):
+            self.insert(word, sort_key, suggestion)
+
+    def set_skill(self, skill_id, title, task_count):
+        """ Adds or updates a Skill """
+        suggestion = ('skill', skill_id, title)
+        previous = self.skills.get(skill_id)
+        if previous is not None and previous != suggestion:
+            self.discard(previous)
+        self.skills[skill_id] = suggestion
+        self._put((0, -task_count, title), suggestion)
+
+    def remove_skill(self, skill_id):
+        """ Removes a deleted Skill """
+        suggestion = self.skills.pop(skill_id, None)
+        if suggestion is not None:
+            self.discard(suggestion)
+
+    def _count_location(self, location, change):
+        """ Adds change to the number of open tasks in a location.
+            Locations are grouped case-insensitively, keeping the first
+            spelling.
+        """
+        name = location.strip()
+        if not name:
+            return
+        spelling, count = self.locations.get(name.lower(), (name, 0))
+        suggestion = ('location', None, spelling)
+        count += change
+        if count > 0:
+            self.locations[name.lower()] = (spelling, count)
+            self._put((1, -count, spelling), suggestion)
+        else:
+            self.locations.pop(name.lower(), None)
+            self.discard(suggestion)
+
+    def set_task(self, task_id, title, location, created_at, is_open):
+        """ Adds, updates or (once it is no longer open) removes a Task """
+        self.remove_task(task_id)
+        if not is_open:
+            return
+        suggestion = ('task', task_id, title)
+        self.tasks[task_id] = (suggestion, location)
+        self._count_location(location, 1)
+        self._put((2, -created_at.timestamp(), task_id), suggestion)
+
+    def remove_task(self, task_id):
+        """ Removes a Task """
+        suggestion, location = self.tasks.pop(task_id, (None, None))
+        if suggestion is not None:
+            self.discard(suggestion)
+            self._count_location(location, -1)
+
+
+def skill_counts(skill_ids=None):
+    """ Gets (id, title, number of tasks) for the given Skills, or every Skill """
+    skills = Skill.objects.all() if skill_ids is None else Skill.objects.filter(pk__in=list(skill_ids))
+    return skills.annotate(task_count=Count('task')).values_list('id', 'title', 'task_count')
+
+
+def build_trie():
+    """ Builds a trie of every Skill, and the titles and locations of every
+        Open Task.
+    """
+    trie = SuggestionTrie()
+    for skill_id, title, task_count in skill_counts():
+        trie.set_skill(skill_id, title, task_count)
+    tasks = Task.objects.filter(status=Task.OPEN).values_list('id', 'title', 'location', 'created_at')
+    for task_id, title, location, created_at in tasks:
+        trie.set_task(task_id, title, location, created_at, True)
+    # Building replaces nothing
+    trie.stale = 0
+    return trie
+
+
+class SuggestionIndex(object):
+    """ Holds the current trie, updating it as Skills and Tasks change.
+        The trie is built on the first request. It is rebuilt in the
+        background (and swapped in once built) every SUGGEST_MAX_AGE
+        seconds, to pick up changes made by other processes, or once
+        MAX_STALE_ENTRIES suggestions have been replaced.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.trie = None
+        self.built_at = 0
+        # Changes made while the trie is being rebuilt, to replay on the new
+        # trie. None when no rebuild is running
+        self.pending = None
+
+    def reset(self):
+        """ Drops the trie, so it is built on the next request """
+        with self.lock:
+            self.trie = None
+
+    def update(self, change, *args):
+        """ Applies a change (a SuggestionTrie method name and arguments) to
+            the trie, if it has been built
+        """
+        with self.lock:
+            if self.trie is None:
+                return
+            getattr(self.trie, change)(*args)
+            if self.pending is not None:
+                self.pending.append((change, args))
+
+    def update_skills(self, skill_ids):
+        """ Updates the titles and task counts of the given Skills """
+        if self.trie is not None and skill_ids:
+            for skill in skill_counts(skill_ids):
+                self.update('set_skill', *skill)
+
+    def get_trie(self):
+        max_age = getattr(settings, 'SUGGEST_MAX_AGE', 60)
+        with self.lock:
+            if self.trie is None:
+                self.built_at = time.time()
+                self.trie = build_trie()
+            elif self.pending is None and (time.time() - self.built_at > max_age
+                    or self.trie.stale > MAX_STALE_ENTRIES):
+                self.built_at = time.time()
+                self.pending = []
+                threading.Thread(target=self._rebuild_in_background, daemon=True).start()
+            return self.trie
+
+    def rebuild(self):
+        """ Builds a new trie, then swaps it in with the changes made to the
+            old trie while it was built
+        """
+        with self.lock:
+            if self.pending is None:
+                self.pending = []
+        try:
+            trie = build_trie()
+            with self.lock:
+                for change, args in self.pending:
+                    getattr(trie, change)(*args)
+                self.trie = trie
+        finally:
+            with self.lock:
+                self.pending = None
+
+    def _rebuild_in_background(self):
+        try:
+            self.rebuild()
+        finally:
+            # The thread's own database connection
+            connection.close()
+
+    def search(self, prefix, limit, max_edits):
+        trie = self.get_trie()
+        with self.lock:
+            return trie.search(prefix, limit, max_edits)
+
+    def suggest(self, query, limit=10):
+        """ Gets up to limit suggestions for the last (partly typed) word of
+            query, as dicts with type, id and text.
+        """
+        words = _words(query)
+        if not words:
+            return []
+        prefix, earlier = words[-1], words[:-1]
+        max_edits = 1 if len(prefix) >= FUZZY_MIN_LENGTH else 0
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+        suggestions = []
+        for kind, suggestion_id, text in self.search(prefix, MAX_SUGGESTIONS, max_edits):
+            # Earlier words of the query must start words of the suggestion
+            text_words = _words(text)
+            if all(any(word.startswith(query_word) for word in text_words) for query_word in earlier):
+                suggestions.append({'type': kind, 'id': suggestion_id, 'text': text})
+                if len(suggestions) == limit:
+                    break
+        return suggestions
+
+
+index = SuggestionIndex()
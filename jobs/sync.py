@@ -0,0 +1,181 @@
+"""job_bilby Delta sync for the Jobs application
+
+The mobile app keeps a local copy of the rows relevant to its user: their
+tasks (posted, helped with or interacted with), the ProfileTasks on those,
+the profiles involved and every skill. /sync/?since=<cursor> gives the rows
+changed since the cursor, the ids of rows deleted (or disabled) since, and a
+new cursor for the next sync. Without a cursor, every relevant row is given.
+
+Deletions are recorded as Tombstones as rows are deleted, and kept for
+SYNC_TOMBSTONE_MAX_AGE days (see the prune_tombstones command). Cursors older
+than that can no longer be synced from; the full set of rows is given
+instead, with "reset" set, so the app can drop its copy.
+
+updated_at is set when a row is saved, before its transaction commits, so
+new cursors are taken SYNC_CURSOR_MARGIN seconds before the sync started:
+rows saved by transactions still open then are given again next time.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+import base64
+import binascii
+import datetime
+import json
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+from rest_framework.exceptions import ParseError
+from jobs.models import Profile, ProfileTask, Skill, Task, Tombstone
+from jobs.serializers import (
+    ProfileTaskPostSerializer, ProfileUserSerializer, SkillSerializer, TaskPostSerializer, eager_load
+)
+
+TASKS = 'tasks'
+PROFILE_TASKS = 'profile_tasks'
+PROFILES = 'profiles'
+SKILLS = 'skills'
+
+invalid_cursor_message = 'Invalid cursor'
+
+
+def encode_cursor(moment):
+    """ Gets an opaque token for a point in time """
+    return base64.urlsafe_b64encode(json.dumps({'t': moment.isoformat()}).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token):
+    """ Gets the point in time of a cursor, or None for no cursor """
+    if not token:
+        return None
+    try:
+        moment = parse_datetime(json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))['t'])
+        assert moment is not None and moment.tzinfo is not None
+    except (TypeError, ValueError, KeyError, AssertionError, UnicodeError, binascii.Error):
+        raise ParseError(invalid_cursor_message)
+    return moment
+
+
+def record_deletion(kind, object_id, profile_ids=None):
+    """ Records the deletion of a row for the given profiles, or for every
+        profile
+    """
+    if profile_ids is None:
+        Tombstone.objects.create(kind=kind, object_id=object_id)
+    else:
+        Tombstone.objects.bulk_create([
+            Tombstone(kind=kind, object_id=object_id, profile_id=profile_id)
+            for profile_id in set(profile_ids) if profile_id is not None
+        ])
+
+
+def relevant_rows(profile):
+    """ Gets the querysets of every row relevant to a profile, by kind """
+    tasks = Task.objects.filter(
+        Q(owner=profile) | Q(helper=profile) |
+        Q(pk__in=ProfileTask.objects.filter(profile=profile).values('task'))
+    )
+    profile_tasks = ProfileTask.objects.filter(Q(profile=profile) | Q(task__owner=profile))
+    profiles = Profile.objects.filter(
+        Q(pk=profile.pk) |
+        Q(pk__in=tasks.values('owner')) | Q(pk__in=tasks.values('helper')) |
+        Q(pk__in=profile_tasks.values('profile'))
+    )
+    return OrderedDict([
+        (TASKS, tasks),
+        (PROFILE_TASKS, profile_tasks),
+        (PROFILES, profiles),
+        (SKILLS, Skill.objects.all()),
+    ])
+
+
+def changed_rows(profile, since):
+    """ Gets the querysets of the rows relevant to a profile changed since a
+        point in time, by kind. Rows newly referenced by changed rows (eg.
+        the task of a new ProfileTask) are included too, as the app may not
+        have them.
+    """
+    rows = relevant_rows(profile)
+    if since is None:
+        return rows
+
+    profile_tasks = rows[PROFILE_TASKS].filter(updated_at__gt=since)
+    tasks = rows[TASKS].filter(Q(updated_at__gt=since) | Q(pk__in=profile_tasks.values('task')))
+    profiles = rows[PROFILES].filter(
+        Q(updated_at__gt=since) |
+        Q(pk__in=tasks.values('owner')) | Q(pk__in=tasks.values('helper')) |
+        Q(pk__in=profile_tasks.values('profile'))
+    )
+    return OrderedDict([
+        (TASKS, tasks),
+        (PROFILE_TASKS, profile_tasks),
+        (PROFILES, profiles),
+        (SKILLS, rows[SKILLS].filter(updated_at__gt=since)),
+    ])
+
+
+SERIALIZERS = {
+    TASKS: TaskPostSerializer,
+    PROFILE_TASKS: ProfileTaskPostSerializer,
+    PROFILES: ProfileUserSerializer,
+    SKILLS: SkillSerializer,
+}
+
+
+def changes(profile, since, request):
+    """ Gets the sync response for a profile: the rows changed since a point
+        in time (or every row), the ids of rows deleted or disabled since,
+        and the next cursor
+    """
+    started = now()
+    reset = since is not None and since < started - datetime.timedelta(days=settings.SYNC_TOMBSTONE_MAX_AGE)
+    if reset:
+        since = None
+
+    deleted = OrderedDict((kind, []) for kind in SERIALIZERS)
+    response = OrderedDict()
+    response['cursor'] = encode_cursor(started - datetime.timedelta(seconds=settings.SYNC_CURSOR_MARGIN))
+    response['reset'] = reset
+    for kind, queryset in changed_rows(profile, since).items():
+        serializer_class = SERIALIZERS[kind]
+        queryset = eager_load(queryset.order_by('updated_at', 'pk'), serializer_class(context={'request': request}))
+        rows = []
+        for row in queryset:
+            if row.enabled:
+                rows.append(row)
+            elif since is not None:
+                deleted[kind].append(row.pk)
+        response[kind] = serializer_class(rows, many=True, context={'request': request}).data
+
+    if since is not None:
+        tombstones = Tombstone.objects.filter(Q(profile=profile) | Q(profile=None), deleted_at__gt=since)
+        for kind, object_id in tombstones.order_by('deleted_at').values_list('kind', 'object_id'):
+            if kind in deleted:
+                deleted[kind].append(object_id)
+        for kind, object_ids in deleted.items():
+            deleted[kind] = sorted(set(object_ids))
+    response['deleted'] = deleted
+    return response
+
+
+def prune_tombstones():
+    """ Deletes tombstones too old to be synced. Returns how many """
+    cutoff = now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_MAX_AGE)
+    count, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return count
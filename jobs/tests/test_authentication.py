@@ -0,0 +1,125 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from jobs import authentication
+from jobs.authentication import CachedTokenAuthentication
+from jobs.models import ProfileSkill
+from jobs.tests.test_helper import *
+
+
+class TestCachedTokenAuthentication(APITestCase):
+    """ Tests for the token cache """
+
+    def setUp(self):
+        """ Start from an empty cache, with a logged in user """
+        authentication.cache.configure()
+        self.profile = create_profile(1)
+        self.token = api_login(self.profile.user)
+
+    def tearDown(self):
+        authentication.cache.configure()
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION='Token {}'.format(token or self.token))
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_cached(self):
+        """ A cached token should give its user and profile without queries.
+            ID: UT-A01.01
+        """
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+            self.assertEqual(user.profile.id, self.profile.id)
+            self.assertEqual(user.profile.user.username, self.profile.user.username)
+        self.assertEqual(token.key, self.token)
+        self.assertEqual((authentication.cache.hits, authentication.cache.misses), (1, 1))
+
+        # Each request gets its own instances
+        user.first_name = "Changed"
+        self.assertNotEqual(self.authenticate()[0].first_name, "Changed")
+
+    def test_changed(self):
+        """ Changing the user or profile should not give the cached one.
+            ID: UT-A01.02
+        """
+        self.authenticate()
+        self.profile.user.first_name = "Renamed"
+        self.profile.user.save()
+        self.assertEqual(self.authenticate()[0].first_name, "Renamed")
+
+        self.profile.location = "Hobart"
+        self.profile.save()
+        self.assertEqual(self.authenticate()[0].profile.location, "Hobart")
+
+        ProfileSkill.objects.create(profile=self.profile, skill=create_skill("Python"))
+        self.assertNotEqual(self.authenticate()[0].profile.skill_mask, 0)
+
+        self.profile.user.is_active = False
+        self.profile.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted(self):
+        """ A deleted token should no longer authenticate.
+            ID: UT-A01.03
+        """
+        self.authenticate()
+        self.profile.user.auth_token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('not a token')
+
+    def test_expired(self):
+        """ Entries should expire, and the cache be turned off by a TTL of 0.
+            ID: UT-A01.04
+        """
+        self.authenticate()
+        key, (expires, entry) = next(iter(authentication.cache.local.items.items()))
+        authentication.cache.local.set(key, (0, entry))
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+        with override_settings(AUTH_CACHE_TTL=0):
+            authentication.cache.configure()
+            self.authenticate()
+            with self.assertNumQueries(1):
+                user, token = self.authenticate()
+            self.assertEqual(user.profile.id, self.profile.id)
+
+    @override_settings(AUTH_CACHE_SIZE=0, AUTH_CACHE_ALIAS='default')
+    def test_shared(self):
+        """ Tokens should be read from the shared cache without a local tier,
+            and dropped from it when deleted.
+            ID: UT-A01.05
+        """
+        authentication.cache.configure()
+        authentication.cache.shared.clear()
+        self.authenticate()
+        with self.assertNumQueries(0):
+            self.authenticate()
+        self.assertEqual((authentication.cache.shared_hits, authentication.cache.misses), (1, 1))
+
+        self.profile.user.auth_token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_stats(self):
+        """ The hit rate should be given to admins only.
+            ID: UT-A01.06
+        """
+        url = reverse('auth-cache-stats')
+        response = self.client.get(url, HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.profile.user.is_staff = True
+        self.profile.user.save()
+        authentication.cache.configure()
+        self.client.get(url, HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        response = self.client.get(url, HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['hit_rate'], 0.5)
@@ -0,0 +1,89 @@
+import datetime
+
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from jobs.compiled import compile_serializer
+from jobs.models import Profile, ProfileSkill, ProfileTask, Task
+from jobs.serializers import *
+from jobs.tests.test_helper import *
+
+
+class TestCompiledSerializers(APITestCase):
+    """ Tests for the compiled read path, which must give the same JSON as
+        the serializers it is compiled from
+    """
+
+    def setUp(self):
+        """ Create a poster (with a photo), a helper and skilled tasks, one
+            assigned to the helper
+        """
+        self.poster = create_profile(1)
+        Profile.objects.filter(pk=self.poster.pk).update(photo='2017/10/01/poster.png')
+        self.helper = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.skill2 = create_skill("PHP")
+        self.tasks = [create_task(self.poster, num) for num in range(1, 4)]
+        self.tasks[0].skills.add(self.skill1, self.skill2)
+        self.tasks[1].skills.add(self.skill1)
+        Task.objects.filter(pk=self.tasks[0].pk).update(helper=self.helper, date_due=datetime.date(2017, 10, 15))
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill2)
+        for task in self.tasks:
+            ProfileTask.objects.create(profile=self.helper, task=task, status=ProfileTask.APPLIED)
+
+    def assertSameJSON(self, serializer_class, queryset, params=None):
+        request = Request(APIRequestFactory().get('/', params))
+        context = {'request': request}
+        compiled = compile_serializer(serializer_class(context=context), queryset)
+        self.assertIsNotNone(compiled)
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+        self.assertEqual(JSONRenderer().render(compiled.serialize(queryset)), expected)
+
+    def test_task(self):
+        """ Tasks, with nested profiles, users and skills, should be the same.
+            ID: UT-C01.01
+        """
+        self.assertSameJSON(TaskGetSerializer, Task.objects.all())
+
+    def test_ranked_task(self):
+        """ The annotated rank should be given as the display rank.
+            ID: UT-C01.02
+        """
+        self.assertSameJSON(TaskGetSerializer, Task.objects.ranked_for(self.helper).order_by('-rank'))
+
+    def test_profile_task(self):
+        """ ProfileTasks, with nested tasks, should be the same.
+            ID: UT-C01.03
+        """
+        self.assertSameJSON(ProfileTaskGetSerializer, ProfileTask.objects.all())
+
+    def test_other_serializers(self):
+        """ Skills (with a method field) and profiles with their skills should
+            be the same.
+            ID: UT-C01.04
+        """
+        self.assertSameJSON(SkillSerializer, Skill.objects.all())
+        self.assertSameJSON(ProfileUserGetSerializer, Profile.objects.all())
+
+    def test_sparse_fields(self):
+        """ Only the requested fields should be compiled.
+            ID: UT-C01.05
+        """
+        self.assertSameJSON(TaskGetSerializer, Task.objects.all(),
+            {'fields': 'title,owner.photo,owner.user.first_name,skills', 'expand': 'helper'})
+
+    def test_not_compilable(self):
+        """ Serializers with fields the compiled path cannot reproduce should
+            not be compiled.
+            ID: UT-C01.06
+        """
+        class OwnerNameSerializer(serializers.ModelSerializer):
+            owner_name = serializers.CharField(source='owner.user.first_name')
+
+            class Meta:
+                model = Task
+                fields = ('id', 'owner_name')
+
+        self.assertIsNone(compile_serializer(OwnerNameSerializer(), Task.objects.all()))
@@ -0,0 +1,160 @@
+import datetime
+import decimal
+import io
+import uuid
+from collections import OrderedDict
+from unittest import skipIf
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.functional import lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from jobs import fastjson
+from jobs.models import Task
+from jobs.parsers import FastJSONParser
+from jobs.renderers import CompactJSONRenderer, FastJSONRenderer
+from jobs.serializers import TaskGetSerializer, eager_load
+from jobs.tests.test_helper import *
+
+# The backends installed here
+INSTALLED = [name for name in fastjson.BACKENDS if fastjson.load_backend(name) is not None]
+
+
+@skipIf(not INSTALLED, "No fast JSON backend installed")
+class TestFastJSON(APITestCase):
+    """ Conformance tests of the fast JSON renderer and parser with DRF's """
+
+    def render(self, data, backend, **kwargs):
+        with override_settings(JSON_BACKEND=backend):
+            return FastJSONRenderer().render(data, **kwargs)
+
+    def parse(self, body, backend):
+        with override_settings(JSON_BACKEND=backend):
+            return FastJSONParser().parse(io.BytesIO(body))
+
+    def test_values(self):
+        """ Every backend should render values as JSONRenderer does.
+            ID: UT-J01.01
+        """
+        now = timezone.now()
+        data = ReturnDict([
+            ('utc', now),
+            ('offset', now.astimezone(datetime.timezone(datetime.timedelta(hours=10)))),
+            ('naive', datetime.datetime(2017, 10, 15, 9, 30)),
+            ('date', now.date()),
+            ('time', datetime.time(9, 30, 15, 2500)),
+            ('decimal', decimal.Decimal('4.50')),
+            ('lazy', lazy(lambda: 'Lazy text', str)()),
+            ('uuid', uuid.UUID(int=1)),
+            ('text', 'Caf\u00e9 \u2028 \u2029 "quoted" </script> \x1f \\'),
+            ('numbers', ReturnList([0, -1, 2 ** 40, 1.5, 0.1 + 0.2, True, None], serializer=None)),
+            ('nested', OrderedDict([('tuple', (1, 'two')), ('empty', {})])),
+        ], serializer=None)
+        expected = JSONRenderer().render(data)
+        for backend in INSTALLED:
+            self.assertEqual(self.render(data, backend), expected, backend)
+
+    def test_serialized(self):
+        """ Serialized tasks should render as with JSONRenderer, and indented
+            output be left to it.
+            ID: UT-J01.02
+        """
+        poster = create_profile(1)
+        create_skill("Python")
+        for num in range(1, 4):
+            create_task(poster, num)
+        request = Request(APIRequestFactory().get('/tasks/'))
+        context = {'request': request}
+        tasks = eager_load(Task.objects.all(), TaskGetSerializer(context=context))
+        data = TaskGetSerializer(tasks, many=True, context=context).data
+
+        for backend in INSTALLED + [fastjson.STDLIB]:
+            self.assertEqual(self.render(data, backend), JSONRenderer().render(data), backend)
+            self.assertEqual(
+                self.render(data, backend, accepted_media_type='application/json; indent=4'),
+                JSONRenderer().render(data, accepted_media_type='application/json; indent=4')
+            )
+
+    def test_parse(self):
+        """ Every backend should parse bodies as JSONParser does, including
+            those it cannot read itself.
+            ID: UT-J01.03
+        """
+        bodies = [
+            b'{"title": "Caf\\u00e9", "skills": ["py", "js"], "offer": 10, "rate": 0.30000000000000004}',
+            b'[1, -2, 12345678901234567890123, 1e400]',
+            b'{"rate": NaN}',
+            '"Caf\u00e9 \u2028"'.encode('utf-8'),
+        ]
+        for backend in INSTALLED:
+            for body in bodies:
+                expected = JSONParser().parse(io.BytesIO(body))
+                parsed = self.parse(body, backend)
+                self.assertEqual(repr(parsed), repr(expected), (backend, body))
+
+    def test_parse_error(self):
+        """ Invalid bodies should be rejected with JSONParser's error.
+            ID: UT-J01.04
+        """
+        for backend in INSTALLED:
+            with self.assertRaises(ParseError) as raised:
+                self.parse(b'{"title": ', backend)
+            with self.assertRaises(ParseError) as expected:
+                JSONParser().parse(io.BytesIO(b'{"title": '))
+            self.assertEqual(str(raised.exception), str(expected.exception))
+
+    def test_settings(self):
+        """ The backend should follow JSON_BACKEND.
+            ID: UT-J01.05
+        """
+        with override_settings(JSON_BACKEND=fastjson.STDLIB):
+            self.assertIsNone(fastjson.get_backend())
+        with override_settings(JSON_BACKEND=fastjson.AUTO):
+            self.assertEqual(fastjson.get_backend().name, INSTALLED[0])
+        with override_settings(JSON_BACKEND='simplejson'):
+            with self.assertRaises(ValueError):
+                fastjson.get_backend()
+        exact = [name for name in INSTALLED if fastjson.load_backend(name).exact]
+        with override_settings(JSON_BACKEND=fastjson.AUTO):
+            backend = fastjson.get_backend(exact=True)
+            self.assertEqual(backend.name if backend else None, exact[0] if exact else None)
+        for name in INSTALLED:
+            with override_settings(JSON_BACKEND=name):
+                self.assertEqual(fastjson.get_backend(exact=True) is not None, name in exact)
+
+    def test_floats(self):
+        """ Floats should render as with JSONRenderer, unless the backend's own
+            notation is asked for.
+            ID: UT-J01.06
+        """
+        for floats in [[1e16, 1e-07, 1.5e-9, 2e-10, 1e22, -0.0, 5e-324], [float('nan')],
+                [float('inf'), float('-inf')], ['1e-7', 0.5]]:
+            expected = JSONRenderer().render(floats)
+            for backend in INSTALLED:
+                self.assertEqual(self.render(floats, backend), expected, (backend, floats))
+
+        for backend in INSTALLED:
+            with override_settings(JSON_BACKEND=backend):
+                compact = CompactJSONRenderer().render([1e16])
+            self.assertIn(compact, (b'[1e16]', b'[1e+16]'), backend)
+
+    def test_negotiation(self):
+        """ The backend's own notation should only be given to clients asking
+            for it.
+            ID: UT-J01.07
+        """
+        poster = create_profile(1)
+        create_task(poster, 1)
+        auth = 'Token {}'.format(api_login(poster.user))
+        response = self.client.get('/tasks/', HTTP_AUTHORIZATION=auth)
+        self.assertIs(type(response.accepted_renderer), FastJSONRenderer)
+        response = self.client.get('/tasks/', HTTP_AUTHORIZATION=auth, HTTP_ACCEPT=fastjson.MEDIA_TYPE)
+        self.assertIs(type(response.accepted_renderer), CompactJSONRenderer)
+        self.assertTrue(response['Content-Type'].startswith(fastjson.MEDIA_TYPE))
+        response = self.client.get('/tasks/', {'format': fastjson.FORMAT}, HTTP_AUTHORIZATION=auth)
+        self.assertIs(type(response.accepted_renderer), CompactJSONRenderer)
@@ -0,0 +1,218 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from jobs import feed
+from jobs.models import FeedEntry, Profile, ProfileSkill, ProfileTask, Task
+from jobs.tests.test_helper import *
+
+
+class TestFeedMaintenance(APITestCase):
+    """ Tests for keeping the materialised task feeds up to date """
+
+    def setUp(self):
+        """ Create a helper with a skill, a poster and a task """
+        self.helper = create_profile(1)
+        self.poster = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.skill2 = create_skill("PHP")
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill1)
+        self.task = create_task(self.poster, 1)
+        self.task.skills.add(self.skill1)
+
+    def test_task_added_to_feeds(self):
+        """ A new open task should be added to every feed, ranked for each
+            profile.
+            ID: UT-F01.01
+        """
+        self.assertEqual(FeedEntry.objects.get(profile=self.helper, task=self.task).rank, 1)
+        self.assertEqual(FeedEntry.objects.get(profile=self.poster, task=self.task).rank, -1)
+
+    def test_task_skills_rerank(self):
+        """ Changing the skills of a task should re-rank it in every feed.
+            ID: UT-F01.02
+        """
+        self.task.skills.add(self.skill2)
+        self.assertEqual(FeedEntry.objects.get(profile=self.helper, task=self.task).rank, 0)
+
+    def test_task_not_open_removed(self):
+        """ A task should be removed from every feed once it is no longer open.
+            ID: UT-F01.03
+        """
+        self.task.status = Task.IN_PROGRESS
+        self.task.save()
+        self.assertEqual(FeedEntry.objects.filter(task=self.task).count(), 0)
+
+    def test_profile_task_removed(self):
+        """ A task should be removed from a feed once the profile has
+            shortlisted it, but stay in other feeds.
+            ID: UT-F01.04
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-shortlist')
+        self.client.post(url, {'task': self.task.id}, format="json", HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertFalse(FeedEntry.objects.filter(profile=self.helper, task=self.task).exists())
+        self.assertTrue(FeedEntry.objects.filter(profile=self.poster, task=self.task).exists())
+
+    def test_update_skills_rerank(self):
+        """ Updating a profile's skills should re-rank their feed.
+            ID: UT-F01.05
+        """
+        token = api_login(self.helper.user)
+        url = reverse('update-skills')
+        self.client.put(url, {'skills': [self.skill2.id]}, format="json", HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(FeedEntry.objects.get(profile=self.helper, task=self.task).rank, -1)
+
+    def test_new_profile_feed(self):
+        """ A new profile's feed should contain every open task.
+            ID: UT-F01.06
+        """
+        profile = create_profile(3)
+        self.assertEqual(list(feed.feed_for(profile)), [self.task])
+
+    def test_rebuild_feeds(self):
+        """ The rebuild_feeds command should restore a feed that has drifted.
+            ID: UT-F01.07
+        """
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=open('/dev/null', 'w'))
+        self.assertEqual(FeedEntry.objects.count(), 2)
+        self.assertEqual(FeedEntry.objects.get(profile=self.helper, task=self.task).rank, 1)
+
+    def test_feed_size(self):
+        """ A feed should only keep its TASK_FEED_SIZE best ranked tasks, and
+            be topped up by rebuild_feeds --depleted once it falls below half
+            of them.
+            ID: UT-F01.08
+        """
+        with self.settings(TASK_FEED_SIZE=2):
+            # Ranked 0 for the helper, so newer than the (rank 1) task above
+            # they push out each other but not it
+            tasks = [create_task(self.poster, task_num) for task_num in range(2, 5)]
+            self.assertEqual(list(feed.feed_for(self.helper)), [self.task, tasks[2]])
+
+            ProfileTask.objects.create(profile=self.helper, task=self.task)
+            ProfileTask.objects.create(profile=self.helper, task=tasks[2])
+            self.assertFalse(feed.feed_for(self.helper).exists())
+            call_command('rebuild_feeds', '--depleted', stdout=open('/dev/null', 'w'))
+            self.assertEqual(list(feed.feed_for(self.helper)), [tasks[1], tasks[0]])
+
+    def test_unranked_save(self):
+        """ Saving a task without changing what it is ranked on should leave
+            the feeds alone.
+            ID: UT-F01.09
+        """
+        task = Task.objects.get(pk=self.task.pk)
+        task.title = "Renamed"
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        self.assertFalse([query for query in queries.captured_queries if 'jobs_feedentry' in query['sql']])
+
+    def test_create_task_fan_out(self):
+        """ Posting a task with skills should write its feed entries once,
+            ranked with its skills.
+            ID: UT-F01.10
+        """
+        token = api_login(self.poster.user)
+        data = {'title': "Task", 'description': "Desc", 'offer': 0, 'location': "Loc",
+            'skills': [self.skill1.code]}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('task-create'), data, format="json",
+                HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        inserts = [query for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "jobs_feedentry"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(FeedEntry.objects.get(profile=self.helper, task_id=response.data['id']).rank, 1)
+
+    def test_fan_out_queries(self):
+        """ Adding a task to the feeds should take the same queries however
+            many profiles there are.
+            ID: UT-F01.11
+        """
+        with CaptureQueriesContext(connection) as queries:
+            feed.refresh_task(self.task)
+        for user_num in range(3, 13):
+            create_profile(user_num)
+        with self.assertNumQueries(len(queries)):
+            feed.refresh_task(self.task)
+        self.assertEqual(FeedEntry.objects.filter(task=self.task).count(), 12)
+
+
+class TestFeedRead(APITestCase):
+    """ Tests for reading the task list from the materialised feed """
+
+    def setUp(self):
+        """ Create a helper and some tasks """
+        self.helper = create_profile(1)
+        self.poster = create_profile(2)
+        self.skill = create_skill("Python")
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill)
+        self.tasks = [create_task(self.poster, task_num) for task_num in range(10)]
+        self.tasks[3].skills.add(self.skill)
+
+    def test_feed_single_query(self):
+        """ Reading a feed should be a single query, returning each task once.
+            ID: UT-F02.01
+        """
+        with self.assertNumQueries(1):
+            tasks = list(feed.feed_for(self.helper))
+        self.assertEqual(len(tasks), 10)
+        self.assertEqual(tasks[0], self.tasks[3])
+        self.assertEqual(tasks[1], self.tasks[9])
+
+    def test_feed_matches_live_ranking(self):
+        """ The task list should be the same whether it is read from the feed
+            or ranked on the fly.
+            ID: UT-F02.02
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        response = self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        with self.settings(TASK_FEED_ENABLED=False):
+            live_response = self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, live_response.data)
+
+    def test_list_past_feed(self):
+        """ The whole list should be given, and paged through, however few
+            tasks the feed holds, including once its tasks are discarded.
+            ID: UT-F02.03
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+
+        def read(**params):
+            """ Reads the list, following the next links when paged """
+            response = self.client.get(url, params, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+            if 'page_size' not in params:
+                return [task["id"] for task in response.data]
+            ids = []
+            while True:
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                ids += [task["id"] for task in response.data["results"]]
+                if response.data["next"] is None:
+                    return ids
+                response = self.client.get(response.data["next"], format='json',
+                    HTTP_AUTHORIZATION='Token {}'.format(token))
+
+        with self.settings(TASK_FEED_SIZE=4):
+            call_command('rebuild_feeds', stdout=open('/dev/null', 'w'))
+            with self.settings(TASK_FEED_ENABLED=False):
+                expected = read()
+            self.assertEqual(len(expected), 10)
+            self.assertEqual(read(), expected)
+            self.assertEqual(read(page_size=3), expected)
+
+            # Discarding every task in the feed, and more
+            for task_id in expected[:5]:
+                self.client.post(reverse('task-discard'), {'task': task_id}, format='json',
+                    HTTP_AUTHORIZATION='Token {}'.format(token))
+            self.assertFalse(feed.feed_for(self.helper).exists())
+            self.assertEqual(read(), expected[5:])
+            self.assertEqual(read(page_size=3), expected[5:])
+            # The depleted feed was refilled when read past its end
+            self.assertEqual(list(feed.feed_for(self.helper).values_list('id', flat=True)), expected[5:9])
@@ -0,0 +1,76 @@
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from jobs import fragments
+from jobs.models import Profile
+from jobs.serializers import ProfileUserSerializer, SkillSerializer
+from jobs.tests.test_helper import *
+
+
+class TestFragmentCache(APITestCase):
+    """ Tests for the serialized fragment cache """
+
+    def setUp(self):
+        """ Start from an empty cache, with a poster and their tasks """
+        fragments.cache.configure()
+        self.poster = create_profile(1)
+        self.tasks = [create_task(self.poster, num) for num in range(1, 4)]
+
+    def serialize(self, profile, params=None):
+        request = Request(APIRequestFactory().get('/', params))
+        return ProfileUserSerializer(Profile.objects.get(pk=profile.pk), context={'request': request}).data
+
+    def test_hit(self):
+        """ An unchanged object should be serialized once.
+            ID: UT-FC01.01
+        """
+        first = self.serialize(self.poster)
+        second = self.serialize(self.poster)
+        self.assertEqual(first, second)
+        self.assertEqual((fragments.cache.hits, fragments.cache.misses), (1, 1))
+
+    def test_changed(self):
+        """ Changing an object, or its User, should not give the old fragment.
+            ID: UT-FC01.02
+        """
+        self.serialize(self.poster)
+        self.poster.user.first_name = "Renamed"
+        self.poster.user.save()
+        self.assertEqual(self.serialize(self.poster)["user"]["first_name"], "Renamed")
+        self.assertEqual(fragments.cache.misses, 2)
+
+    def test_fields(self):
+        """ Fragments for different fields should be kept apart.
+            ID: UT-FC01.03
+        """
+        self.serialize(self.poster)
+        data = self.serialize(self.poster, {'fields': 'location'})
+        self.assertEqual(set(data), {'location'})
+        self.assertEqual(fragments.cache.misses, 2)
+
+    def test_nested(self):
+        """ The poster of every task in a list should be serialized once.
+            ID: UT-FC01.04
+        """
+        token = api_login(self.poster.user)
+        response = self.client.get(reverse('task-poster'), format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual((fragments.cache.hits, fragments.cache.misses), (2, 1))
+
+    @override_settings(FRAGMENT_CACHE_SIZE=0, FRAGMENT_CACHE_ALIAS='default')
+    def test_shared(self):
+        """ Fragments should be read from the shared cache without a local tier.
+            ID: UT-FC01.05
+        """
+        fragments.cache.configure()
+        skill = create_skill("Python")
+        fragments.cache.shared.clear()
+        SkillSerializer(skill).data
+        self.assertEqual(SkillSerializer(skill).data["title"], "Python")
+        self.assertEqual((fragments.cache.shared_hits, fragments.cache.misses), (1, 1))
+        self.assertEqual(fragments.cache.stats()["size"], 0)
+
+    def tearDown(self):
+        fragments.cache.configure()
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from jobs.tests.test_helper import *
+
+
+class TestAdminMiddleware(APITestCase):
+    """ Tests for the admin only middleware """
+
+    def test_api(self):
+        """ API requests should skip the session based middleware.
+            ID: UT-M01.01
+        """
+        profile = create_profile(1)
+        token = api_login(profile.user)
+        response = self.client.get(reverse('profile-current'), HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_admin(self):
+        """ Admin requests should run the session based middleware.
+            ID: UT-M01.02
+        """
+        response = self.client.get('/admin/')
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertEqual(response['X-Frame-Options'], 'SAMEORIGIN')
+
+        User.objects.create_superuser('admin', 'admin@example.com', 'password1234')
+        self.assertTrue(self.client.login(username='admin', password='password1234'))
+        self.assertEqual(self.client.get('/admin/').status_code, status.HTTP_200_OK)
+
+    def test_admin_csrf(self):
+        """ Admin forms should still be checked for CSRF.
+            ID: UT-M01.03
+        """
+        client = Client(enforce_csrf_checks=True)
+        response = client.post('/admin/login/', {'username': 'admin', 'password': 'password1234'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn(b'CSRF', response.content)
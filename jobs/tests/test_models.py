@@ -1,8 +1,14 @@
+import io
+from decimal import Decimal
+from django.db import connection
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
+from django.test import override_settings
 from rest_framework.test import APITestCase
 
-from jobs.models import Profile, User, Task, ProfileTask, ProfileSkill
+from jobs.models import CounterShard, FeedEntry, Profile, User, Task, ProfileTask, ProfileSkill, Skill
+from jobs import counters, feed, skillmask
 from jobs.serializers import TaskGetSerializer, TaskPostSerializer
 from jobs.tests.test_helper import *
 
@@ -517,4 +523,232 @@ class TestUpdateSkills(APITestCase):
         self.client.put(url, data, format="json", HTTP_AUTHORIZATION='Token {}'.format(token))
         current_skills = ProfileSkill.objects.filter(profile=self.profile)
         self.assertEqual(len(current_skills), 1)
-        self.assertEqual(current_skills[0].skill.title, "HTML")    
\ No newline at end of file
+        self.assertEqual(current_skills[0].skill.title, "HTML")    
+
+class TestSkillMask(APITestCase):
+    """ Model tests for skill bitmasks """
+
+    def setUp(self):
+        """ Create a profile, a task and some skills """
+        self.profile = create_profile(0)
+        self.poster = create_profile(1)
+        self.task = create_task(self.poster, 0)
+        self.skill1 = create_skill("Python")
+        self.skill2 = create_skill("PHP")
+        self.skill3 = create_skill("HTML")
+
+    def test_skill_bits(self):
+        """ Each skill should be assigned its own bit, reusing freed bits.
+            ID: UT-M13.01
+        """
+        self.assertEqual([self.skill1.bit, self.skill2.bit, self.skill3.bit], [0, 1, 2])
+        self.skill2.delete()
+        self.assertEqual(create_skill("CSS").bit, 1)
+
+    def test_task_skill_mask(self):
+        """ The task's mask and skill count should follow its skills.
+            ID: UT-M13.02
+        """
+        self.task.skills.add(self.skill1, self.skill3)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.skill_mask, 0b101)
+        self.assertEqual(self.task.skill_count, 2)
+        self.task.skills.remove(self.skill1)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.skill_mask, 0b100)
+        self.assertEqual(self.task.skill_count, 1)
+
+    def test_profile_skill_mask(self):
+        """ The profile's mask should follow its ProfileSkills.
+            ID: UT-M13.03
+        """
+        profile_skill = ProfileSkill.objects.create(profile=self.profile, skill=self.skill2)
+        ProfileSkill.objects.create(profile=self.profile, skill=self.skill3)
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.skill_mask, 0b110)
+        profile_skill.delete()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.skill_mask, 0b100)
+
+    def test_skill_deleted(self):
+        """ Deleting a skill should clear its bit from every mask.
+            ID: UT-M13.04
+        """
+        self.task.skills.add(self.skill1, self.skill2)
+        ProfileSkill.objects.create(profile=self.profile, skill=self.skill1)
+        self.skill1.delete()
+        self.task.refresh_from_db()
+        self.profile.refresh_from_db()
+        self.assertEqual(self.task.skill_mask, 0b10)
+        self.assertEqual(self.task.skill_count, 1)
+        self.assertEqual(self.profile.skill_mask, 0)
+
+    def test_match_score(self):
+        """ Scoring masks in Python should agree with the rank from the database.
+            ID: UT-M13.05
+        """
+        self.task.skills.add(self.skill1, self.skill2)
+        ProfileSkill.objects.create(profile=self.profile, skill=self.skill1)
+        ProfileSkill.objects.create(profile=self.profile, skill=self.skill3)
+        self.task.refresh_from_db()
+        self.profile.refresh_from_db()
+        score = skillmask.match_score(self.task.skill_mask, self.profile.skill_mask)
+        self.assertEqual(score, 0)
+        task = Task.objects.ranked_for(self.profile).get(pk=self.task.pk)
+        self.assertEqual(task.rank, score)
+
+    def test_skills_beyond_bits(self):
+        """ Skills beyond the mask bits should be left without a bit, and
+            still be matched when ranking.
+            ID: UT-M13.06
+        """
+        skills = [create_skill("Skill {}".format(num)) for num in range(skillmask.MAX_SKILL_BITS - 2)]
+        self.assertIsNone(skills[-1].bit)
+        ProfileSkill.objects.create(profile=self.profile, skill=skills[-1])
+        self.task.skills.add(self.skill1, skills[-1])
+        self.task.refresh_from_db()
+        self.profile.refresh_from_db()
+        self.assertTrue(skillmask.has_overflow(self.task.skill_mask))
+        self.assertEqual(self.task.skill_count, 2)
+
+        # 1 skill in common, 1 missing
+        self.assertEqual(Task.objects.ranked_for(self.profile).get(pk=self.task.pk).rank, 0)
+        self.assertEqual(dict(feed.ranked_profiles(self.task))[self.profile.id], 0)
+        self.assertEqual(FeedEntry.objects.get(profile=self.profile, task=self.task).rank, 0)
+
+
+class TestRatingAggregates(APITestCase):
+    """ Model tests for the running rating totals of a Profile """
+
+    def setUp(self):
+        """ Create a helper with two rateable profile_tasks """
+        self.helper = create_profile(1)
+        self.profile_task1 = ProfileTask.objects.create(profile=self.helper, task=create_task(create_profile(2), 1))
+        self.profile_task2 = ProfileTask.objects.create(profile=self.helper, task=create_task(create_profile(3), 2))
+
+    def rate(self, profile_task, rating):
+        old_rating = profile_task.rating
+        profile_task.rating = rating
+        profile_task.save()
+        self.helper.add_rating(rating, replaces=old_rating)
+
+    def test_unrated(self):
+        """ A profile without ratings has the default rating.
+            ID: UT-M14.01
+        """
+        self.helper.add_rating(None)
+        self.helper.refresh_from_db()
+        self.assertEqual((self.helper.rating_sum, self.helper.rating_count), (0, 0))
+        self.assertEqual(self.helper.rating, 3)
+
+    def test_rerate(self):
+        """ Rating a profile_task again replaces its rating in the average.
+            ID: UT-M14.02
+        """
+        self.rate(self.profile_task1, 5)
+        self.rate(self.profile_task2, 2)
+        self.assertEqual(float(self.helper.rating), 3.5)
+        self.rate(self.profile_task2, 4)
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.rating_sum, helper.rating_count), (9, 2))
+        self.assertEqual(float(helper.rating), 4.5)
+
+    def test_delete(self):
+        """ Deleting a rated profile_task removes its rating, and the default
+            rating is restored once none are left.
+            ID: UT-M14.03
+        """
+        self.rate(self.profile_task1, 5)
+        self.rate(self.profile_task2, 2)
+        self.profile_task2.delete()
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.rating_sum, helper.rating_count, float(helper.rating)), (5, 1, 5.0))
+        self.profile_task1.delete()
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.rating_sum, helper.rating_count, float(helper.rating)), (0, 0, 3.0))
+
+    def test_reconcile(self):
+        """ Reconciling corrects drifted totals, and only those.
+            ID: UT-M14.04
+        """
+        self.rate(self.profile_task1, 5)
+        self.rate(self.profile_task2, 2)
+        self.assertEqual(counters.reconcile_ratings(), 0)
+        Profile.objects.filter(pk=self.helper.pk).update(rating_sum=1, rating_count=7, rating=1)
+        self.assertEqual(counters.reconcile_ratings(), 1)
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.rating_sum, helper.rating_count, float(helper.rating)), (7, 2, 3.5))
+        self.assertEqual(counters.reconcile_ratings(), 0)
+
+    def test_reconcile_command(self):
+        """ The reconcile_ratings command corrects drifted totals.
+            ID: UT-M14.05
+        """
+        self.rate(self.profile_task1, 4)
+        Profile.objects.filter(pk=self.helper.pk).update(rating_sum=0, rating_count=0, rating=3)
+        out = io.StringIO()
+        call_command('reconcile_ratings', stdout=out)
+        self.assertIn("Corrected the ratings of 1 profile(s)", out.getvalue())
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.rating_sum, helper.rating_count, float(helper.rating)), (4, 1, 4.0))
+
+    def test_reconcile_rounds_half_up(self):
+        """ Averages ending in a half are rounded up, as the database rounds them.
+            ID: UT-M14.06
+        """
+        for index, rating in enumerate([5, 5, 2, 1, 1, 1, 1, 1]):
+            profile_task = ProfileTask.objects.create(profile=self.helper, task=create_task(create_profile(10 + index), 10 + index))
+            self.rate(profile_task, rating)
+        if connection.vendor == 'postgresql':
+            self.assertEqual(counters.reconcile_ratings(), 0)
+        Profile.objects.filter(pk=self.helper.pk).update(rating_sum=0, rating_count=0, rating=3)
+        self.assertEqual(counters.reconcile_ratings(), 1)
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.rating_sum, helper.rating_count, helper.rating), (17, 8, Decimal('2.13')))
+        self.assertEqual(counters.reconcile_ratings(), 0)
+
+
+class TestCounters(APITestCase):
+    """ Model tests for the shortlist and completed task counters """
+
+    def setUp(self):
+        self.profile = create_profile(1)
+
+    def test_concurrent_increments(self):
+        """ Increments made through stale copies of a profile are all kept.
+            ID: UT-M15.01
+        """
+        copy = Profile.objects.get(pk=self.profile.pk)
+        self.profile.shortlist()
+        copy.shortlist()
+        copy.complete_task()
+        self.assertEqual(copy.shortlists, 2)
+        profile = Profile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.shortlists, profile.tasks_completed), (2, 1))
+
+    @override_settings(COUNTER_SHARDS=4)
+    def test_sharded_increments(self):
+        """ Sharded increments are only added to the profile once flushed.
+            ID: UT-M15.02
+        """
+        for _ in range(10):
+            self.profile.shortlist()
+        self.profile.complete_task()
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).shortlists, 0)
+        self.assertLessEqual(CounterShard.objects.filter(field='shortlists').count(), 4)
+        counters.flush_counters()
+        profile = Profile.objects.get(pk=self.profile.pk)
+        self.assertEqual((profile.shortlists, profile.tasks_completed), (10, 1))
+        self.assertFalse(CounterShard.objects.exists())
+
+    def test_reconcile(self):
+        """ Reconciling recounts the tasks a profile has completed.
+            ID: UT-M15.03
+        """
+        task = create_task(create_profile(2), 1)
+        task.helper = self.profile
+        task.status = Task.COMPLETE
+        task.save()
+        self.assertEqual(counters.reconcile_counters(), 1)
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).tasks_completed, 1)
+        self.assertEqual(counters.reconcile_counters(), 0)
@@ -0,0 +1,108 @@
+import json
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from jobs import feed, ranking
+from jobs.models import FeedEntry, Profile, ProfileSkill, ProfileTask, Task
+from jobs.tests.test_helper import *
+
+
+@skipUnless(ranking.is_available(), "Batch ranking requires NumPy and SciPy")
+class TestRankingEngine(APITestCase):
+    """ Tests for the vectorised batch ranking engine """
+
+    def setUp(self):
+        """ Create three profiles, with skills and locations, and five tasks """
+        self.profiles = [create_profile(i) for i in range(1, 4)]
+        Profile.objects.filter(pk=self.profiles[0].pk).update(location="Melbourne")
+        Profile.objects.filter(pk=self.profiles[1].pk).update(location="Sydney")
+        python, php = create_skill("Python"), create_skill("PHP")
+        ProfileSkill.objects.create(profile=self.profiles[0], skill=python)
+        ProfileSkill.objects.create(profile=self.profiles[1], skill=python)
+        ProfileSkill.objects.create(profile=self.profiles[1], skill=php)
+
+        locations = ["melbourne", "Sydney", "Perth", "Melbourne", "Perth"]
+        task_skills = [[python], [python, php], [php], [], [python]]
+        self.tasks = []
+        for num, (location, skills) in enumerate(zip(locations, task_skills), 1):
+            task = create_task(self.profiles[2], num)
+            task.location = location
+            task.save()
+            task.skills.add(*skills)
+            self.tasks.append(task)
+
+        ProfileTask.objects.create(profile=self.profiles[0], task=self.tasks[0])
+        Task.objects.filter(pk=self.tasks[4].pk).update(status=Task.IN_PROGRESS)
+
+    def expected_tasks(self, profile):
+        """ Gets the (task id, rank) pairs TaskQuerySet.ranked_for gives """
+        profile.refresh_from_db()
+        tasks = Task.objects.filter(status=Task.OPEN).not_interacted_with(profile).ranked_for(profile)
+        return list(tasks.order_by('-rank', '-created_at').values_list('id', 'rank'))
+
+    def test_top_tasks_match_queryset(self):
+        """ The engine should rank tasks for every profile the same way as the
+            task list, excluding interacted and non-open tasks.
+            ID: UT-R01.01
+        """
+        engine = ranking.RankingEngine.from_database()
+        ranked = dict(engine.top_tasks(k=10, chunk_size=2))
+        for profile in self.profiles:
+            self.assertEqual(ranked[profile.id], self.expected_tasks(profile))
+
+    def test_top_tasks_truncated(self):
+        """ Only the k best ranked tasks should be kept for each profile.
+            ID: UT-R01.02
+        """
+        engine = ranking.RankingEngine.from_database()
+        for profile_id, ranked in engine.top_tasks(k=2):
+            profile = Profile.objects.get(pk=profile_id)
+            self.assertEqual(ranked, self.expected_tasks(profile)[:2])
+
+    def test_top_profiles_match_feed(self):
+        """ The engine should rank profiles for every task the same way as the
+            feed does, best rank first then lowest profile id.
+            ID: UT-R01.03
+        """
+        engine = ranking.RankingEngine.from_database()
+        for task_id, ranked in engine.top_profiles(k=10, chunk_size=3):
+            task = Task.objects.get(pk=task_id)
+            expected = sorted(feed.ranked_profiles(task), key=lambda pair: (-pair[1], pair[0]))
+            self.assertEqual(ranked, expected)
+
+    def test_rank_batch_command(self):
+        """ The rank_batch command should write one JSON line per profile.
+            ID: UT-R01.04
+        """
+        out = StringIO()
+        call_command('rank_batch', '--top-k', '1', stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['profile'] for line in lines], [profile.id for profile in self.profiles])
+        for line, profile in zip(lines, self.profiles):
+            self.assertEqual([tuple(pair) for pair in line['ranked']], self.expected_tasks(profile)[:1])
+
+    def test_rebuild_feeds_vectorized(self):
+        """ Rebuilding the feeds in bulk should give the same entries as
+            rebuilding each profile's feed in turn.
+            ID: UT-R01.05
+        """
+        feed.rebuild_all_feeds()
+        expected = sorted(FeedEntry.objects.values_list('profile_id', 'task_id', 'rank'))
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', '--vectorized', '--chunk-size', '2', stdout=StringIO())
+        self.assertEqual(sorted(FeedEntry.objects.values_list('profile_id', 'task_id', 'rank')), expected)
+
+    def test_rebuild_feeds_vectorized_size(self):
+        """ Rebuilding the feeds in bulk should keep the same best ranked
+            tasks per profile as rebuilding each profile's feed in turn.
+            ID: UT-R01.06
+        """
+        with self.settings(TASK_FEED_SIZE=2):
+            feed.rebuild_all_feeds()
+            expected = sorted(FeedEntry.objects.values_list('profile_id', 'task_id', 'rank'))
+            FeedEntry.objects.all().delete()
+            call_command('rebuild_feeds', '--vectorized', '--chunk-size', '2', stdout=StringIO())
+        self.assertEqual(sorted(FeedEntry.objects.values_list('profile_id', 'task_id', 'rank')), expected)
@@ -0,0 +1,194 @@
+from unittest import skipUnless
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from jobs import search, suggest
+from jobs.models import ProfileSkill, Task
+from jobs.tests.test_helper import *
+
+
+class TestSearchQuery(APITestCase):
+    """ Tests for building full-text search queries """
+
+    def test_prefix_query(self):
+        """ Every word of every search term should be required, as a prefix.
+            ID: UT-S01.01
+        """
+        self.assertEqual(search.prefix_query(["pyth", "web-dev"]), "pyth:* & web:* & dev:*")
+
+    def test_prefix_query_punctuation(self):
+        """ Terms with no words should give an empty query.
+            ID: UT-S01.02
+        """
+        self.assertEqual(search.prefix_query(["&!", "|"]), "")
+
+    def test_search_vector_not_serialized(self):
+        """ The search vector should not be part of the task list.
+            ID: UT-S01.03
+        """
+        profile = create_profile(1)
+        create_task(create_profile(2), 1)
+        token = api_login(profile.user)
+        response = self.client.get(reverse('task-list'), format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertNotIn("search_vector", response.data[0])
+
+
+@skipUnless(search.is_enabled(), "Full-text search requires PostgreSQL")
+class TestFullTextSearch(APITestCase):
+    """ Tests for maintaining and searching the task search vectors """
+
+    def setUp(self):
+        """ Create a helper, a poster and tasks matching "python" in
+            different fields
+        """
+        self.helper = create_profile(1)
+        self.poster = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.task1 = create_task(self.poster, 1)
+        self.task1.description = "Some python scripting"
+        self.task1.save()
+        self.task2 = create_task(self.poster, 2)
+        self.task2.title = "Python tutoring"
+        self.task2.save()
+        self.task3 = create_task(self.poster, 3)
+
+    def search_ids(self, term):
+        token = api_login(self.helper.user)
+        response = self.client.get(reverse('task-list'), {'search': term}, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(token))
+        return [task["id"] for task in response.data]
+
+    def test_title_ranked_above_description(self):
+        """ A match in the title should rank above a match in the description.
+            ID: UT-S02.01
+        """
+        self.assertEqual(self.search_ids("pyth"), [self.task2.id, self.task1.id])
+
+    def test_skills_searchable(self):
+        """ Adding a skill to a task should make it searchable by that skill.
+            ID: UT-S02.02
+        """
+        self.task3.skills.add(self.skill1)
+        self.assertIn(self.task3.id, self.search_ids("python"))
+
+    def test_owner_rename(self):
+        """ Renaming the owner of a task should update its search vector.
+            ID: UT-S02.03
+        """
+        self.poster.user.first_name = "Zebedee"
+        self.poster.user.save()
+        self.assertEqual(set(self.search_ids("zebedee")), {self.task1.id, self.task2.id, self.task3.id})
+
+    def test_feed_rank_first(self):
+        """ Searching the feed should order by relevance to the helper first.
+            ID: UT-S02.04
+        """
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill1)
+        self.task1.skills.add(self.skill1)
+        self.assertEqual(self.search_ids("python"), [self.task1.id, self.task2.id])
+
+
+class TestSuggest(APITestCase):
+    """ Tests for the task search autocomplete """
+
+    def setUp(self):
+        """ Create a helper, skills and open tasks """
+        # The trie may hold rows rolled back after earlier tests
+        suggest.index.reset()
+        self.helper = create_profile(1)
+        self.poster = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.skill2 = create_skill("Photography")
+        self.task1 = create_task(self.poster, 1)
+        self.task1.title = "Python tutoring"
+        self.task1.location = "Perth"
+        self.task1.save()
+        self.task1.skills.add(self.skill1)
+        self.token = api_login(self.helper.user)
+
+    def suggest(self, query, **params):
+        params['q'] = query
+        response = self.client.get(reverse('task-suggest'), params, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        return response
+
+    def test_suggest_prefix(self):
+        """ Skills, locations and task titles starting with the query should
+            be suggested, skills first.
+            ID: UT-S03.01
+        """
+        response = self.suggest("p")
+        self.assertEqual(response.data[:3], [
+            {'type': 'skill', 'id': self.skill1.id, 'text': "Python"},
+            {'type': 'skill', 'id': self.skill2.id, 'text': "Photography"},
+            {'type': 'location', 'id': None, 'text': "Perth"},
+        ])
+        self.assertIn({'type': 'task', 'id': self.task1.id, 'text': "Python tutoring"}, response.data)
+
+    def test_suggest_typo(self):
+        """ A query with one typo should still be matched.
+            ID: UT-S03.02
+        """
+        texts = [suggestion['text'] for suggestion in self.suggest("pyhton").data]
+        self.assertIn("Python", texts)
+        self.assertIn("Python tutoring", texts)
+
+    def test_suggest_later_word(self):
+        """ Later words of a suggestion should match, as long as every word of
+            the query does.
+            ID: UT-S03.03
+        """
+        self.assertEqual([suggestion['text'] for suggestion in self.suggest("python tut").data],
+            ["Python tutoring"])
+
+    def test_suggest_rebuilt_on_change(self):
+        """ New tasks should be suggested straight away.
+            ID: UT-S03.04
+        """
+        self.suggest("gar")
+        task = create_task(self.poster, 2)
+        task.title = "Gardening"
+        task.save()
+        self.assertEqual(self.suggest("gar").data, [{'type': 'task', 'id': task.id, 'text': "Gardening"}])
+
+    def test_suggest_updated_in_place(self):
+        """ Changes to tasks should update the trie in place, rather than
+            rebuilding it on the next request.
+            ID: UT-S03.06
+        """
+        self.suggest("p")
+        trie = suggest.index.trie
+        self.task1.title = "Knitting lessons"
+        self.task1.save()
+        task = create_task(self.poster, 2)
+        task.title = "Kite making"
+        task.save()
+        with self.assertNumQueries(0):
+            self.assertEqual([item['text'] for item in suggest.index.suggest("k")], ["Kite making", "Knitting lessons"])
+        task.status = Task.IN_PROGRESS
+        task.save()
+        self.assertEqual([item['text'] for item in self.suggest("k").data], ["Knitting lessons"])
+        self.assertNotIn("Python tutoring", [item['text'] for item in self.suggest("python").data])
+        self.assertIs(suggest.index.trie, trie)
+
+    def test_suggest_rebuild_swaps(self):
+        """ Rebuilding the trie should swap in a new trie, keeping changes
+            made while it was built.
+            ID: UT-S03.07
+        """
+        self.suggest("p")
+        suggest.index.pending = [('set_task', (0, "Gardening", "Perth", self.task1.created_at, True))]
+        suggest.index.rebuild()
+        self.assertIsNone(suggest.index.pending)
+        self.assertEqual([item['text'] for item in self.suggest("gar").data], ["Gardening"])
+        self.assertEqual(self.suggest("perth").data, [{'type': 'location', 'id': None, 'text': "Perth"}])
+
+    def test_suggest_limit(self):
+        """ At most limit suggestions should be returned, and limit must be a
+            number.
+            ID: UT-S03.05
+        """
+        self.assertEqual(len(self.suggest("p", limit=2).data), 2)
+        self.assertEqual(self.suggest("p", limit="two").status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,279 @@
+import threading
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from jobs import transitions
+from jobs.models import Profile, ProfileTask, Task
+from jobs.tests.test_helper import *
+
+
+def statements(queries):
+    """ The captured queries, without the savepoints of nested transactions """
+    return [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+
+
+class TestTransitions(APITestCase):
+    """ Tests for the status transition engine """
+
+    def setUp(self):
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.task = create_task(self.poster, 1)
+
+    def test_table(self):
+        """ Transitions can only be made from their source statuses, and while
+            the Task has one of their statuses.
+            ID: UT-T01.01
+        """
+        profile_task = ProfileTask(task=self.task, profile=self.helper)
+        transitions.check(profile_task, 'apply')
+        with self.assertRaises(transitions.TransitionError):
+            transitions.check(profile_task, 'reject')
+
+        profile_task.save()
+        profile_task.status = ProfileTask.DISCARDED
+        with self.assertRaises(transitions.TransitionError):
+            transitions.check(profile_task, 'apply')
+
+        profile_task.status = ProfileTask.SHORTLISTED
+        self.task.status = Task.IN_PROGRESS
+        with self.assertRaises(transitions.TransitionError):
+            transitions.check(profile_task, 'apply')
+
+    def test_changed_columns(self):
+        """ A transition should only write the columns it changes.
+            ID: UT-T01.02
+        """
+        profile_task = ProfileTask.objects.create(task=self.task, profile=self.helper, status=ProfileTask.APPLIED)
+        with CaptureQueriesContext(connection) as queries:
+            transitions.move(profile_task, 'reject')
+        update, = [sql for sql in statements(queries) if sql.startswith('UPDATE')]
+        self.assertIn('"status"', update)
+        self.assertNotIn('"answer1"', update)
+        self.assertEqual(ProfileTask.objects.get(pk=profile_task.pk).status, ProfileTask.REJECTED)
+
+    def post(self, profile, url, data, budget):
+        """ Posts as profile, checking the request takes at most budget
+            queries (once the token is cached)
+        """
+        token = api_login(profile.user)
+        self.client.get(reverse('skill-list'), HTTP_AUTHORIZATION='Token {}'.format(token))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertLessEqual(len(statements(queries)), budget, statements(queries))
+        return response
+
+    def test_query_budgets(self):
+        """ Each transition should take a fixed, small number of queries.
+            ID: UT-T01.03
+        """
+        # Upsert the profiletask, update the feed (or lock the task, lock the
+        # profiletask, write it, update the feed). SQLite first looks up a
+        # profiletask the upsert may update
+        upsert = transitions.can_upsert()
+        lookup = connection.vendor != 'postgresql'
+        response = self.post(self.helper, reverse('task-shortlist'), {'task': self.task.id}, 2 if upsert else 4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.post(self.helper, reverse('task-apply', kwargs={'task_id': self.task.id}),
+            {'answer1': 'ans1'}, 1 + lookup if upsert else 3)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        profile_task = ProfileTask.objects.get(task=self.task, profile=self.helper)
+        # Also count the shortlist, and drop the helper's cached tokens
+        response = self.post(self.poster, reverse('task-shortlist_application'),
+            {'profiletask_id': profile_task.id}, 6)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Also write the task, update the feeds and read its skills
+        response = self.post(self.poster, reverse('task-accept-applicant', kwargs={'task_id': self.task.id}),
+            {'profile': self.helper.id}, 6)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.post(self.poster, reverse('task-complete'), {'task_id': self.task.id}, 7)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.post(self.poster, reverse('rate-helper', kwargs={'task_id': self.task.id}),
+            {'profile': self.helper.id, 'rating': 4}, 7)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.post(self.helper, reverse('task-discard'), {'task': create_task(self.poster, 2).id},
+            2 + lookup if upsert else 4)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        helper = Profile.objects.get(pk=self.helper.pk)
+        self.assertEqual((helper.shortlists, helper.tasks_completed, float(helper.rating)), (1, 1, 4.0))
+
+    def test_stale_accept(self):
+        """ Accepting a second applicant, as a poster would from a stale list
+            of applicants, should fail.
+            ID: UT-T01.04
+        """
+        other = create_profile(3)
+        for applicant in (self.helper, other):
+            ProfileTask.objects.create(task=self.task, profile=applicant, status=ProfileTask.APPLIED)
+        token = api_login(self.poster.user)
+        url = reverse('task-accept-applicant', kwargs={'task_id': self.task.id})
+        response = self.client.post(url, {'profile': self.helper.id}, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(url, {'profile': other.id}, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).helper_id, self.helper.id)
+        self.assertEqual(ProfileTask.objects.get(task=self.task, profile=other).status, ProfileTask.APPLIED)
+
+
+@skipUnless(transitions.can_upsert(), "Upserts need PostgreSQL or SQLite 3.35")
+class TestUpserts(APITestCase):
+    """ Tests for making a Profile's first interaction with a Task in one
+        statement
+    """
+
+    def setUp(self):
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.task = create_task(self.poster, 1)
+
+    def test_unique(self):
+        """ A profile can only have one profiletask per task.
+            ID: UT-T03.01
+        """
+        ProfileTask.objects.create(task=self.task, profile=self.helper)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProfileTask.objects.create(task=self.task, profile=self.helper)
+
+    def test_insert(self):
+        """ An upsert should create a missing profiletask in one statement.
+            ID: UT-T03.02
+        """
+        with CaptureQueriesContext(connection) as queries:
+            profile_task, created = transitions.upsert_profile_task(self.task.id, self.helper.id, 'apply',
+                exclude_owner=True, answer1='ans1')
+        writes = [sql for sql in statements(queries) if not sql.startswith('SELECT')]
+        self.assertEqual(len([sql for sql in writes if 'jobs_profiletask' in sql]), 1)
+        self.assertTrue(created)
+        self.assertEqual(ProfileTask.objects.get(pk=profile_task.pk).status, ProfileTask.APPLIED)
+        self.assertEqual(profile_task.answer1, 'ans1')
+
+    def test_update(self):
+        """ An upsert should move an existing profiletask in a source status,
+            keeping the columns it does not set.
+            ID: UT-T03.03
+        """
+        existing = ProfileTask.objects.create(task=self.task, profile=self.helper, answer2='ans2')
+        profile_task, created = transitions.upsert_profile_task(self.task.id, self.helper.id, 'apply',
+            exclude_owner=True, answer1='ans1')
+        self.assertFalse(created)
+        self.assertEqual(profile_task.pk, existing.pk)
+        self.assertEqual((profile_task.status, profile_task.answer1, profile_task.answer2),
+            (ProfileTask.APPLIED, 'ans1', 'ans2'))
+        self.assertEqual(profile_task.created_at, existing.created_at)
+
+    def test_not_allowed(self):
+        """ An upsert should write nothing when the transition is not allowed.
+            ID: UT-T03.04
+        """
+        # The owner cannot apply, nor anyone once the task is not Open
+        self.assertEqual(transitions.upsert_profile_task(self.task.id, self.poster.id, 'apply', exclude_owner=True),
+            (None, False))
+        self.task.status = Task.IN_PROGRESS
+        self.task.save()
+        self.assertEqual(transitions.upsert_profile_task(self.task.id, self.helper.id, 'apply'), (None, False))
+        self.assertFalse(ProfileTask.objects.exists())
+
+        # Nor after discarding
+        ProfileTask.objects.create(task=self.task, profile=self.helper, status=ProfileTask.DISCARDED)
+        self.assertEqual(transitions.upsert_profile_task(self.task.id, self.helper.id, 'discard'), (None, False))
+
+    def test_insert_only(self):
+        """ A transition only from a missing profiletask should create it, and
+            write nothing once it exists.
+            ID: UT-T03.05
+        """
+        with CaptureQueriesContext(connection) as queries:
+            profile_task, created = transitions.upsert_profile_task(self.task.id, self.helper.id, 'shortlist')
+            self.assertEqual(transitions.upsert_profile_task(self.task.id, self.helper.id, 'shortlist'),
+                (None, False))
+        self.assertTrue(created)
+        self.assertEqual(ProfileTask.objects.get().status, ProfileTask.SHORTLISTED)
+        # PostgreSQL rejects an empty IN ()
+        for sql in statements(queries):
+            self.assertNotIn('IN ()', sql)
+
+        # Moved from the shortlist by the same connection which created it
+        profile_task, created = transitions.upsert_profile_task(self.task.id, self.helper.id, 'apply')
+        self.assertFalse(created)
+        self.assertEqual(ProfileTask.objects.get().status, ProfileTask.APPLIED)
+
+
+@skipUnless(connection.features.has_select_for_update, "Races need a database with row locks")
+class TestTransitionRaces(TransactionTestCase):
+    """ Tests for transitions requested at the same time """
+
+    def setUp(self):
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.task = create_task(self.poster, 1)
+
+    def race(self, requests):
+        """ Posts each (profile, url, data) request from its own thread, all
+            at once. Returns the response status codes.
+        """
+        barrier = threading.Barrier(len(requests))
+        codes = [None] * len(requests)
+
+        def post(index, token, url, data):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION='Token {}'.format(token))
+            try:
+                barrier.wait()
+                codes[index] = client.post(url, data, format='json').status_code
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post, args=(index, api_login(profile.user), url, data))
+            for index, (profile, url, data) in enumerate(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(codes)
+
+    def test_concurrent_accept(self):
+        """ Of two applicants accepted at once, only one should be assigned.
+            ID: UT-T02.01
+        """
+        others = [create_profile(3), create_profile(4)]
+        for applicant in others:
+            ProfileTask.objects.create(task=self.task, profile=applicant, status=ProfileTask.APPLIED)
+        url = reverse('task-accept-applicant', kwargs={'task_id': self.task.id})
+        codes = self.race([(self.poster, url, {'profile': applicant.id}) for applicant in others])
+        self.assertEqual(codes, [status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(ProfileTask.objects.filter(task=self.task, status=ProfileTask.ASSIGNED).count(), 1)
+
+    def test_concurrent_apply(self):
+        """ Applying twice at once should create one application.
+            ID: UT-T02.02
+        """
+        url = reverse('task-apply', kwargs={'task_id': self.task.id})
+        codes = self.race([(self.helper, url, {'answer1': 'ans1'})] * 2)
+        self.assertEqual(codes, [status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(ProfileTask.objects.filter(task=self.task, profile=self.helper).count(), 1)
+
+    def test_apply_during_accept(self):
+        """ An application made while another is accepted should either be
+            made first, or be refused once the task is in progress.
+            ID: UT-T02.03
+        """
+        ProfileTask.objects.create(task=self.task, profile=self.helper, status=ProfileTask.APPLIED)
+        other = create_profile(3)
+        codes = self.race([
+            (self.poster, reverse('task-accept-applicant', kwargs={'task_id': self.task.id}),
+                {'profile': self.helper.id}),
+            (other, reverse('task-apply', kwargs={'task_id': self.task.id}), {'answer1': 'ans1'}),
+        ])
+        self.assertIn(status.HTTP_200_OK, codes)
+        application = ProfileTask.objects.filter(task=self.task, profile=other).first()
+        self.assertEqual(application is not None, status.HTTP_201_CREATED in codes)
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, Task.IN_PROGRESS)
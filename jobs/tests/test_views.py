@@ -1,11 +1,24 @@
+import datetime
+import decimal
+import gzip
+import json
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 
 from jobs.models import Profile, User, Task, ProfileTask, ProfileSkill
 from jobs.serializers import TaskGetSerializer, TaskPostSerializer
 from jobs.tests.test_helper import *
 from jobs.views import number_applications_today
+from jobs import binary, interactions, streaming
+from jobs.pagination import KeysetPagination
 from django.utils.timezone import now
 
 """
@@ -113,6 +126,239 @@ class TaskListTests(APITestCase):
         self.assertEqual(len(response.data), 1)
 
 
+class TaskListInteractionTests(APITestCase):
+    """ View tests for excluding tasks a helper has interacted with """
+
+    def setUp(self):
+        """ Create a helper who has interacted with some tasks """
+        self.helper = create_profile(1)
+        self.poster = create_profile(2)
+        self.tasks = [create_task(self.poster, task_num) for task_num in range(30)]
+        for task in self.tasks[:20]:
+            ProfileTask.objects.create(profile=self.helper, task=task, status=ProfileTask.DISCARDED)
+
+    def test_task_list_excludes_interacted(self):
+        """ Only tasks without a ProfileTask for the helper should be listed,
+            however they are ranked.
+            ID: UT-V02.06
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        for qstring in ("", "?search=Task"):
+            response = self.client.get(url + qstring, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+            self.assertEqual(sorted(task["id"] for task in response.data),
+                sorted(task.id for task in self.tasks[20:]))
+
+    def test_exclusion_single_query(self):
+        """ Excluding interacted tasks should be a single NOT EXISTS query,
+            however many ProfileTasks the helper has.
+            ID: UT-V02.07
+        """
+        queryset = Task.objects.not_interacted_with(self.helper)
+        self.assertIn("NOT EXISTS", str(queryset.query))
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(queryset)), 10)
+
+
+class TaskRankTests(APITestCase):
+    """ View tests for ranking the task list by relevance """
+
+    def setUp(self):
+        """ Create a helper with skills, and tasks that match them to
+            varying degrees
+        """
+        self.helper = create_profile(1)
+        self.helper.location = "Melbourne"
+        self.helper.save()
+        self.poster = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.skill2 = create_skill("PHP")
+        self.skill3 = create_skill("HTML")
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill1)
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill2)
+        # 2 matching skills, same location: rank 5
+        self.task1 = create_task(self.poster, 1)
+        self.task1.location = "melbourne"
+        self.task1.save()
+        self.task1.skills.add(self.skill1, self.skill2)
+        # 1 matching skill, 1 missing skill: rank 0
+        self.task2 = create_task(self.poster, 2)
+        self.task2.skills.add(self.skill1, self.skill3)
+        # 1 missing skill: rank -1
+        self.task3 = create_task(self.poster, 3)
+        self.task3.skills.add(self.skill3)
+        # No skills: rank 0, but more recent than task2
+        self.task4 = create_task(self.poster, 4)
+
+    def test_task_list_ranked(self):
+        """ Tasks should be ordered by rank, with ties resolved by which
+            task is more recent.
+            ID: UT-V02.04
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        response = self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual([task["id"] for task in response.data],
+            [self.task1.id, self.task4.id, self.task2.id, self.task3.id])
+        self.assertEqual([task["display_rank"] for task in response.data], [5, 0, 0, -1])
+
+    def test_ranked_for_single_query(self):
+        """ Ranking the tasks should take one query, however many tasks
+            there are.
+            ID: UT-V02.05
+        """
+        for task_num in range(5, 25):
+            create_task(self.poster, task_num).skills.add(self.skill1)
+        # Reload the helper's skill mask, updated as their skills were added
+        self.helper.refresh_from_db()
+        with self.assertNumQueries(1):
+            tasks = list(Task.objects.ranked_for(self.helper).order_by('-rank'))
+        self.assertEqual(len(tasks), 24)
+        self.assertEqual(tasks[0].rank, 5)
+
+
+class TaskListPaginationTests(APITestCase):
+    """ View tests for paging through task lists with cursors """
+
+    def setUp(self):
+        """ Create a helper with a skill, and tasks with tied ranks """
+        self.helper = create_profile(1)
+        self.poster = create_profile(2)
+        self.skill1 = create_skill("Python")
+        ProfileSkill.objects.create(profile=self.helper, skill=self.skill1)
+        self.tasks = [create_task(self.poster, task_num) for task_num in range(1, 8)]
+        for task in self.tasks[::3]:
+            task.skills.add(self.skill1)
+
+    def read_pages(self, url, token, page_size, **params):
+        """ Follows the next links from the first page, returning every page """
+        pages = []
+        params['page_size'] = page_size
+        response = self.client.get(url, params, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(token))
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([item["id"] for item in response.data["results"]])
+            if response.data["next"] is None:
+                return pages
+            response = self.client.get(response.data["next"], format='json',
+                HTTP_AUTHORIZATION='Token {}'.format(token))
+
+    def test_task_list_pages(self):
+        """ Paging through the ranked task list should give every task once,
+            in the same order as the unpaged list.
+            ID: UT-V02.08
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        response = self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        pages = self.read_pages(url, token, 3)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), [task["id"] for task in response.data])
+
+    @override_settings(TASK_FEED_ENABLED=False)
+    def test_task_list_pages_without_feed(self):
+        """ Paging should also work when tasks are ranked on the fly.
+            ID: UT-V02.09
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        response = self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        pages = self.read_pages(url, token, 2)
+        self.assertEqual(sum(pages, []), [task["id"] for task in response.data])
+        self.assertEqual(pages[0], [self.tasks[6].id, self.tasks[3].id])
+
+    def test_page_stable_after_insert(self):
+        """ A task posted while paging should not shift later pages.
+            ID: UT-V02.10
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        response = self.client.get(url, {'page_size': 3}, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        first_page = [task["id"] for task in response.data["results"]]
+        create_task(self.poster, 8).skills.add(self.skill1)
+        response = self.client.get(response.data["next"], format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        second_page = [task["id"] for task in response.data["results"]]
+        self.assertFalse(set(first_page) & set(second_page))
+        self.assertEqual(len(second_page), 3)
+
+    def test_poster_task_list_pages(self):
+        """ The poster's task list should be paged newest first.
+            ID: UT-V02.11
+        """
+        token = api_login(self.poster.user)
+        url = reverse('task-poster')
+        pages = self.read_pages(url, token, 4)
+        self.assertEqual(sum(pages, []), [task.id for task in reversed(self.tasks)])
+
+    def test_nullable_ordering_pages(self):
+        """ Paging a list ordered by a nullable column should give every task
+            once, with the tasks without a value last.
+            ID: UT-V02.13
+        """
+        for num, task in enumerate(self.tasks[:4]):
+            task.date_due = datetime.date(2017, 10, 1 + num % 2)
+            task.save()
+        token = api_login(self.helper.user)
+        pages = self.read_pages(reverse('task-list'), token, 2, ordering='date_due')
+        # Ranked first, then by due date
+        ranked = Task.objects.ranked_for(Profile.objects.get(pk=self.helper.pk))
+        expected = sorted(ranked, key=lambda task: (-task.rank, task.date_due is None,
+            task.date_due or datetime.date.min, task.id))
+        self.assertEqual(sum(pages, []), [task.id for task in expected])
+
+    def test_related_ordering_pages(self):
+        """ Paging a list ordered through a relation should key the pages on
+            the related values.
+            ID: UT-V02.14
+        """
+        other = create_profile(3)
+        Profile.objects.filter(pk=other.pk).update(rating=5)
+        tasks = [create_task(other, task_num) for task_num in range(8, 11)]
+
+        ids = [task.id for task in self.page_through(Task.objects.all(), '-owner__rating')]
+        self.assertEqual(ids, [task.id for task in reversed(tasks)] + [task.id for task in reversed(self.tasks)])
+
+    def test_float_ordering_pages(self):
+        """ Paging a list ordered by a float annotation should give every task
+            once, in order.
+            ID: UT-V02.15
+        """
+        for num, task in enumerate(self.tasks):
+            Task.objects.filter(pk=task.pk).update(offer=num % 3)
+        queryset = Task.objects.annotate(
+            score=ExpressionWrapper(F('offer') / Value(3.0), output_field=FloatField()))
+        ids = [task.id for task in self.page_through(queryset, '-score')]
+        expected = sorted(self.tasks, key=lambda task: (-(self.tasks.index(task) % 3), -task.id))
+        self.assertEqual(ids, [task.id for task in expected])
+
+    def page_through(self, queryset, *ordering):
+        """ Reads every page of a queryset with KeysetPagination, 4 at a time """
+
+        class View(object):
+            cursor_ordering = ordering
+
+        results = []
+        params = {'page_size': 4}
+        while True:
+            paginator = KeysetPagination()
+            request = Request(APIRequestFactory().get('/', params))
+            results += paginator.paginate_queryset(queryset, request, View())
+            if not paginator.has_next:
+                return results
+            params['cursor'] = paginator.encode_cursor(paginator.last_position)
+
+    def test_invalid_cursor(self):
+        """ A cursor that cannot be decoded should give a 404.
+            ID: UT-V02.12
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        response = self.client.get(url, {'cursor': 'not-a-cursor'}, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class TestTaskCreate(APITestCase):
     """ View tests for creation of tasks """
     
@@ -589,7 +835,41 @@ class TestCurrentProfile(APITestCase):
         url = reverse('profile-current')
         response = self.client.get(url, format="json", HTTP_AUTHORIZATION="Token {}".format(token))
         self.assertEqual(response.data["user"]["username"], "test1_user")
-        
+
+    def test_internal_columns_hidden(self):
+        """ The skill masks and bits used for ranking should not be returned.
+            ID: UT-V10.03
+        """
+        token = api_login(self.profile.user)
+        skill = create_skill("Python")
+        task = create_task(create_profile(2), 1)
+        task.skills.add(skill)
+        response = self.client.get(reverse('profile-current'), format="json",
+            HTTP_AUTHORIZATION="Token {}".format(token))
+        self.assertNotIn("skill_mask", response.data)
+        response = self.client.get(reverse('task-detail', kwargs={"pk": task.id}), format="json",
+            HTTP_AUTHORIZATION="Token {}".format(token))
+        for field in ("skill_mask", "skill_count"):
+            self.assertNotIn(field, response.data)
+            self.assertNotIn(field, response.data["owner"])
+        self.assertNotIn("bit", response.data["skills"][0])
+
+    def test_rating_totals_hidden(self):
+        """ The rating totals should not be returned, only the rating.
+            ID: UT-V10.04
+        """
+        token = api_login(self.profile.user)
+        task = create_task(create_profile(2), 1)
+        response = self.client.get(reverse('profile-current'), format="json",
+            HTTP_AUTHORIZATION="Token {}".format(token))
+        self.assertIn("rating", response.data)
+        response = self.client.get(reverse('task-detail', kwargs={"pk": task.id}), format="json",
+            HTTP_AUTHORIZATION="Token {}".format(token))
+        self.assertIn("rating", response.data["owner"])
+        for data in (response.data, response.data["owner"]):
+            self.assertNotIn("rating_sum", data)
+            self.assertNotIn("rating_count", data)
+
 
 class TestUpdateProfile(APITestCase):
     """ Views tests for updating a profile """
@@ -607,4 +887,683 @@ class TestUpdateProfile(APITestCase):
         url = reverse('profile-detail', kwargs={"pk":self.profile.id})
         data = {"location": "hobart"}
         response = self.client.put(url, data, format="json", HTTP_AUTHORIZATION="Token {}".format(token))
-        self.assertEqual(response.data["location"], "hobart")
\ No newline at end of file
+        self.assertEqual(response.data["location"], "hobart")
+
+class TestEagerLoading(APITestCase):
+    """ View tests for loading lists in a fixed number of queries """
+
+    def setUp(self):
+        """ Create a poster, a helper with completed tasks, a task with
+            applicants, and some open tasks
+        """
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.skill2 = create_skill("PHP")
+        self.task = create_task(self.poster, 1)
+        self.add_objects(0, 2)
+
+    def add_objects(self, start, count):
+        """ Adds count applicants, open tasks and completed tasks """
+        for num in range(start, start + count):
+            applicant = create_profile(10 + num)
+            ProfileSkill.objects.create(profile=applicant, skill=self.skill1)
+            ProfileTask.objects.create(profile=applicant, task=self.task, status=ProfileTask.APPLIED)
+
+            task = create_task(self.poster, 10 + num)
+            task.skills.add(self.skill1, self.skill2)
+            task.helper = applicant
+            task.save()
+
+            completed = create_task(self.poster, 100 + num)
+            completed.skills.add(self.skill2)
+            completed.helper = self.helper
+            completed.status = Task.COMPLETE
+            completed.save()
+            ProfileTask.objects.create(profile=self.helper, task=completed, status=ProfileTask.ASSIGNED)
+
+    def assert_fixed_queries(self, request):
+        """ Checks request takes the same number of queries after more
+            objects are added
+        """
+        # Caches the token's user
+        request()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        size = len(response.data)
+        self.add_objects(2, 5)
+        with self.assertNumQueries(len(queries)):
+            response = request()
+        self.assertGreater(len(response.data), size)
+
+    def test_task_list(self):
+        """ The task list should take a fixed number of queries.
+            ID: UT-V12.01
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+    @override_settings(TASK_FEED_ENABLED=False)
+    def test_task_list_without_feed(self):
+        """ The task list should take a fixed number of queries when ranked
+            on the fly.
+            ID: UT-V12.02
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-list')
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+    def test_poster_task_list(self):
+        """ The poster's task list should take a fixed number of queries.
+            ID: UT-V12.03
+        """
+        token = api_login(self.poster.user)
+        url = reverse('task-poster')
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+    def test_helper_task_list(self):
+        """ The helper's task list should take a fixed number of queries.
+            ID: UT-V12.04
+        """
+        token = api_login(self.helper.user)
+        url = reverse('task-helper')
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+    def test_view_applicants(self):
+        """ Viewing applicants should take a fixed number of queries, still
+            ordered by rating.
+            ID: UT-V12.05
+        """
+        token = api_login(self.poster.user)
+        url = reverse('task-view-applicants', kwargs={'task_id': self.task.id})
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+    def test_completed_tasks(self):
+        """ Listing completed tasks should take a fixed number of queries.
+            ID: UT-V12.06
+        """
+        token = api_login(self.helper.user)
+        url = reverse('tasks-completed', kwargs={'profile_id': self.helper.id})
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+    def test_profile_list(self):
+        """ The profile list should take a fixed number of queries.
+            ID: UT-V12.07
+        """
+        token = api_login(self.helper.user)
+        url = reverse('profile-list')
+        self.assert_fixed_queries(
+            lambda: self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(token)))
+
+
+class TestNormalizedFormat(APITestCase):
+    """ View tests for sideloaded (?format=normalized) responses """
+
+    def setUp(self):
+        """ Create a poster with a skilled task, and applicants for it """
+        self.poster = create_profile(1)
+        self.skill1 = create_skill("Python")
+        self.task = create_task(self.poster, 1)
+        self.task.skills.add(self.skill1)
+        self.applicants = [create_profile(num) for num in range(2, 6)]
+        for applicant in self.applicants:
+            ProfileTask.objects.create(profile=applicant, task=self.task, status=ProfileTask.APPLIED)
+
+    def test_applicants_normalized(self):
+        """ The task should be included once, and referenced by id from each
+            applicant.
+            ID: UT-V13.01
+        """
+        token = api_login(self.poster.user)
+        url = reverse('task-view-applicants', kwargs={'task_id': self.task.id})
+        response = self.client.get(url, {'format': 'normalized'}, HTTP_AUTHORIZATION='Token {}'.format(token))
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual([applicant["task"] for applicant in data["data"]], [self.task.id] * 4)
+        self.assertEqual(list(data["included"]["tasks"]), [str(self.task.id)])
+        task = data["included"]["tasks"][str(self.task.id)]
+        self.assertEqual(task["owner"], self.poster.id)
+        self.assertEqual(task["skills"], [self.skill1.id])
+        self.assertEqual(data["included"]["skills"][str(self.skill1.id)]["title"], "Python")
+        self.assertEqual(set(data["included"]["profiles"]),
+            {str(profile.id) for profile in self.applicants + [self.poster]})
+        self.assertEqual(len(data["included"]["users"]), 5)
+
+    def test_applicants_smaller(self):
+        """ The normalized response should be smaller than the nested one.
+            ID: UT-V13.02
+        """
+        token = api_login(self.poster.user)
+        url = reverse('task-view-applicants', kwargs={'task_id': self.task.id})
+        nested = self.client.get(url, HTTP_AUTHORIZATION='Token {}'.format(token))
+        normalized = self.client.get(url, {'format': 'normalized'}, HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertLess(len(normalized.content), len(nested.content))
+
+    def test_task_list_normalized(self):
+        """ Tasks by the same poster should share one included profile.
+            ID: UT-V13.03
+        """
+        create_task(self.poster, 2)
+        token = api_login(self.applicants[0].user)
+        response = self.client.get(reverse('task-list'), {'format': 'normalized'},
+            HTTP_AUTHORIZATION='Token {}'.format(token))
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual([task["owner"] for task in data["data"]], [self.poster.id])
+        self.assertEqual(list(data["included"]["profiles"]), [str(self.poster.id)])
+
+    def test_default_format_nested(self):
+        """ Without the format parameter, responses should stay nested.
+            ID: UT-V13.04
+        """
+        create_task(self.poster, 2)
+        token = api_login(self.applicants[0].user)
+        response = self.client.get(reverse('task-list'), format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+        self.assertEqual(response.data[0]["owner"]["id"], self.poster.id)
+        self.assertEqual(response.data[0]["owner"]["user"]["username"], "test1_user")
+
+
+class TestSparseFieldsets(APITestCase):
+    """ View tests for requesting only some fields (?fields= and ?expand=) """
+
+    def setUp(self):
+        """ Create a poster with a skilled task, and a helper to list it for """
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.task = create_task(self.poster, 1)
+        self.task.skills.add(self.skill1)
+        self.token = api_login(self.helper.user)
+
+    def get_tasks(self, params):
+        return self.client.get(reverse('task-list'), params, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(self.token))
+
+    def test_task_list_fields(self):
+        """ Only the requested fields, including nested ones, should be given.
+            ID: UT-V14.01
+        """
+        response = self.get_tasks({'fields': 'title,offer,location,status,owner.photo,owner.user.first_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        task = response.data[0]
+        self.assertEqual(set(task), {'title', 'offer', 'location', 'status', 'owner'})
+        self.assertEqual(set(task["owner"]), {'photo', 'user'})
+        self.assertEqual(task["owner"]["user"], {'first_name': self.poster.user.first_name})
+
+    def test_task_list_columns(self):
+        """ Columns of unrequested fields should not be fetched.
+            ID: UT-V14.02
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.get_tasks({'fields': 'title,owner.user.first_name'})
+        sql = [query['sql'] for query in queries.captured_queries if 'FROM "jobs_task"' in query['sql']][0]
+        self.assertIn('"jobs_task"."title"', sql)
+        self.assertNotIn('"jobs_task"."description"', sql)
+        self.assertNotIn('"auth_user"."last_login"', sql)
+        self.assertNotIn('"jobs_profile"."description"', sql)
+
+    def test_expand(self):
+        """ A relation named without its fields should be given as its id,
+            unless it is expanded.
+            ID: UT-V14.03
+        """
+        response = self.get_tasks({'fields': 'title,owner,skills'})
+        self.assertEqual(response.data[0]["owner"], self.poster.id)
+        self.assertEqual(response.data[0]["skills"], [self.skill1.id])
+        response = self.get_tasks({'fields': 'title,skills', 'expand': 'owner'})
+        self.assertEqual(response.data[0]["owner"]["user"]["username"], "test1_user")
+        self.assertEqual(response.data[0]["skills"], [self.skill1.id])
+
+    def test_detail_fields(self):
+        """ Fields should also be chosen on detail views.
+            ID: UT-V14.04
+        """
+        url = reverse('task-detail', kwargs={'pk': self.task.id})
+        response = self.client.get(url, {'fields': 'title,skills.title'}, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        self.assertEqual(response.data, {'title': self.task.title, 'skills': [{'title': "Python"}]})
+
+    def test_write_ignores_fields(self):
+        """ Fields should not be pruned when writing, so nothing is left
+            unvalidated.
+            ID: UT-V14.05
+        """
+        url = reverse('task-create') + '?fields=title'
+        data = {'title': 'Task 2', 'description': 'Desc 2', 'offer': 50, 'location': 'Loc 2', 'is_remote': True,
+            'skills': [self.skill1.code]}
+        response = self.client.post(url, data, format="json", HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["description"], 'Desc 2')
+
+
+class TestConditionalGet(APITestCase):
+    """ View tests for ETag / Last-Modified validation """
+
+    def setUp(self):
+        """ Create a poster with a skilled task, and a viewer """
+        self.poster = create_profile(1)
+        self.viewer = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.task = create_task(self.poster, 1)
+        self.task.skills.add(self.skill1)
+        self.token = api_login(self.viewer.user)
+
+    def get(self, url, **headers):
+        return self.client.get(url, format='json', HTTP_AUTHORIZATION='Token {}'.format(self.token), **headers)
+
+    def test_task_detail_not_modified(self):
+        """ An unchanged task should give 304, without serializing it.
+            ID: UT-V15.01
+        """
+        url = reverse('task-detail', kwargs={'pk': self.task.id})
+        response = self.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+        # Only the version query, as the token's user is cached
+        with self.assertNumQueries(1):
+            not_modified = self.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified.content, b'')
+
+        not_modified = self.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_task_detail_modified(self):
+        """ Changing the task, or an object nested in it, should give 200.
+            ID: UT-V15.02
+        """
+        url = reverse('task-detail', kwargs={'pk': self.task.id})
+        etag = self.get(url)['ETag']
+
+        self.poster.user.first_name = "Renamed"
+        self.poster.user.save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["owner"]["user"]["first_name"], "Renamed")
+
+        etag = response['ETag']
+        self.skill1.title = "Python 3"
+        self.skill1.save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["skills"][0]["title"], "Python 3")
+
+    def test_skill_list(self):
+        """ Adding or deleting a skill should change the list's ETag.
+            ID: UT-V15.03
+        """
+        url = reverse('skill-list')
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        skill2 = create_skill("PHP")
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        skill2.delete()
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_current_profile_per_user(self):
+        """ Each user's own profile should have its own ETag.
+            ID: UT-V15.04
+        """
+        url = reverse('profile-current')
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.token = api_login(self.poster.user)
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_missing_object(self):
+        """ A missing object should still give 404.
+            ID: UT-V15.05
+        """
+        url = reverse('task-detail', kwargs={'pk': self.task.id + 100})
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH='"x"').status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SYNC_CURSOR_MARGIN=0)
+class TestSync(APITestCase):
+    """ View tests for delta sync """
+
+    def setUp(self):
+        """ Create a poster with two tasks, a helper who applied to one, and
+            an unrelated poster and task
+        """
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.other = create_profile(3)
+        self.skill1 = create_skill("Python")
+        self.task1 = create_task(self.poster, 1)
+        self.task2 = create_task(self.poster, 2)
+        self.other_task = create_task(self.other, 3)
+        self.application = ProfileTask.objects.create(profile=self.helper, task=self.task1, status=ProfileTask.APPLIED)
+
+    def sync(self, profile, cursor=None):
+        token = api_login(profile.user)
+        params = {'since': cursor} if cursor else {}
+        return self.client.get(reverse('sync'), params, format='json', HTTP_AUTHORIZATION='Token {}'.format(token))
+
+    def ids(self, response, kind):
+        return sorted(row["id"] for row in response.data[kind])
+
+    def test_full_sync(self):
+        """ Without a cursor, every relevant row should be given.
+            ID: UT-V16.01
+        """
+        response = self.sync(self.helper)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.ids(response, "tasks"), [self.task1.id])
+        self.assertEqual(self.ids(response, "profile_tasks"), [self.application.id])
+        self.assertEqual(self.ids(response, "profiles"), sorted([self.poster.id, self.helper.id]))
+        self.assertEqual(self.ids(response, "skills"), [self.skill1.id])
+        self.assertFalse(response.data["reset"])
+
+    def test_changes_since(self):
+        """ Only rows changed since the cursor should be given.
+            ID: UT-V16.02
+        """
+        cursor = self.sync(self.poster).data["cursor"]
+        self.task2.title = "Changed"
+        self.task2.save()
+        self.other_task.title = "Changed"
+        self.other_task.save()
+
+        response = self.sync(self.poster, cursor)
+        self.assertEqual(self.ids(response, "tasks"), [self.task2.id])
+        self.assertEqual(response.data["tasks"][0]["title"], "Changed")
+        self.assertEqual(response.data["profile_tasks"], [])
+        self.assertEqual(response.data["skills"], [])
+
+        response = self.sync(self.poster, response.data["cursor"])
+        self.assertEqual(response.data["tasks"], [])
+
+    def test_new_references(self):
+        """ A new application should bring its (unchanged) applicant.
+            ID: UT-V16.03
+        """
+        cursor = self.sync(self.poster).data["cursor"]
+        application = ProfileTask.objects.create(profile=self.other, task=self.task2, status=ProfileTask.APPLIED)
+        response = self.sync(self.poster, cursor)
+        self.assertEqual(self.ids(response, "profile_tasks"), [application.id])
+        self.assertIn(self.other.id, self.ids(response, "profiles"))
+        self.assertEqual(self.ids(response, "tasks"), [self.task2.id])
+
+    def test_deleted(self):
+        """ Deleted and disabled rows should be given, to the profiles they
+            were relevant to.
+            ID: UT-V16.04
+        """
+        helper_cursor = self.sync(self.helper).data["cursor"]
+        other_cursor = self.sync(self.other).data["cursor"]
+        task1_id, application_id = self.task1.id, self.application.id
+        self.task1.delete()
+        self.task2.enabled = False
+        self.task2.save()
+
+        deleted = self.sync(self.helper, helper_cursor).data["deleted"]
+        self.assertEqual(deleted["tasks"], [task1_id])
+        self.assertEqual(deleted["profile_tasks"], [application_id])
+        deleted = self.sync(self.other, other_cursor).data["deleted"]
+        self.assertEqual(deleted["tasks"], [])
+        deleted = self.sync(self.poster, helper_cursor).data["deleted"]
+        self.assertEqual(deleted["tasks"], sorted([task1_id, self.task2.id]))
+
+    def test_cursors(self):
+        """ Invalid cursors should be rejected, and expired ones reset.
+            ID: UT-V16.05
+        """
+        self.assertEqual(self.sync(self.helper, "not a cursor").status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(SYNC_TOMBSTONE_MAX_AGE=0):
+            response = self.sync(self.helper, self.sync(self.helper).data["cursor"])
+        self.assertTrue(response.data["reset"])
+        self.assertEqual(self.ids(response, "tasks"), [self.task1.id])
+
+
+class TestStreaming(APITestCase):
+    """ View tests for streamed lists """
+
+    def setUp(self):
+        """ Create a poster with more tasks than fit in one chunk """
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.tasks = [create_task(self.poster, num) for num in range(1, 6)]
+        self.token = api_login(self.helper.user)
+        self.chunk_size = streaming.StreamingListMixin.stream_chunk_size
+        streaming.StreamingListMixin.stream_chunk_size = 2
+
+    def tearDown(self):
+        streaming.StreamingListMixin.stream_chunk_size = self.chunk_size
+
+    def get(self, url, params, **extra):
+        return self.client.get(url, params, HTTP_AUTHORIZATION='Token {}'.format(self.token), **extra)
+
+    def test_stream_matches_list(self):
+        """ A streamed list should hold the same JSON as the plain list.
+            ID: UT-V17.01
+        """
+        for url in (reverse('task-list'), reverse('profile-list')):
+            expected = self.get(url, {}).content
+            response = self.get(url, {'stream': 'true'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(b''.join(response.streaming_content), expected)
+
+    def test_stream_fields(self):
+        """ Streamed lists should honour sparse fieldsets, and stream empty
+            lists.
+            ID: UT-V17.02
+        """
+        url = reverse('task-list')
+        response = self.get(url, {'stream': 'true', 'fields': 'id,title'})
+        data = json.loads(b''.join(response.streaming_content).decode('utf-8'))
+        self.assertEqual(len(data), len(self.tasks))
+        self.assertEqual(set(data[0]), {'id', 'title'})
+
+        response = self.get(url, {'stream': 'true', 'search': 'no such task'})
+        self.assertEqual(b''.join(response.streaming_content), b'[]')
+
+    def test_stream_gzip(self):
+        """ Clients accepting gzip should get the stream gzipped.
+            ID: UT-V17.03
+        """
+        url = reverse('task-list')
+        expected = self.get(url, {}).content
+        response = self.get(url, {'stream': 'true'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), expected)
+
+    def test_paged_not_streamed(self):
+        """ Pages and other formats should not be streamed.
+            ID: UT-V17.04
+        """
+        url = reverse('task-list')
+        response = self.get(url, {'stream': 'true', 'page_size': 2})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.get(url, {'stream': 'true', 'format': 'normalized'})
+        self.assertFalse(response.streaming)
+
+
+@skipUnless(binary.is_available(), "MessagePack needs msgpack")
+class TestMessagePack(APITestCase):
+    """ View tests for MessagePack responses and requests """
+
+    def setUp(self):
+        """ Create a poster with a task, and a helper who applied to it """
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.skill1 = create_skill("Python")
+        self.task1 = create_task(self.poster, 1)
+        ProfileTask.objects.create(profile=self.helper, task=self.task1, status=ProfileTask.APPLIED)
+        self.token = api_login(self.poster.user)
+
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_AUTHORIZATION='Token {}'.format(self.token), **extra)
+
+    def test_native_values(self):
+        """ Datetimes and decimals should be given natively, and other values
+            as in JSON.
+            ID: UT-V18.01
+        """
+        url = reverse('task-view-applicants', kwargs={'task_id': self.task1.id})
+        expected = self.get(url).data
+        response = self.get(url, HTTP_ACCEPT=binary.MEDIA_TYPE)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], binary.MEDIA_TYPE)
+        data = binary.unpackb(response.content)
+
+        applicant = data[0]
+        self.assertIsInstance(applicant['profile']['rating'], decimal.Decimal)
+        self.assertEqual(str(applicant['profile']['rating']), expected[0]['profile']['rating'])
+        self.assertIsInstance(applicant['task']['created_at'], datetime.datetime)
+        self.assertEqual(applicant['task']['created_at'], self.task1.created_at)
+        self.assertEqual(applicant['task']['title'], expected[0]['task']['title'])
+
+    def test_compiled_list(self):
+        """ Lists read through the compiled path should give native values
+            too, without changing the JSON of later requests.
+            ID: UT-V18.02
+        """
+        self.token = api_login(self.helper.user)
+        self.task2 = create_task(self.poster, 2)
+        url = reverse('task-list')
+        data = binary.unpackb(self.get(url, HTTP_ACCEPT=binary.MEDIA_TYPE).content)
+        self.assertEqual([task['id'] for task in data], [self.task2.id])
+        self.assertEqual(data[0]['updated_at'], Task.objects.get(pk=self.task2.id).updated_at)
+        self.assertIsInstance(data[0]['owner']['rating'], decimal.Decimal)
+
+        data = self.get(url).data
+        self.assertIsInstance(data[0]['updated_at'], str)
+        self.assertIsInstance(data[0]['owner']['rating'], str)
+
+    def test_parse(self):
+        """ Request bodies should be parsed from MessagePack, and bad ones
+            rejected.
+            ID: UT-V18.03
+        """
+        body = binary.packb({
+            'title': 'Packed task',
+            'description': 'Desc',
+            'offer': 10,
+            'location': 'Loc',
+            'skills': [self.skill1.code],
+        })
+        response = self.client.post(reverse('task-create'), body, content_type=binary.MEDIA_TYPE,
+            HTTP_AUTHORIZATION='Token {}'.format(self.token), HTTP_ACCEPT=binary.MEDIA_TYPE)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(binary.unpackb(response.content)['title'], 'Packed task')
+        self.assertTrue(Task.objects.filter(title='Packed task', owner=self.poster).exists())
+
+        response = self.client.post(reverse('task-create'), b'\xc1', content_type=binary.MEDIA_TYPE,
+            HTTP_AUTHORIZATION='Token {}'.format(self.token))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestBulkInteractions(APITestCase):
+    """ View tests for shortlisting, discarding and applying to several tasks
+        at once
+    """
+
+    def setUp(self):
+        """ Create a poster with some tasks, and a helper """
+        self.poster = create_profile(1)
+        self.helper = create_profile(2)
+        self.tasks = [create_task(self.poster, num) for num in range(4)]
+        self.token = api_login(self.helper.user)
+
+    def post(self, data, token=None):
+        return self.client.post(reverse('task-interactions'), data, format='json',
+            HTTP_AUTHORIZATION='Token {}'.format(token or self.token))
+
+    def test_results(self):
+        """ Each interaction should have the result it would have on its own.
+            ID: UT-V19.01
+        """
+        ProfileTask.objects.create(task=self.tasks[1], profile=self.helper)
+        ProfileTask.objects.create(task=self.tasks[2], profile=self.helper, status=ProfileTask.DISCARDED)
+        response = self.post([
+            {'task': self.tasks[0].id, 'action': 'shortlist'},
+            {'task': self.tasks[1].id, 'action': 'apply', 'answer1': 'ans1', 'quote': 10},
+            {'task': self.tasks[2].id, 'action': 'discard'},
+            {'task': self.tasks[3].id, 'action': 'apply', 'quote': -1},
+            {'task': 0, 'action': 'discard'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data],
+            [status.HTTP_201_CREATED, status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST,
+                status.HTTP_400_BAD_REQUEST, status.HTTP_404_NOT_FOUND])
+        self.assertEqual(response.data[1]['profile_task']['answer1'], 'ans1')
+
+        profile_task = ProfileTask.objects.get(task=self.tasks[1], profile=self.helper)
+        self.assertEqual((profile_task.status, profile_task.quote), (ProfileTask.APPLIED, 10))
+        self.assertIsNotNone(profile_task.datetime_applied)
+        self.assertEqual(ProfileTask.objects.get(task=self.tasks[0], profile=self.helper).status,
+            ProfileTask.SHORTLISTED)
+        self.assertFalse(ProfileTask.objects.filter(task=self.tasks[3]).exists())
+
+    def test_order(self):
+        """ Interactions with the same task should be checked in order, and
+            a poster cannot shortlist or apply to their own task.
+            ID: UT-V19.02
+        """
+        task = self.tasks[0]
+        response = self.post([
+            {'task': task.id, 'action': 'shortlist'},
+            {'task': task.id, 'action': 'apply'},
+            {'task': task.id, 'action': 'shortlist'},
+        ])
+        self.assertEqual([result['status'] for result in response.data],
+            [status.HTTP_201_CREATED, status.HTTP_201_CREATED, status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(ProfileTask.objects.get(task=task, profile=self.helper).status, ProfileTask.APPLIED)
+
+        response = self.post([
+            {'task': task.id, 'action': 'shortlist'},
+            {'task': task.id, 'action': 'apply'},
+            {'task': task.id, 'action': 'discard'},
+        ], token=api_login(self.poster.user))
+        self.assertEqual([result['status'] for result in response.data],
+            [status.HTTP_400_BAD_REQUEST, status.HTTP_400_BAD_REQUEST, status.HTTP_201_CREATED])
+
+    def test_fixed_queries(self):
+        """ A batch should take the same number of queries however many
+            tasks it interacts with.
+            ID: UT-V19.03
+        """
+        self.post([])
+        ProfileTask.objects.create(task=self.tasks[0], profile=self.helper)
+        with CaptureQueriesContext(connection) as queries:
+            self.post([{'task': self.tasks[0].id, 'action': 'apply'}, {'task': self.tasks[1].id, 'action': 'discard'}])
+        more = [create_task(self.poster, 10 + num) for num in range(10)]
+        for task in more[:5]:
+            ProfileTask.objects.create(task=task, profile=self.helper)
+        with self.assertNumQueries(len(queries)):
+            response = self.post([{'task': task.id, 'action': 'apply'} for task in more])
+        self.assertEqual(ProfileTask.objects.filter(profile=self.helper, status=ProfileTask.APPLIED).count(), 11)
+        self.assertTrue(all(result['status'] == status.HTTP_201_CREATED for result in response.data))
+
+    def test_invalid(self):
+        """ Batches should be lists of at most MAX_BATCH_SIZE valid
+            interactions.
+            ID: UT-V19.04
+        """
+        response = self.post({'task': self.tasks[0].id, 'action': 'shortlist'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post([{'task': self.tasks[0].id, 'action': 'shortlist'}] * (interactions.MAX_BATCH_SIZE + 1))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.post([{'task': self.tasks[0].id, 'action': 'like'}])
+        self.assertEqual(response.data[0]['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ProfileTask.objects.exists())
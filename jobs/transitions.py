@@ -0,0 +1,241 @@
+"""job_bilby Status Transitions
+
+The statuses Tasks and ProfileTasks may move between, and the engine which
+moves them. Rows are fetched once, under select_for_update, so concurrent
+requests (eg. two posters accepting, or a helper applying twice) are made
+one after the other and re-check the status left by the last. Tasks are
+always locked before their ProfileTasks, so requests cannot deadlock.
+Where the database supports it, a Profile's first interaction with a Task
+(eg. shortlisting or applying) is instead made in one upsert statement.
+
+This file belongs to the back end source code for team 'job-bilby' for the
+University of Melbourne subject SWEN90014 Masters Software Engineering Project.
+The project is a mobile-first web application for sharing tasks.
+The back-end is based on the REST Framework for Django.
+
+Client: Paul Ashkar (Capgemini)                 paul.ashkar@capgemini.com
+Supervisor: Rachel Burrows                      rachel.burrows@unimelb.edu.au
+Team:
+Annie Zhou:                                     azhou@student.unimelb.edu.au
+David Barrell:                                  dbarrell@student.unimelb.edu.au
+Grace Johnson:                                  gjohnson1@student.unimelb.edu.au
+Hugh Edwards:                                   hughe@student.unimelb.edu.au
+Matt Perrot:                                    mperrott@student.unimelb.edu.au
+View our 'Project Overview' document on Confluence for more information about the project.
+Date project started: 6/8/2017
+Date project completed: 15/10/2017
+"""
+from collections import namedtuple
+from django.db import connection, transaction
+from django.db.models.expressions import Col
+from django.db.models.signals import post_save
+from django.shortcuts import get_object_or_404
+from django.utils.timezone import now
+from jobs.models import ProfileTask, Task
+
+# A transition may be made from any of its source statuses (None for a
+# ProfileTask not yet created), and for a ProfileTask, only while its Task has
+# one of task_statuses (None for any). error is given when it cannot be made.
+Transition = namedtuple('Transition', ['sources', 'target', 'task_statuses', 'error'])
+
+TASK_TRANSITIONS = {
+    'accept': Transition((Task.OPEN,), Task.IN_PROGRESS, None,
+        "Task must be open, and have no helper assigned"),
+    'complete': Transition((Task.IN_PROGRESS,), Task.COMPLETE, None,
+        "Task is not In Progress and cannot be Completed"),
+}
+
+PROFILE_TASK_TRANSITIONS = {
+    'shortlist': Transition((None,), ProfileTask.SHORTLISTED, None,
+        "ProfileTask already exists"),
+    'discard': Transition(
+        (None, ProfileTask.SHORTLISTED, ProfileTask.APPLIED, ProfileTask.ASSIGNED, ProfileTask.REJECTED,
+            ProfileTask.APPLICATION_SHORTLISTED),
+        ProfileTask.DISCARDED, None,
+        "ProfileTask has already been discarded."),
+    'apply': Transition((None, ProfileTask.SHORTLISTED), ProfileTask.APPLIED, (Task.OPEN,),
+        "Task must be open, and profile must not have already applied"),
+    'shortlist_application': Transition((ProfileTask.APPLIED,), ProfileTask.APPLICATION_SHORTLISTED, (Task.OPEN,),
+        "profileTask status must be Applied, and task status must be Open"),
+    'reject': Transition((ProfileTask.APPLIED, ProfileTask.APPLICATION_SHORTLISTED), ProfileTask.REJECTED,
+        (Task.OPEN,),
+        "profileTask status must be (Applied or Application_Shortlisted), and task status must be Open"),
+    'assign': Transition((ProfileTask.APPLIED, ProfileTask.APPLICATION_SHORTLISTED), ProfileTask.ASSIGNED,
+        (Task.OPEN,),
+        "Profile must have applied for task to be accepted"),
+    'rate': Transition((ProfileTask.ASSIGNED,), ProfileTask.ASSIGNED, (Task.COMPLETE,),
+        "Profile must be assigned to task to be rated"),
+}
+
+TRANSITIONS = {
+    Task: TASK_TRANSITIONS,
+    ProfileTask: PROFILE_TASK_TRANSITIONS,
+}
+
+
+class TransitionError(Exception):
+    """ Raised when a Task or ProfileTask cannot make a transition from its
+        current status
+    """
+
+
+def lock_task(**lookup):
+    """ Fetches a Task under select_for_update, or raises Http404 """
+    return get_object_or_404(Task.objects.select_for_update(), **lookup)
+
+
+def lock_profile_task(task, **lookup):
+    """ Fetches the ProfileTask of a locked Task matching lookup (eg. its
+        profile_id) under select_for_update. When there is none, gives an
+        unsaved ProfileTask for the Task, which a transition from None creates.
+    """
+    profile_task = ProfileTask.objects.select_for_update().filter(task=task, **lookup).first()
+    if profile_task is None:
+        return ProfileTask(task=task, **lookup)
+    # Saves reading the Task again
+    profile_task.task = task
+    return profile_task
+
+
+def check(instance, name):
+    """ Checks the named transition can be made from a Task or ProfileTask's
+        current status (and for a ProfileTask, from its Task's).
+        Raises TransitionError if not.
+    """
+    transitions = TRANSITIONS[type(instance)]
+    status = instance.status if instance.pk is not None else None
+    task_status = instance.task.status if transitions[name].task_statuses is not None else None
+    return check_statuses(transitions, name, status, task_status)
+
+
+def check_statuses(transitions, name, status, task_status=None):
+    """ Checks the named transition, from TASK_TRANSITIONS or
+        PROFILE_TASK_TRANSITIONS, can be made from status (None for a
+        ProfileTask not yet created) while the Task has task_status.
+        Raises TransitionError if not.
+    """
+    transition = transitions[name]
+    if status not in transition.sources:
+        raise TransitionError(transition.error)
+    if transition.task_statuses is not None and task_status not in transition.task_statuses:
+        raise TransitionError(transition.error)
+    return transition
+
+
+def move(instance, name, **changes):
+    """ Makes the named transition of a Task or ProfileTask, setting its
+        status and any other given fields. Only the columns which change are
+        written; unsaved ProfileTasks are created.
+        Raises TransitionError if the transition cannot be made.
+    """
+    changes['status'] = check(instance, name).target
+    if instance.pk is None:
+        for field, value in changes.items():
+            setattr(instance, field, value)
+        instance.save()
+        return instance
+    changed = [field for field, value in changes.items() if getattr(instance, field) != value]
+    for field in changed:
+        setattr(instance, field, changes[field])
+    if changed:
+        instance.save(update_fields=changed + ['updated_at'])
+    return instance
+
+
+def can_upsert():
+    """ Whether the database supports INSERT ... ON CONFLICT DO UPDATE ...
+        RETURNING (PostgreSQL 9.5, SQLite 3.35)
+    """
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def _placeholder(field):
+    """ The placeholder of a field's value in the selected row of an upsert """
+    # PostgreSQL would take the parameters as text
+    if connection.vendor == 'postgresql':
+        return 'CAST(%s AS {})'.format(field.db_type(connection))
+    return '%s'
+
+
+def upsert_profile_task(task_id, profile_id, name, exclude_owner=False, **changes):
+    """ Makes the named transition of a Profile's ProfileTask for a Task in a
+        single statement: creating the ProfileTask, or updating it if it has
+        one of the transition's source statuses. With exclude_owner, nothing
+        is written for the Task's owner. On SQLite, an existing ProfileTask
+        is first looked up to tell whether it is created.
+        Returns (profile_task, created), or (None, False) if nothing was
+        written (eg. as the transition is not allowed, or the database cannot
+        upsert), in which case the transition can be made with lock_task,
+        lock_profile_task and move, which say why it is not allowed.
+    """
+    transition = PROFILE_TASK_TRANSITIONS[name]
+    if None not in transition.sources or not can_upsert():
+        return None, False
+
+    opts = ProfileTask._meta
+    qn = connection.ops.quote_name
+    table, task_table = qn(opts.db_table), qn(Task._meta.db_table)
+    profile_task = ProfileTask(task_id=task_id, profile_id=profile_id, status=transition.target, **changes)
+    profile_task.created_at = profile_task.updated_at = now()
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    values = [field.get_db_prep_save(getattr(profile_task, field.attname), connection) for field in fields]
+    updated = [opts.get_field(field).column for field in ['status', 'updated_at'] + list(changes)]
+
+    # Inserted from the Task's row, so nothing is written unless the Task
+    # exists and is in a state the transition allows
+    conditions, params = ['{}.id = %s'.format(task_table)], [task_id]
+    if transition.task_statuses is not None:
+        conditions.append('{}.status IN ({})'.format(task_table, ', '.join(['%s'] * len(transition.task_statuses))))
+        params += transition.task_statuses
+    if exclude_owner:
+        conditions.append('{}.owner_id <> %s'.format(task_table))
+        params.append(profile_id)
+    sources = [status for status in transition.sources if status is not None]
+    if sources:
+        conflict = 'DO UPDATE SET {updates} WHERE {table}.status IN ({sources})'
+    else:
+        # Only a missing ProfileTask can make the transition
+        conflict = 'DO NOTHING'
+    returning = ['{}.{}'.format(table, qn(field.column)) for field in opts.concrete_fields]
+    if connection.vendor == 'postgresql':
+        # A row the statement inserted has no deleting transaction
+        returning.append('({}.xmax = 0)'.format(table))
+    sql = (
+        'INSERT INTO {table} ({columns}) SELECT {values} FROM {task_table} WHERE {conditions} '
+        'ON CONFLICT ({profile}, {task}) ' + conflict + ' RETURNING {returning}'
+    ).format(
+        table=table, task_table=task_table,
+        columns=', '.join(qn(field.column) for field in fields),
+        values=', '.join(_placeholder(field) for field in fields),
+        conditions=' AND '.join(conditions),
+        profile=qn(opts.get_field('profile').column), task=qn(opts.get_field('task').column),
+        updates=', '.join('{0} = EXCLUDED.{0}'.format(qn(column)) for column in updated),
+        sources=', '.join(['%s'] * len(sources)),
+        returning=', '.join(returning),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        existing = None
+        if sources and connection.vendor != 'postgresql':
+            # SQLite has no xmax, but serializes writes, so the row found here
+            # is the one the upsert updates
+            existing = ProfileTask.objects.filter(task_id=task_id, profile_id=profile_id).values_list(
+                'pk', flat=True).first()
+        cursor.execute(sql, values + params + sources)
+        row = cursor.fetchone()
+    if row is None:
+        return None, False
+
+    # Converts the columns as a query would
+    converted = []
+    for field, value in zip(opts.concrete_fields, row):
+        col = Col(opts.db_table, field)
+        for converter in connection.ops.get_db_converters(col) + col.get_db_converters(connection):
+            value = converter(value, col, connection, {})
+        converted.append(value)
+    saved = ProfileTask.from_db(connection.alias, [field.attname for field in opts.concrete_fields], converted)
+    created = row[-1] if connection.vendor == 'postgresql' else saved.pk != existing
+    post_save.send(sender=ProfileTask, instance=saved, created=created, update_fields=None, raw=False,
+        using=connection.alias)
+    return saved, created
@@ -37,11 +37,13 @@ urlpatterns = [
     url(r'^tasks/$', views.TaskList.as_view(), name='task-list'),
     url(r'^tasks/(?P<pk>[0-9]+)/$', views.TaskDetail.as_view(), name='task-detail'),
     url(r'^tasks/create/$', views.create_task, name='task-create'),
+    url(r'^tasks/suggest/$', views.suggest_tasks, name='task-suggest'),
     url(r'^tasks/(?P<task_id>[0-9]+)/apply/$', views.apply_task, name='task-apply'),
     url(r'^tasks/shortlist/$', views.shortlist_task, name='task-shortlist'),
     url(r'^tasks/helper/$', views.HelperTaskList.as_view(), name='task-helper'),
     url(r'^tasks/poster/$', views.PosterTaskList.as_view(), name='task-poster'),
     url(r'^tasks/discard/$', views.discard_task, name='task-discard'),
+    url(r'^tasks/interactions/$', views.bulk_interactions, name='task-interactions'),
     url(r'^tasks/(?P<task_id>[0-9]+)/delete/$', views.delete_task, name='task-delete'),
     url(r'^tasks/(?P<task_id>[0-9]+)/applicants/$', views.view_applicants, name='task-view-applicants'),
     url(r'^tasks/(?P<task_id>[0-9]+)/accept/$', views.accept_applicant, name='task-accept-applicant'),
@@ -51,6 +53,8 @@ urlpatterns = [
     url(r'^tasks/complete/$', views.complete_task, name='task-complete'),
     url(r'^profiletasks/(?P<pk>[0-9]+)/$', views.ProfileTaskDetail.as_view(), name='profiletask-detail'),
     url(r'^skills/$', views.SkillList.as_view(), name='skill-list'),
+    url(r'^sync/$', views.sync_changes, name='sync'),
+    url(r'^auth_cache/$', views.auth_cache_stats, name='auth-cache-stats'),
     url(r'^password_reset/$', views.password_reset, name='password-reset'),
     
     # Just for testing purposes
@@ -24,27 +24,92 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.parsers import JSONParser
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAdminUser, IsAuthenticated
 from django.contrib.auth.models import User
-from django.http import HttpResponse, JsonResponse
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
 import django_filters.rest_framework
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from rest_framework.settings import api_settings
 from random import randint
-import operator
 from jobs.models import *
 from jobs.models import ProfileSkill as ProfileSkillModel
 from jobs.serializers import *
+from jobs.compiled import compile_serializer
+from jobs.normalize import is_normalized
+from jobs.pagination import KeysetPagination
+from jobs.search import FullTextSearchFilter
+from jobs import authentication, conditional, feed, interactions, search, suggest, sync, transitions
+from jobs.conditional import ConditionalGetMixin
+from jobs.streaming import StreamingListMixin
 import datetime
 from django.utils.timezone import now
 
 
-class ProfileList(generics.ListAPIView):
+class EagerLoadingMixin(object):
+    """ Eager loads the relations declared by the view's serializer
+        (see eager_loading_plan), so lists take the same number of queries
+        however many objects they hold. Only the columns of requested fields
+        are fetched (see DynamicFieldsMixin).
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super(EagerLoadingMixin, self).filter_queryset(queryset)
+        return eager_load(queryset, self.get_serializer())
+
+
+class CompiledReadMixin(object):
+    """ Serializes lists and single objects with the view's compiled
+        serializer (see jobs.compiled), falling back to the serializer itself
+        when it cannot be compiled, for normalised responses, and for views
+        checking object permissions.
+    """
+
+    def get_compiled_serializer(self, queryset, single=False):
+        """ Gets the compiled serializer for the view's queryset, or None """
+        if is_normalized(self.request):
+            return None
+        if self.paginator is not None and not isinstance(self.paginator, KeysetPagination):
+            return None
+        if single and any(type(permission).has_object_permission is not BasePermission.has_object_permission
+                for permission in self.get_permissions()):
+            return None
+        return compile_serializer(self.get_serializer(), queryset)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        compiled = self.get_compiled_serializer(queryset)
+        if compiled is None:
+            return super(CompiledReadMixin, self).list(request, *args, **kwargs)
+
+        if self.paginator is not None:
+            page = self.paginator.paginate_queryset(queryset, request, view=self, serialize=compiled.serialize)
+            if page is not None:
+                return self.get_paginated_response(page)
+        return Response(compiled.serialize(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        compiled = self.get_compiled_serializer(queryset, single=True)
+        if compiled is None:
+            return super(CompiledReadMixin, self).retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        data = compiled.serialize(queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]}))
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+
+class ProfileList(StreamingListMixin, EagerLoadingMixin, generics.ListAPIView):
     """ List all profiles """
     queryset = Profile.objects.all()
     serializer_class = ProfileUserSerializer
+    pagination_class = KeysetPagination
 
 
 class UserUpdate(generics.UpdateAPIView):
@@ -57,7 +122,7 @@ class UserUpdate(generics.UpdateAPIView):
         return super(UserUpdate, self).get_serializer(*args, **kwargs)
 
 
-class ProfileDetail(generics.RetrieveUpdateAPIView):
+class ProfileDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveUpdateAPIView):
     """ Get the information from one profile """
     queryset = Profile.objects.all()
     serializer_class = ProfileUserSerializer
@@ -66,15 +131,23 @@ class ProfileDetail(generics.RetrieveUpdateAPIView):
         kwargs['partial'] = True
         return super(ProfileDetail, self).get_serializer(*args, **kwargs)
 
+    def perform_update(self, serializer):
+        """ Saves the Profile, re-ranking its task feed if the location changed """
+        old_location = serializer.instance.location
+        profile = serializer.save()
+        if profile.location != old_location:
+            feed.rebuild_profile_feed(profile)
+
 
 @permission_classes((IsAuthenticated, ))
-class HelperTaskList(generics.ListAPIView):
+class HelperTaskList(StreamingListMixin, CompiledReadMixin, EagerLoadingMixin, generics.ListAPIView):
     """ Shows ProfileTasks for which the logged user is a helper
         Filters by status (applied, shortlisted, assigned, ...),
         based on querystring.
     """
     filter_backends = (DjangoFilterBackend,)
     serializer_class = ProfileTaskGetSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """ Gets queryset for the view.
@@ -93,13 +166,14 @@ class HelperTaskList(generics.ListAPIView):
 
 @permission_classes((IsAuthenticated, ))
 
-class PosterTaskList(generics.ListAPIView):
+class PosterTaskList(StreamingListMixin, EagerLoadingMixin, generics.ListAPIView):
     """ Shows tasks for which the logged user is the poster
         Filters by Task status based on querystring
     """
 
     filter_backends = (DjangoFilterBackend,)
     serializer_class = TaskGetSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """ Gets queryset for the view.
@@ -117,102 +191,109 @@ class PosterTaskList(generics.ListAPIView):
         return queryset
 
 
-class ProfileTaskDetail(generics.RetrieveAPIView):
+class ProfileTaskDetail(ConditionalGetMixin, EagerLoadingMixin, generics.RetrieveAPIView):
     """ Get the information from one ProfileTask """
     queryset = ProfileTask.objects.all()
     serializer_class = ProfileTaskGetSerializer
 
 
-class TaskList(generics.ListAPIView):
+class TaskList(StreamingListMixin, CompiledReadMixin, EagerLoadingMixin, generics.ListAPIView):
     """ Get the list of Open tasks relevant for user
         Ranked by relevance
+        Paged by (rank, created_at, id) when a page_size or cursor is given
     """
     queryset = Task.objects.all()
     serializer_class = TaskGetSerializer
+    pagination_class = KeysetPagination
 
     #set the view to be searchable and filterable
-    filter_backends = (filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend)
+    filter_backends = (FullTextSearchFilter, filters.OrderingFilter, DjangoFilterBackend)
     search_fields = ('title','location','description','owner__user__first_name', 'owner__user__last_name', 'skills__title')
     ordering = ('-created_at',)
 
 
+    def use_feed(self):
+        """ Whether the list is read from the user's materialised feed.
+            The feed only holds the user's best ranked tasks, unless it is
+            complete, so the whole list is only read from a complete feed,
+            and pages past the end of an incomplete one are ranked on the fly
+            (see get_remainder_queryset), as are custom orderings and searches.
+        """
+        if not hasattr(self, 'reading_feed'):
+            params = self.request.query_params
+            paged = self.paginator is not None and any(param in params
+                for param in (self.paginator.page_size_query_param, self.paginator.cursor_query_param))
+            self.reading_feed = (feed.is_enabled()
+                and not params.get(api_settings.SEARCH_PARAM)
+                and not params.get(api_settings.ORDERING_PARAM)
+                and (paged or feed.is_complete(self.request.user.profile)))
+        return self.reading_feed
+
+    def get_remainder_queryset(self):
+        """ Gets the rest of the list, ranked on the fly, once a page runs
+            past the end of the user's feed, or None if the feed holds the
+            whole list. A depleted feed is refilled for later pages.
+        """
+        profile = self.request.user.profile
+        if not self.use_feed() or feed.is_complete(profile):
+            return None
+        feed.refill_feed(profile)
+        self.reading_feed = False
+        return self.filter_queryset(self.get_queryset()).annotate(task_created_at=F('created_at'))
+
     def get_queryset(self):
         """ Get the queryset for the view
             Filtered by search
             Ordered by relevance
         """
 
+        # The feed only holds open tasks the user hasn't interacted with,
+        # already ranked
+        if self.use_feed():
+            return feed.feed_for(self.request.user.profile)
+
         # Set initial queryset to all open tasks
         queryset = Task.objects.filter(status=Task.OPEN)
 
-        # Find all profiletasks associated with the current user
-        profile_id = self.request.user.profile.id
-        my_profiletasks = ProfileTask.objects.filter(profile=profile_id)
-
         # Filter out all tasks which have a Profiletask associated with the current user
         # i.e. shortlisted, discarded, applied, etc, tasks won't be displayed
-        for profiletask in my_profiletasks:
-            task = profiletask.task.id
-            queryset = queryset.exclude(id=task)
+        queryset = queryset.not_interacted_with(self.request.user.profile)
 
         return queryset
 
 
     def filter_queryset(self, queryset):
+        # The feed is already ranked, with ties in rank resolved by which
+        # task is more recent
+        if self.use_feed():
+            queryset = super(TaskList, self).filter_queryset(queryset)
+            return queryset.order_by('-rank', '-task_created_at')
+
         # First sort by most recent
         queryset = super(TaskList, self).filter_queryset(queryset)
         #sort the queryset (only if user logged in)
         if self.request.user.is_authenticated():
-            for item in queryset:
 
-                # temporarily sets the display_rank of each task
-                set_rank(item, self.request)
-                pass
+            # Annotate the rank of each task in the database
+            queryset = queryset.ranked_for(self.request.user.profile)
 
-            # Firstly sort by most recent, then relevance
-            # This means ties in display_rank are resolved by which is
+            # Firstly sort by relevance, then by how well the task matches
+            # any search, then by the existing ordering
+            # (most recent, unless overridden in the querystring)
+            # This means ties in rank are resolved by which is
             # more recent
-            queryset = sorted(queryset, key=operator.attrgetter('display_rank'), reverse=True)
+            ordering = [field for field in queryset.query.order_by if field != '-search_rank']
+            ordering = ordering or ['-created_at']
+            queryset = queryset.order_by('-rank', *(self.search_ordering(queryset) + ordering))
 
         return queryset
 
+    def search_ordering(self, queryset):
+        """ Orders by full-text search rank, if the queryset was searched """
+        return ['-search_rank'] if 'search_rank' in queryset.query.annotations else []
 
-def set_rank(task, request):
-    """ Temporarily sets the display_rank of a task
-        based on skills and location. Does not save to the database.
-        Display rank is based on skills and location in common with logged
-        in user.
-    """
-    rank = 0
-
-    # List of skills listed by the task
-    task_skills = Skill.objects.filter(task__id=task.id)
-
-    # List of skills listed by the logged in user
-    profileskill_objs = ProfileSkillModel.objects.filter(profile__id=request.user.profile.id)
-
-    # Add 1 point rank per common skill
-    # Take 1 point off per missing skill in profile
-    profile_skills = []
-    for profile_skill in profileskill_objs:
-        profile_skills.append(profile_skill.skill)
-
-    for task_skill in task_skills:
-        if task_skill in profile_skills:
-            rank += 1
-        else:
-            rank -=1
-
-    # Add 3 offer if same location as user
-    if task.location.lower() == request.user.profile.location.lower():
-        rank += 3
 
-    # Temporarily set the rank of the task
-    # Does not save to database
-    task.display_rank = rank
-
-
-class TaskDetail(generics.RetrieveAPIView):
+class TaskDetail(ConditionalGetMixin, CompiledReadMixin, EagerLoadingMixin, generics.RetrieveAPIView):
     """ Get the information from one Task """
     queryset = Task.objects.all()
     serializer_class = TaskGetSerializer
@@ -227,34 +308,80 @@ def shortlist_task(request):
     if request.method == 'POST':
 
         profile = request.user.profile.id
-        request.data["profile"] = profile
-        task_id = request.data['task']
-        task = get_object_or_404(Task, pk=task_id)
 
-        # Integrity check: makes sure owner is not shortlister
-        if profile == task.owner.id:
-            return Response({"error":"A profile cannot shortlist their own task!"}, status=status.HTTP_400_BAD_REQUEST)
+        # Shortlist in one statement, unless any check below fails
+        profile_task, created = transitions.upsert_profile_task(request.data['task'], profile, 'shortlist',
+            exclude_owner=True)
+        if profile_task is not None:
+            return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_201_CREATED)
 
-        # Integrity check: Ensures no ProfileTask exists already for the
-        # Task/Profile combination
-        if (ProfileTask.objects.filter(profile=profile, task=task).count()>0):
-            return Response({"error":"ProfileTask already exists"}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            task = transitions.lock_task(pk=request.data['task'])
 
-        # Create and save serializer
-        serializer = ProfileTaskPostSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            # Integrity check: makes sure owner is not shortlister
+            if profile == task.owner_id:
+                return Response({"error":"A profile cannot shortlist their own task!"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Integrity check: Ensures no ProfileTask exists already for the
+            # Task/Profile combination
+            profile_task = transitions.lock_profile_task(task, profile_id=profile)
+            try:
+                transitions.move(profile_task, 'shortlist')
+            except transitions.TransitionError as error:
+                return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes((IsAuthenticated, ))
+def suggest_tasks(request):
+    """ Autocomplete for the task search box
+        Suggests skills, locations and open task titles matching the
+        partly typed query in the querystring (q), up to limit of them.
+    """
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        return Response({"error":"limit must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(suggest.index.suggest(request.query_params.get('q', ''), limit))
 
 
 @api_view(['GET'])
 @permission_classes((IsAuthenticated, ))
 def current_profile(request):
     """ Get profile information for the currently logged in user """
+    # Nothing is serialized if the client has the current version
+    profiles = Profile.objects.filter(user=request.user)
+    not_modified, headers = conditional.check(request, profiles,
+        ProfileUserGetSerializer(context={"request": request}), single=True)
+    if not_modified is not None:
+        return conditional.add_headers(not_modified, headers)
+
     serializer = ProfileUserGetSerializer(request.user.profile, context={"request": request})
 
-    return Response(serializer.data)
+    return conditional.add_headers(Response(serializer.data), headers)
+
+
+@api_view(['GET'])
+@permission_classes((IsAuthenticated, ))
+def sync_changes(request):
+    """ Get the user's tasks, ProfileTasks, profiles and skills changed since
+        the cursor in `since` (or all of them, without one), the ids of those
+        deleted since, and the cursor to sync from next time
+    """
+    since = sync.decode_cursor(request.query_params.get('since'))
+    return Response(sync.changes(request.user.profile, since, request))
+
+
+@api_view(['GET'])
+@permission_classes((IsAdminUser, ))
+def auth_cache_stats(request):
+    """ Get the hit and miss counts, and hit rate, of this process's token
+        cache (see jobs/authentication.py)
+    """
+    return Response(authentication.cache.stats())
 
 
 # Written so that any task can be discarded, regardless of status.
@@ -270,36 +397,32 @@ def discard_task(request):
     if request.method == 'POST':
 
         profile = request.user.profile.id
-        request.data["profile"] = profile
-        task = request.data['task']
-
-        # Set status of profiletask to 'discarded'
-        request.data['status']=ProfileTask.DISCARDED
-
-        # Integrity check: Task cannot already be discarded
-        if (ProfileTask.objects.filter(profile=profile, task=task).count()>0):
-            profile_task = ProfileTask.objects.filter(profile=profile, task=task)[0]
-            if (profile_task.status == 'D'):
-                return Response({"error":"ProfileTask has already been discarded."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # If a profileTask already exists for the given profile and task,
-        # retrieve it. Otherwise, create a new profiletask
-        if (ProfileTask.objects.filter(profile=profile, task=task).count()>0):
-            profileTask = ProfileTask.objects.filter(profile=profile, task=task)[0]
-            serializer = ProfileTaskPostSerializer(profileTask, data=request.data)
-            alreadyExists = True
-        else:
-            serializer = ProfileTaskPostSerializer(data=request.data)
-            alreadyExists = False
 
-        # Save the serializer
-        if serializer.is_valid():
-            serializer.save()
-            if alreadyExists:
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            else:
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Discard in one statement, unless the check below fails
+        profile_task, created = transitions.upsert_profile_task(request.data['task'], profile, 'discard')
+        if profile_task is not None:
+            serializer = ProfileTaskPostSerializer(profile_task)
+            return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+        with transaction.atomic():
+            task = transitions.lock_task(pk=request.data['task'])
+
+            # If a profileTask already exists for the given profile and task,
+            # retrieve it. Otherwise, create a new profiletask
+            profile_task = transitions.lock_profile_task(task, profile_id=profile)
+            alreadyExists = profile_task.pk is not None
+
+            # Integrity check: Task cannot already be discarded
+            try:
+                transitions.move(profile_task, 'discard')
+            except transitions.TransitionError as error:
+                return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ProfileTaskPostSerializer(profile_task)
+        if alreadyExists:
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        else:
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['POST'])
@@ -311,60 +434,81 @@ def apply_task(request, task_id):
     if request.method == 'POST':
 
         profile = request.user.profile.id
-        task = get_object_or_404(Task, pk=task_id)
-
-        # Integrity check: task isn't owned by applicant
-        if profile == task.owner.id:
-            return Response({"error":"A profile cannot apply to their own task!"}, status=status.HTTP_400_BAD_REQUEST)
 
         # Integrity check: Offer cannot be below 0
         if ('quote' in request.data.keys() and int(request.data['quote']) < 0):
             return Response({"error":"Integrity check failed! Offer cannot be negative."}, status=status.HTTP_400_BAD_REQUEST)
 
+        serializer = ProfileTaskApplicationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        # Integrity check: More than 1 matching profileTasks should not exist
-        if (ProfileTask.objects.filter(profile=profile, task=task_id).count()>1):
-            return Response({"error":"Integrity check failed! There should only be one profileTask per profile per task."}, status=status.HTTP_400_BAD_REQUEST)
+        # Apply in one statement, unless any check below fails
+        profile_task, created = transitions.upsert_profile_task(task_id, profile, 'apply', exclude_owner=True,
+            datetime_applied=now(), **serializer.validated_data)
+        if profile_task is not None:
+            return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_201_CREATED)
 
-        # In the case that one matching profileTasks exists
-        elif (ProfileTask.objects.filter(profile=profile, task=task_id).count()>0):
+        with transaction.atomic():
+            task = transitions.lock_task(pk=task_id)
 
-            profile_task = get_object_or_404(ProfileTask, profile=profile, task=task_id)
+            # Integrity check: task isn't owned by applicant
+            if profile == task.owner_id:
+                return Response({"error":"A profile cannot apply to their own task!"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Integrity check: Make sure Task is open, and profiletask is
-            # shortlisted
+            # Integrity check: Make sure Task is open, and the profile has at
+            # most shortlisted it
             #       Note, this does not mean a profile must have
-            #shortlised a task to apply; if a user has not shortlisted the
-            # task, then no profiletask will exist (and the other branch
-            # of the `if` statement is taken))
-            if not (profile_task.status == ProfileTask.SHORTLISTED and task.status == Task.OPEN):
-                return Response({"error":"Task must be open, and profile must not have already applied"}, status=status.HTTP_400_BAD_REQUEST)
-
-            # Set compulsory fields for the serializer
-            request.data["status"] = ProfileTask.APPLIED
-            request.data["datetime_applied"] = now()
-            request.data["task"] = profile_task.task.id
-            request.data["profile"] = profile_task.profile.id
-
-            # Create serializer from existing profiletask
-            serializer = ProfileTaskPostSerializer(profile_task,data=request.data)
-
-        # In the case that no matching profileTask exists, create one
-        else:
-            # Set compulsory fields for serializer
-            request.data["task"] = task_id
-            request.data["datetime_applied"] = now()
-            request.data["profile"] = profile
-            request.data["status"] = ProfileTask.APPLIED
+            # shortlisted a task to apply; if a user has not shortlisted the
+            # task, then a new profiletask is created
+            profile_task = transitions.lock_profile_task(task, profile_id=profile)
+            try:
+                transitions.move(profile_task, 'apply', datetime_applied=now(), **serializer.validated_data)
+            except transitions.TransitionError as error:
+                return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create new serializer
-            serializer = ProfileTaskPostSerializer(data=request.data)
+        return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_201_CREATED)
 
-        # Save serializer
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes((IsAuthenticated, ))
+def bulk_interactions(request):
+    """ Shortlist, discard or apply to several tasks at once
+        POST data is a list of interactions, each with its task id, its
+        action ('shortlist', 'discard' or 'apply'), and, when applying,
+        optionally its answers and quote.
+        Responds with the result of each interaction, in order: the status
+        it would have had on its own, and its profiletask or error.
+    """
+    if request.method == 'POST':
+
+        # Integrity check: a list of at most MAX_BATCH_SIZE interactions
+        if not isinstance(request.data, list):
+            return Response({"error":"Expected a list of interactions"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(request.data) > interactions.MAX_BATCH_SIZE:
+            return Response({"error":"At most {} interactions can be made at once".format(interactions.MAX_BATCH_SIZE)},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        # Integrity check: each interaction is valid on its own
+        checked = [InteractionSerializer(data=item) for item in request.data]
+        valid = [dict(serializer.validated_data) for serializer in checked if serializer.is_valid()]
+        made = iter(interactions.interact(request.user.profile.id,
+            [(data.pop('task'), data.pop('action'), data) for data in valid]))
+
+        results = []
+        for item, serializer in zip(request.data, checked):
+            if serializer.errors:
+                results.append({"task": item.get('task') if isinstance(item, dict) else None,
+                    "status": status.HTTP_400_BAD_REQUEST, "error": serializer.errors})
+                continue
+            result = next(made)
+            if result.error is not None:
+                results.append({"task": result.task_id, "action": result.action, "status": result.code,
+                    "error": result.error})
+            else:
+                results.append({"task": result.task_id, "action": result.action, "status": result.code,
+                    "profile_task": ProfileTaskPostSerializer(result.profile_task).data})
+        return Response(results, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -375,30 +519,23 @@ def reject_application(request):
     """
     if request.method == 'POST':
 
-        profile_task = get_object_or_404(ProfileTask, pk=request.data["profiletask_id"])
-        task = profile_task.task
+        profile_task_id = request.data["profiletask_id"]
+        with transaction.atomic():
+            task = transitions.lock_task(pk__in=ProfileTask.objects.filter(pk=profile_task_id).values('task_id'))
 
-        # Permission check: logged in user owns the task
-        if task.owner.id != request.user.id:
-            return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
+            # Permission check: logged in user owns the task
+            if task.owner_id != request.user.id:
+                return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Integrity check: profileTask must be either applied or
-        # application_shortlisted, and task must be open
-        if not ((profile_task.status == ProfileTask.APPLIED or profile_task.status == ProfileTask.APPLICATION_SHORTLISTED)
-            and task.status == 'O'):
-            return Response({"error":"profileTask status must be (Applied or Application_Shortlisted), and task status must be Open"}, status=status.HTTP_400_BAD_REQUEST)
+            # Integrity check: profileTask must be either applied or
+            # application_shortlisted, and task must be open
+            profile_task = transitions.lock_profile_task(task, pk=profile_task_id)
+            try:
+                transitions.move(profile_task, 'reject')
+            except transitions.TransitionError as error:
+                return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        #set compulsory fields for the serializer
-        request.data["status"] = ProfileTask.REJECTED
-        request.data["task"] = profile_task.task.id
-        request.data["profile"] = profile_task.profile.id
-
-        # Create and save serializer
-        serializer = ProfileTaskPostSerializer(profile_task,data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -409,33 +546,26 @@ def shortlist_application(request):
     """
     if request.method == 'POST':
 
-        profile_task = get_object_or_404(ProfileTask, pk=request.data["profiletask_id"])
-        profile = profile_task.profile
-        task = profile_task.task
+        profile_task_id = request.data["profiletask_id"]
+        with transaction.atomic():
+            task = transitions.lock_task(pk__in=ProfileTask.objects.filter(pk=profile_task_id).values('task_id'))
 
-        # Permission check: Task owner is logged in user
-        if task.owner.id != request.user.id:
-            return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
+            # Permission check: Task owner is logged in user
+            if task.owner_id != request.user.id:
+                return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Integrity Check: ProfileTask must be applied and task must be open
-        if not (profile_task.status == ProfileTask.APPLIED and task.status == Task.OPEN):
-            return Response({"error":"profileTask status must be Applied, and task status must be Open"}, status=status.HTTP_400_BAD_REQUEST)
+            # Integrity Check: ProfileTask must be applied and task must be open
+            profile_task = transitions.lock_profile_task(task, pk=profile_task_id)
+            try:
+                transitions.move(profile_task, 'shortlist_application')
+            except transitions.TransitionError as error:
+                return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Increment number of shortlists on profile and save
-        profile.shortlist()
-        profile.save()
+            # Increment number of shortlists on profile
+            Profile(pk=profile_task.profile_id).shortlist()
 
-        # Set compulsory fields for the serializer
-        request.data["status"] = ProfileTask.APPLICATION_SHORTLISTED
-        request.data["task"] = profile_task.task.id
-        request.data["profile"] = profile_task.profile.id
-
-        # Create and save serializer
-        serializer = ProfileTaskPostSerializer(profile_task,data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
+        authentication.invalidate_profile(profile_task.profile_id)
+        return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 def create_profile(request):
@@ -460,7 +590,10 @@ def create_profile(request):
         if not profile_serializer.is_valid():
             user.delete()
             return Response(profile_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-        profile_serializer.save()
+        profile = profile_serializer.save()
+
+        # Re-rank the new profile's task feed for its location
+        feed.rebuild_profile_feed(profile)
 
         return Response(user_serializer.data, status=status.HTTP_201_CREATED)
 
@@ -515,31 +648,25 @@ def complete_task(request):
     """
     if request.method == 'POST':
 
-        task = get_object_or_404(Task, pk=request.data["task_id"])
-        helper = task.helper
+        with transaction.atomic():
+            task = transitions.lock_task(pk=request.data["task_id"])
 
-        # Integrity Check: Task should be in progress
-        if task.status != Task.IN_PROGRESS:
-            return Response({"error":"Task is not In Progress and cannot be Completed"}, status=status.HTTP_400_BAD_REQUEST)
-        # Permission check: Logged in user is task owner
-        if task.owner.id != request.user.id:
-            return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
+            # Integrity Check: Task should be in progress
+            try:
+                transitions.check(task, 'complete')
+            except transitions.TransitionError as error:
+                return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
+            # Permission check: Logged in user is task owner
+            if task.owner_id != request.user.id:
+                return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Fill in required serializer data, populated from the existing Task
-        # data
-        old_serializer = TaskPostSerializer(task)
-        new_data = old_serializer.data
-        new_data["status"] = Task.COMPLETE
-
-        # Create and save the serializer
-        serializer = TaskPostSerializer(task,data=new_data)
-        if serializer.is_valid():
-            serializer.save()
+            transitions.move(task, 'complete')
             # Update the number of tasks completed by helper
-            if helper:
-                helper.complete_task()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            if task.helper_id:
+                Profile(pk=task.helper_id).complete_task()
+
+        authentication.invalidate_profile(task.helper_id)
+        return Response(TaskPostSerializer(task).data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
@@ -569,8 +696,9 @@ def view_applicants(request, task_id):
         if profiletask_status is not None:
             profile_tasks = profile_tasks.filter(status=profiletask_status)
 
-        #Sort by Profile rating
-        profile_tasks = sorted(profile_tasks, key=operator.attrgetter('profile.rating'),reverse=True)
+        #Sort by Profile rating (ties stay most recent first)
+        profile_tasks = profile_tasks.order_by('-profile__rating', '-created_at')
+        profile_tasks = eager_load(profile_tasks, ApplicantSerializer(context={"request": request}))
 
         # Return serialized list of applicants
         serializer = ApplicantSerializer(profile_tasks, many=True, context={"request": request})
@@ -607,43 +735,29 @@ def accept_applicant(request, task_id):
         Applicant id provided in POST data as "profile"
     """
 
-    task = get_object_or_404(Task, pk=task_id)
-    applicant = get_object_or_404(Profile, pk=request.data["profile"])
+    with transaction.atomic():
+        task = transitions.lock_task(pk=task_id)
 
-    #Permission Check: Ensures correct user is accepting applicant
-    if task.owner.id != request.user.id:
-        return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Integrity check: Check the task is Open and does not have a helper
-    if (task.status != Task.OPEN or task.helper != None):
-        return Response({"error":"Task must be open, and have no helper assigned"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Integrity Check: Check that the helper has submitted an application
-    # for the task
-    if ((ProfileTask.objects.filter(profile=applicant, task=task).count()<1) or
-        (ProfileTask.objects.filter(profile=applicant, task=task)[0].status != ProfileTask.APPLIED and
-        ProfileTask.objects.filter(profile=applicant, task=task)[0].status != ProfileTask.APPLICATION_SHORTLISTED)) :
-        return Response({"error":"Profile must have applied for task to be accepted"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Set required fields for serializer, populating fro existing task
-    old_serializer = TaskPostSerializer(task)
-    new_data = old_serializer.data
-    new_data["status"] = Task.IN_PROGRESS
-    profile_serializer = ProfileSerializer(applicant)
-    new_data["helper"] = applicant.pk
-
-    #Create and save new serializer
-    serializer = TaskPostSerializer(task, data=new_data)
-    if serializer.is_valid():
-        serializer.save()
-
-        # Update the status of the associated profiletask
-        profileTask = ProfileTask.objects.filter(profile=applicant, task=task)[0]
-        profileTask.status = ProfileTask.ASSIGNED
-        profileTask.save()
+        #Permission Check: Ensures correct user is accepting applicant
+        if task.owner_id != request.user.id:
+            return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # Integrity check: Check the task is Open and does not have a helper
+        try:
+            transitions.check(task, 'accept')
+            if task.helper_id is not None:
+                raise transitions.TransitionError(transitions.TASK_TRANSITIONS['accept'].error)
+
+            # Integrity Check: Check that the helper has submitted an
+            # application for the task, and assign them to it
+            profile_task = transitions.lock_profile_task(task, profile_id=request.data["profile"])
+            transitions.move(profile_task, 'assign')
+        except transitions.TransitionError as error:
+            return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        transitions.move(task, 'accept', helper_id=profile_task.profile_id)
+
+    return Response(TaskPostSerializer(task).data, status=status.HTTP_200_OK)
 
 @api_view(['POST'])
 @permission_classes((IsAuthenticated, ))
@@ -653,7 +767,6 @@ def rate_helper(request, task_id):
         Rating provided by POST data
     """
 
-    task = get_object_or_404(Task, pk=task_id)
     applicant = get_object_or_404(Profile, pk=request.data["profile"])
     rating = int(request.data["rating"])
 
@@ -665,34 +778,32 @@ def rate_helper(request, task_id):
     if not (rating >= 0 and rating <=5):
         return Response ({"error": "Rating must be between 0 and 5"}, status=status.HTTP_400_BAD_REQUEST)
 
-    #Permission check: Rater is task owner
-    if task.owner.id != request.user.id:
-        return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Integrity check: Check the task is complete
-    if task.status != Task.COMPLETE:
-        return Response({"error":"Task must be complete to rate user"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Integrity check: Check that the helper is assigned to the task
-    if ((ProfileTask.objects.filter(profile=applicant, task=task).count()<1)
-        or (ProfileTask.objects.filter(profile=applicant, task=task)[0].status != ProfileTask.ASSIGNED)
-        or task.helper != applicant):
-            return Response({"error":"Profile must be assigned to task to be rated"}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Fill in compulsory fields for serializer
-    profile_task = ProfileTask.objects.filter(profile=applicant, task=task)[0]
-    old_serializer = ProfileTaskPostSerializer(profile_task)
-    new_data = old_serializer.data
-    new_data["rating"] = rating
-
-    # Create and save new serializer
-    serializer = ProfileTaskPostSerializer(profile_task, data=new_data)
-    if serializer.is_valid():
-        serializer.save()
-        # Update the applicants average rating
-        applicant.update_rating()
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    with transaction.atomic():
+        task = transitions.lock_task(pk=task_id)
+
+        #Permission check: Rater is task owner
+        if task.owner_id != request.user.id:
+            return Response({"error":"Current User does not own this task"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Integrity check: Check the task is complete
+        if task.status != Task.COMPLETE:
+            return Response({"error":"Task must be complete to rate user"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Integrity check: Check that the helper is assigned to the task
+        profile_task = transitions.lock_profile_task(task, profile=applicant)
+        old_rating = profile_task.rating
+        try:
+            if task.helper_id != applicant.id:
+                raise transitions.TransitionError(transitions.PROFILE_TASK_TRANSITIONS['rate'].error)
+            transitions.move(profile_task, 'rate', rating=rating)
+        except transitions.TransitionError as error:
+            return Response({"error":str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Update the applicants average rating, replacing any earlier rating
+        applicant.add_rating(rating, replaces=old_rating)
+
+    authentication.invalidate_user(applicant.user_id)
+    return Response(ProfileTaskPostSerializer(profile_task).data, status=status.HTTP_200_OK)
 
 def number_applications_today(profile_id):
     """ Returns the number of applications made by the given profile
@@ -753,7 +864,7 @@ def under_application_limit(request):
     return Response({"under_application_limit":str(under_limit)}, status=status.HTTP_200_OK)
 
 
-class SkillList(generics.ListAPIView):
+class SkillList(ConditionalGetMixin, CompiledReadMixin, EagerLoadingMixin, generics.ListAPIView):
     """ List all skills """
     queryset = Skill.objects.all()
     serializer_class = SkillSerializer
@@ -792,6 +903,9 @@ def update_skills(request):
         if serializer.is_valid():
             serializer.save()
 
+    # Re-rank the profile's task feed for the new skills
+    feed.rebuild_profile_feed(profile)
+
     # Updated user data to show updated skills
     profile_serializer = ProfileUserGetSerializer(profile, context={"request": request})
 
@@ -803,11 +917,12 @@ def update_skills(request):
 def completed_tasks(request, profile_id):
     """ Gets the list of ProfileTasks a helper has completed """
     profile = get_object_or_404(Profile, pk=profile_id)
-    profile_tasks = ProfileTask.objects.filter(profile=profile)
-    completed_tasks = []
-    for pt in profile_tasks:
-        if (pt.task.status == Task.COMPLETE and pt.status == ProfileTask.ASSIGNED):
-            completed_tasks.append(pt)
-
-    serializer = ProfileTaskGetSerializer(completed_tasks, many=True)
+    completed_tasks = ProfileTask.objects.filter(
+        profile=profile,
+        status=ProfileTask.ASSIGNED,
+        task__status=Task.COMPLETE
+    )
+    completed_tasks = eager_load(completed_tasks, ProfileTaskGetSerializer(context={"request": request}))
+
+    serializer = ProfileTaskGetSerializer(completed_tasks, many=True, context={"request": request})
     return Response(serializer.data, status=status.HTTP_200_OK)